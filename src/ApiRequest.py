@@ -1,13 +1,50 @@
-from datetime import datetime, timedelta
-from typing import Dict, List
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Tuple
+from BlockSync import SyncPlan, diff_blocks, to_notion_block
+from NotionClient import NotionClient
+from BlockTypes import get_block_type
+from Metrics import METRICS
+import threading
+import time
 import os
 
 
+class PartialSyncError(SystemError):
+    '''
+    PartialSyncError(SystemError): 新增 block 途中失敗，created 紀錄失敗前已成功新增的部分
+    呼叫端將 created 寫回資料庫後，下次同步只會從尚未新增的 block 繼續，不需要重頭開始
+    '''
+
+    def __init__(self, message: str, created: List = None):
+        super().__init__(message)
+        self.created: List = created if created is not None else list()
+
+
+def parse_notion_time(value: str) -> datetime:
+    '''
+    parse_notion_time(value: str): 將 Notion 的時間字串 (例如 2024-11-20T01:00:00.000Z) 轉成有時區的 datetime
+    '''
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
 class RequestNotionDatabase(object):
     def __init__(self):
         self.header: Dict[str, str] = self._handle_header()
         self.url: str = self._hander_url()
+        self.client: NotionClient = NotionClient.shared()  # 共用的連線池、限流與重試設定
+        self.max_workers: int = self._handle_max_workers()
+
+    def _handle_max_workers(self) -> int:
+        '''
+        _handle_max_workers(self): 處理同時發送請求的執行緒上限，可用環境變數 NOTION_MAX_WORKERS 設定 (預設 3)
+        註: 實際送出的速率仍受 NotionClient 的限流控制，此數值只決定同時等待回應的請求數
+        '''
+        max_workers: str = os.getenv('NOTION_MAX_WORKERS', '3')
+        if not max_workers.isdigit() or int(max_workers) < 1:
+            raise ValueError('環境變數 NOTION_MAX_WORKERS 必須為正整數')
+
+        return int(max_workers)
 
     def _handle_header(self) -> Dict[str, str]:
         '''
@@ -36,41 +73,88 @@ class RequestNotionDatabase(object):
 
         return f'https://api.notion.com/v1/databases/{database_id}/query'
 
-    def get_database_json(self):
+    def _run_concurrently(self, func: Callable, items: List) -> Tuple[Dict, Dict]:
         '''
-        get_database_json(self): 回傳 database JSON 的資料格式
-        註: API 僅允許一次回傳 100 筆資料，若超過則使用 next_cursor 作為參數發送下一個請求，來分批接收資料
+        _run_concurrently(self, func: Callable, items: List): 以最多 self.max_workers 個執行緒對每個 item 執行 func
+        回傳 (results, failures)，兩者皆以 item 為 key；failures 的值為例外物件，不會因單一失敗中斷其他請求
         '''
-        response = requests.post(url=self.url, headers=self.header)
-        return response.json()
+        results, failures = dict(), dict()
+        if not items:
+            return results, failures
 
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            futures = {pool.submit(func, item): item for item in items}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    results[item] = future.result()
+                except Exception as error:
+                    failures[item] = error
 
-class PageOperator(RequestNotionDatabase):
-    def __init__(self, currentDate: str = None):
-        super().__init__()
-        # 僅 100 筆以內的資料
-        self.data: List[Dict] = super().get_database_json().get('results', [])
-        self.pageObject: Dict = self._analyze_pages()
-        self.current_page_id: str = None
-        self.currentDate: str = currentDate if currentDate else str(
-            datetime.today().date())
+        return results, failures
+
+    def date_filter(self, date: str) -> Dict:
+        '''
+        date_filter(self, date: str): 回傳以 Date 屬性篩選單一日期的 Notion filter
+        '''
+        return {"property": "Date", "date": {"equals": date}}
+
+    def query_database(self, filter: Dict = None, page_size: int = 100) -> Iterator[Dict]:
+        '''
+        query_database(self, filter: Dict = None, page_size: int = 100): 逐筆產生 database 中符合 filter 的 page (generator)
+        註: API 一次最多回傳 100 筆資料，此處依 has_more 與 next_cursor 自動發送下一個請求，僅在迭代到時才取得下一批資料
+        '''
+        payload: Dict = {"page_size": page_size}
+        if filter:
+            payload["filter"] = filter
+
+        while True:
+            # 查詢不會修改資料，可以安全重試
+            response = self.client.post(
+                url=self.url, headers=self.header, json=payload, idempotent=True)
+            if response.status_code != 200:
+                raise SystemError("取得 Notion 資料庫失敗，請稍後再執行")
+
+            body: Dict = response.json()
+            yield from body.get('results', [])
+
+            if not body.get('has_more') or not body.get('next_cursor'):
+                break
+            payload["start_cursor"] = body["next_cursor"]
+
+    def get_database_json(self, filter: Dict = None) -> Dict:
+        '''
+        get_database_json(self, filter: Dict = None): 回傳 database JSON 的資料格式
+        註: 會依 next_cursor 取得全部分頁後合併為單一 results，需要逐筆處理時請改用 query_database()
+        '''
+        return {
+            "object": "list",
+            "results": list(self.query_database(filter=filter)),
+            "has_more": False,
+            "next_cursor": None,
+        }
 
-    def _analyze_pages(self) -> Dict:
+    def _analyze_pages(self, pages: List[Dict]) -> Dict:
         '''
-        _analyze_pages(self): 分析 page 的 json 資訊(例如: id, icon, parent 等), 回傳 dict() 格式
+        _analyze_pages(self, pages: List[Dict]): 分析 page 的 json 資訊(例如: id, icon, parent 等), 回傳 dict() 格式
+        註: 沒有設定 Date 屬性的 page 無法對應任務日期，直接略過
         '''
         pages_info = dict()
-        for data in self.data:
+        for data in pages:
+            date_property: Dict = data["properties"].get("Date", {}).get("date")
+            if not date_property:
+                continue
+
             # 使用任務日期當作 key
-            task_date: str = data["properties"]["Date"]["date"]["start"]
-            TW_Time = datetime.fromisoformat(
-                data["last_edited_time"].replace("Z", "+00:00")) + timedelta(hours=8)
+            task_date: str = date_property["start"]
+            TW_Time = parse_notion_time(data["last_edited_time"]) + timedelta(hours=8)
             last_edited_time: str = TW_Time.strftime('%Y-%m-%d %H:%M:%S')
 
             pages_info[task_date] = {
                 "page_id": data["id"],
                 "task_date": task_date,
                 "last_edited_time": last_edited_time,
+                "last_edited_iso": data["last_edited_time"],  # Notion 原始 UTC 時間，用於增量查詢
                 "icon": data["icon"],
                 "parent": data["parent"],  # database id
                 "properties": data["properties"],
@@ -78,90 +162,438 @@ class PageOperator(RequestNotionDatabase):
 
         return pages_info
 
+
+class PageIndex(RequestNotionDatabase):
+    '''
+    PageIndex(RequestNotionDatabase): 任務日期 -> page_id, last_edited_time 的索引，儲存於本機資料庫的 PageIndex
+    註: 冷啟動(PageIndex 為空)時查詢一次整個 database，之後只以 last_edited_time 篩選增量更新，查詢日期時不需要發送請求
+    每個 page 另外記錄最後一次同步至資料庫時的 last_edited_time (synced_edited_iso) 與取得 block 的時間 (synced_at)，
+    兩者相同且取得 block 的時間晚於 last_edited_time 所在的分鐘時，表示 Notion 上沒有新的變動
+    索引由多個背景執行緒共用，pages 的讀寫皆需持有 lock
+
+    methods:
+    refresh(): 增量更新索引
+    get(): 取得日期對應的 page 資訊
+    dates(): 索引中所有的任務日期
+    is_synced(): 資料庫的資料是否為 Notion 的最新版本
+    mark_synced(): 記錄已將 page 的內容同步至資料庫
+    '''
+    MISS_TTL = 60  # 沒有 page 的日期在此秒數內不再查詢 (例如預先讀取的明天)
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db  # Storage.Storage
+        self.lock = threading.Lock()
+        self.pages: Dict[str, Dict] = {
+            page["task_date"]: page for page in self.db.find_page_index()}
+        self.missing: Dict[str, float] = dict()  # 沒有 page 的日期 -> 查詢的時間 (time.monotonic())
+
+        if not self.pages:
+            self.refresh()
+
+    def _watermark(self) -> str:
+        '''
+        _watermark(self): 回傳索引中最新的 last_edited_time (Notion 原始格式)，索引為空時回傳 None
+        '''
+        with self.lock:
+            times: List[str] = [page["last_edited_iso"]
+                                for page in self.pages.values() if page.get("last_edited_iso")]
+        return max(times) if times else None
+
+    def refresh(self) -> List[str]:
+        '''
+        refresh(self): 查詢 watermark 之後有變動的 page 並更新至索引，回傳有變動的任務日期
+        註: Notion 的 last_edited_time 精確度只到分鐘，使用 on_or_after 避免漏掉同一分鐘內的變動；
+            因此 watermark 的 page 每次都會再取得一次，內容沒有變動的 page 不寫入資料庫
+        '''
+        watermark: str = self._watermark()
+        filter: Dict = None
+        if watermark:
+            filter = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": watermark}
+            }
+
+        pages: Dict = self._analyze_pages(
+            self.query_database(filter=filter))
+
+        with self.lock:
+            changed: Dict = dict()
+            for date, page in pages.items():
+                current: Dict = self.pages.get(date, {})
+                # 較早開始的查詢可能較晚完成，不以舊的版本覆蓋
+                if current.get("last_edited_iso", '') > page["last_edited_iso"]:
+                    continue
+                if any(current.get(key) != value for key, value in page.items()):
+                    changed[date] = page
+
+            if changed:
+                self.db.upsert_page_index(list(changed.values()))
+                for date, page in changed.items():
+                    # 保留 synced_edited_iso 等只存在於索引的欄位
+                    self.pages[date] = dict(self.pages.get(date, {}), **page)
+                    self.missing.pop(date, None)
+
+        return list(changed.keys())
+
+    def dates(self) -> List[str]:
+        '''
+        dates(self): 回傳索引中所有的任務日期 (複本，可在其他執行緒更新索引時走訪)
+        '''
+        with self.lock:
+            return list(self.pages)
+
+    def is_synced(self, date: str) -> bool:
+        '''
+        is_synced(self, date: str): 回傳 date 的 page 在上次同步至資料庫後是否沒有變動 (需先 refresh() 取得最新的 last_edited_time)
+        註: Notion 的 last_edited_time 只精確到分鐘，同一分鐘內之後的修改不會改變 last_edited_time；
+            取得 block 的時間在該分鐘內 (或沒有紀錄) 時視為尚未同步，下一次同步時重新確認
+        '''
+        with self.lock:
+            page: Dict = self.pages.get(date)
+        if not (page and page.get("last_edited_iso")) or page.get("synced_edited_iso") != page["last_edited_iso"]:
+            return False
+
+        edited_minute: datetime = parse_notion_time(page["last_edited_iso"]).replace(second=0, microsecond=0)
+        return bool(page.get("synced_at")) and \
+            parse_notion_time(page["synced_at"]) >= edited_minute + timedelta(minutes=1)
+
+    def mark_synced(self, date: str, edited_iso: str = None, fetched_at: datetime = None):
+        '''
+        mark_synced(self, date: str, edited_iso: str = None, fetched_at: datetime = None): 記錄 date 的內容已同步至資料庫
+        edited_iso: 取得 block 前的 last_edited_time，未指定時使用索引中的值
+        fetched_at: 開始取得 block 的時間 (有時區)，未指定時使用目前的時間
+        '''
+        with self.lock:
+            page: Dict = self.pages.get(date)
+            if page is None:
+                return
+
+            synced: Dict = {
+                "task_date": date,
+                "synced_edited_iso": edited_iso or page.get("last_edited_iso"),
+                "synced_at": (fetched_at or datetime.now(timezone.utc)).isoformat(),
+            }
+            # 以新的 dict 取代，其他執行緒已取得的 page 資訊不會被修改
+            self.pages[date] = dict(page, **synced)
+            self.db.upsert_page_index([synced])
+
+    def get(self, date: str, default: Dict = None) -> Dict:
+        '''
+        get(self, date: str, default: Dict = None): 取得日期對應的 page 資訊，索引沒有時先增量更新一次(例如新建立的 page)
+        註: 增量更新後仍沒有 page 的日期，MISS_TTL 秒內再次查詢時直接回傳 default
+        '''
+        with self.lock:
+            page: Dict = self.pages.get(date)
+            missed: float = self.missing.get(date)
+        if page is not None:
+            return page
+        if missed is not None and time.monotonic() - missed < self.MISS_TTL:
+            return default
+
+        self.refresh()
+        with self.lock:
+            page = self.pages.get(date)
+            if page is None:
+                self.missing[date] = time.monotonic()
+        return page if page is not None else default
+
+    def __getitem__(self, date: str) -> Dict:
+        page: Dict = self.get(date)
+        if page is None:
+            raise KeyError(date)
+        return page
+
+    def __contains__(self, date: str) -> bool:
+        return self.get(date) is not None
+
+
+class PageOperator(RequestNotionDatabase):
+    MAX_CHILDREN = 100  # Notion 單次新增 children 的上限
+
+    def __init__(self, currentDate: str = None, page_index: PageIndex = None, max_depth: int = None):
+        super().__init__()
+        self.currentDate: str = currentDate if currentDate else str(
+            datetime.today().date())
+        self.max_depth: int = max_depth if max_depth else self._handle_max_depth()
+
+        if page_index is not None:
+            # 使用已建立的索引，不需要再查詢 database
+            self.data: List[Dict] = list()
+            self.pageObject = page_index
+        else:
+            # 僅查詢當前日期的 page，不需要取得整個 database
+            self.data: List[Dict] = list(self.query_database(
+                filter=self.date_filter(self.currentDate)))
+            self.pageObject: Dict = self._analyze_pages(self.data)
+        self.current_page_id: str = None
+        self.request_count: int = 0  # 取得 block 時送出的請求數量，用於估算同步的成本
+        self.count_lock = threading.Lock()
+
+    def _handle_max_depth(self) -> int:
+        '''
+        _handle_max_depth(self): 處理取得巢狀 block 的層數上限，可用環境變數 NOTION_MAX_DEPTH 設定 (預設 3)
+        註: 1 表示只取得 page 第一層的 block
+        '''
+        max_depth: str = os.getenv('NOTION_MAX_DEPTH', '3')
+        if not max_depth.isdigit() or int(max_depth) < 1:
+            raise ValueError('環境變數 NOTION_MAX_DEPTH 必須為正整數')
+
+        return int(max_depth)
+
+    def get_block_children(self, block_id: str) -> List[Dict]:
+        '''
+        get_block_children(self, block_id: str): 回傳 block (或 page) 的所有第一層 children
+        註: API 一次最多回傳 100 筆資料，此處依 next_cursor 取得全部分頁
+        '''
+        url: str = f'https://api.notion.com/v1/blocks/{block_id}/children'
+        params: Dict = {"page_size": 100}
+        children: List[Dict] = list()
+
+        while True:
+            response = self.client.get(
+                url=url, headers=self.header, params=params)
+            with self.count_lock:
+                self.request_count += 1
+            if response.status_code != 200:
+                raise SystemError("取得 Notion 頁面內容失敗，請稍後再執行")
+
+            body: Dict = response.json()
+            children.extend(body.get('results', []))
+
+            if not body.get('has_more') or not body.get('next_cursor'):
+                return children
+            params["start_cursor"] = body["next_cursor"]
+
+    @METRICS.timed('notion.page_tree', size=lambda page: len(page.get('results', [])))
     def get_page_json(self):
         '''
-        get_page_json(self): 回傳當前日期頁面的 json
+        get_page_json(self): 回傳當前日期頁面的 json，results 包含巢狀的 block (最多 self.max_depth 層)
+        註: 以廣度優先逐層取得，同一層的 block 以 _run_concurrently 並行請求 (仍受 NotionClient 限流)
+        註2: results 依頁面上的順序排列 (parent 在 children 之前)，每個 block 額外加上 depth，透過 parent 連結父 block
         '''
         page_id: str = self.pageObject[self.currentDate]["page_id"]
-        url: str = f'https://api.notion.com/v1/blocks/{page_id}/children'
         self.current_page_id = page_id
 
-        # 僅 100 筆以內的資料
-        response = requests.get(url=url, headers=self.header)
-        return response.json()
+        # - 廣度優先逐層取得 children -
+        children_map: Dict[str, List[Dict]] = dict()  # parent id -> children
+        level: List[str] = [page_id]
+        depth: int = 0
+
+        while level and depth < self.max_depth:
+            results, failures = self._run_concurrently(
+                self.get_block_children, level)
+            if failures:
+                raise next(iter(failures.values()))
+
+            next_level: List[str] = list()
+            for parent_id in level:
+                children_map[parent_id] = results[parent_id]
+                for block in results[parent_id]:
+                    block["depth"] = depth
+                    if block.get("has_children"):
+                        next_level.append(block["id"])
+
+            level = next_level
+            depth += 1
+        # - End. -
+
+        # - 依頁面順序展開成單一列表 -
+        blocks: List[Dict] = list()
+        stack: List[Dict] = list(reversed(children_map.get(page_id, [])))
+        while stack:
+            block = stack.pop()
+            blocks.append(block)
+            stack.extend(reversed(children_map.get(block["id"], [])))
+        # - End. -
+
+        return {
+            "object": "list",
+            "results": blocks,
+            "has_more": False,
+            "next_cursor": None,
+        }
 
-    def get_page_contents(self) -> List[Dict]:
+    def get_page_contents(self, blocks: List[Dict] = None) -> List[Dict]:
         '''
-        get_page_contents(self): 取得 page 的文字內容(如: text, to-do 等)
+        get_page_contents(self, blocks: List[Dict] = None): 取得 page 的文字內容(如: text, to-do 等)
+        blocks: 已取得的 get_page_json() results，未指定時向 Notion 請求
 
         回傳資訊的 Dict 包含:
         id: block 在 Notion 中的 id
-        parent: Notion 中父容器的 id 與類型
+        parent: Notion 中父容器的 id 與類型 (巢狀 block 的 parent 為 block_id)
+        depth: 巢狀層數，page 第一層為 0
         task_date: 當前日期 self.currentDate
         last_edited_time: Notion 中最後編輯時間
         type: block 中的類型 (如: to-do, paragraph, bullet-list)
+        以及 BlockType.parse() 的欄位，例如:
         checked: 如果是 to-do 類型，則有此 key 紀錄是否已勾選
-        content_text: 文字內容
+        rich_text: 精簡格式的文字片段 (RichText.from_notion)
+        content_text: 文字內容 (有文字的類型，空白時為 "")
         '''
 
-        data = self.get_page_json().get('results', [])
+        data = blocks if blocks is not None else self.get_page_json().get('results', [])
+        last_edited_time: str = self.pageObject[self.currentDate]["last_edited_time"]
         content_list: List[Dict] = list()
         for block in data:
             content_info: Dict = {
                 "id": block["id"],
                 "parent": block["parent"],
+                "depth": block["depth"],
                 "task_date": self.currentDate,
-                "last_edited_time": self.pageObject[self.currentDate]["last_edited_time"],
+                "last_edited_time": last_edited_time,
                 "type": block["type"],
             }
 
-            notion_type: Dict = block[block["type"]]
-            if block["type"] == "to_do":
-                content_info["checked"] = notion_type.get("checked", False)
-
-            if len(notion_type["rich_text"]) != 0:
-                content_text = notion_type["rich_text"][0].get(
-                    "plain_text", [])
-                content_info["content_text"] = content_text
+            # 各類型的欄位由 BlockTypes 定義，未支援的類型只保留共同欄位
+            content_info.update(get_block_type(
+                block["type"]).parse(block[block["type"]]))
 
             content_list.append(content_info)
 
         return content_list
 
-    def upload_page_data(self, data: List) -> int:
+    def delete_blocks(self, block_ids: List[str]) -> int:
         '''
-        upload_page_data(self, data: List): 向 Notion 傳送需要更新的資料, 回應 response code
-        註：data 必須符合 Notion API 的文件格式
-        註2：先刪除 page 內的所有物件再進行創建新的 block 動作
+        delete_blocks(self, block_ids: List[str]): 同時刪除多個 block (最多 self.max_workers 個請求並行)，回傳刪除數量
+        註: 所有請求完成後才統一回報失敗的 block，避免部分失敗時無法得知哪些已被刪除
         '''
-        page_id: str = self.pageObject[self.currentDate]["page_id"]
-        url: str = f'https://api.notion.com/v1/blocks/{page_id}/children'
-
-        # - 刪除 Notion 上舊有的資料 -
-        response = requests.get(url=url, headers=self.header)
-        old_blocks = response.json().get("results", [])
-
-        for block in old_blocks:
-            block_id = block["id"]
+        def delete(block_id: str) -> int:
             delete_url = f'https://api.notion.com/v1/blocks/{block_id}'
-            delete_response = requests.delete(delete_url, headers=self.header)
+            delete_response = self.client.delete(
+                delete_url, headers=self.header)
 
             if delete_response.status_code != 200:
-                raise SystemError("更新物件失敗，請稍後再執行")
-        # - End. -
+                raise SystemError(
+                    f'{delete_response.status_code} {delete_response.text[:200]}')
+            return delete_response.status_code
 
-        # 進行更新(創建)物件動作
-        payload = {
-            "children": data,
-        }
+        results, failures = self._run_concurrently(delete, block_ids)
+        if failures:
+            details: str = "\n".join(
+                f"{block_id}: {error}" for block_id, error in failures.items())
+            raise SystemError(
+                f"更新物件失敗，{len(failures)}/{len(block_ids)} 個物件刪除失敗，請稍後再執行\n{details}")
 
-        response = requests.patch(
-            url=url, headers=self.header, json=payload)
+        return len(results)
 
+    def _append_chunk(self, parent_id: str, blocks: List[Dict], after: str = None) -> List[Dict]:
+        '''
+        _append_chunk(self, parent_id: str, blocks: List[Dict], after: str = None): 以單一請求新增最多 MAX_CHILDREN 個 block，回傳新增的 block 物件
+        '''
+        url: str = f'https://api.notion.com/v1/blocks/{parent_id}/children'
+        payload: Dict = {"children": blocks}
+        if after:
+            payload["after"] = after
+
+        response = self.client.patch(
+            url=url, headers=self.header, json=payload)
         if response.status_code != 200:
             raise SystemError("更新物件失敗，請稍後再執行")
 
-        return response.status_code
+        created: List[Dict] = response.json().get("results", [])
+        if len(created) != len(blocks):
+            # 回傳的是 parent 的 children 列表時，取 after 之後的 block
+            start: int = len(created) - len(blocks)
+            if after:
+                start = next((index + 1 for index, block in enumerate(created)
+                              if block["id"] == after), start)
+            created = created[start:start + len(blocks)]
+
+        return created
+
+    def append_blocks(self, parent_id: str, blocks: List[Dict], after: str = None) -> List[Dict]:
+        '''
+        append_blocks(self, parent_id: str, blocks: List[Dict], after: str = None): 在 parent_id 底下新增 blocks，回傳新增的 block 物件
+        after: 新增在該 block id 之後，None 表示新增在最後
+        註: Notion 一次最多新增 100 個 children，超過時分批依序送出，下一批接在上一批最後一個 block 之後
+        註2: 途中失敗時拋出 PartialSyncError，created 為已確認新增的 block，可從最後一個 block 之後繼續新增剩下的部分
+        '''
+        created: List[Dict] = list()
+        for start in range(0, len(blocks), self.MAX_CHILDREN):
+            chunk: List[Dict] = blocks[start:start + self.MAX_CHILDREN]
+            try:
+                created.extend(self._append_chunk(
+                    parent_id, chunk, after=after))
+            except SystemError as error:
+                raise PartialSyncError(
+                    f"{error}\n已新增 {len(created)}/{len(blocks)} 個物件", created=created) from error
+
+            if created:
+                after = created[-1]["id"]
+
+        return created
+
+    def apply_sync_plan(self, plan: SyncPlan) -> List[Tuple[Dict, str]]:
+        '''
+        apply_sync_plan(self, plan: SyncPlan): 依 SyncPlan 發送更新、刪除與新增的請求，回傳 [(新增的資料庫文件, Notion block id)]
+        註: 更新、刪除與不同位置的新增以 _run_concurrently 並行處理
+        註2: 新增途中失敗時拋出 PartialSyncError，created 包含已新增的文件，寫回資料庫後重新同步即可從中斷處繼續
+        '''
+        def update(index: int) -> int:
+            block_id, block = plan.updates[index]
+            response = self.client.patch(url=f'https://api.notion.com/v1/blocks/{block_id}',
+                                         headers=self.header, json=block, idempotent=True)
+            if response.status_code != 200:
+                raise SystemError(
+                    f'{response.status_code} {response.text[:200]}')
+            return response.status_code
+
+        _, failures = self._run_concurrently(
+            update, list(range(len(plan.updates))))
+        if failures:
+            details: str = "\n".join(
+                f"{plan.updates[index][0]}: {error}" for index, error in failures.items())
+            raise SystemError(
+                f"更新物件失敗，{len(failures)}/{len(plan.updates)} 個物件更新失敗，請稍後再執行\n{details}")
+
+        self.delete_blocks(plan.deletes)
+
+        # - 新增 block -
+        # 不同位置 (parent 或 after 不同) 的新增互不影響，可以並行送出；同一位置的分批請求則依序送出
+        def append(index: int) -> List[Tuple[Dict, str]]:
+            parent_id, after, docs = plan.appends[index]
+            try:
+                blocks: List[Dict] = self.append_blocks(
+                    parent_id, [to_notion_block(doc) for doc in docs], after=after)
+            except PartialSyncError as error:
+                error.created = list(
+                    zip(docs, [block["id"] for block in error.created]))
+                raise
+
+            return list(zip(docs, [block["id"] for block in blocks]))
+
+        results, failures = self._run_concurrently(
+            append, list(range(len(plan.appends))))
+
+        created: List[Tuple[Dict, str]] = list()
+        for index in sorted(results):
+            created.extend(results[index])
+
+        if failures:
+            for error in failures.values():
+                created.extend(getattr(error, "created", []))
+            raise PartialSyncError(
+                "\n".join(str(error) for error in failures.values()), created=created)
+        # - End. -
+
+        return created
+
+    @METRICS.timed('notion.sync_page', size=len)
+    def sync_page_data(self, docs: List[Dict], remote_blocks: List[Dict] = None) -> List[Tuple[Dict, str]]:
+        '''
+        sync_page_data(self, docs: List[Dict], remote_blocks: List[Dict] = None): 比對資料庫文件與 Notion 上的 block，只送出有差異的請求，回傳 [(新增的資料庫文件, Notion block id)]
+        remote_blocks: 已取得的 get_page_json() results，未指定時向 Notion 請求
+        註: 未變動的 block 會保留原本的 id、留言與編輯紀錄
+        '''
+        if remote_blocks is None:
+            remote_blocks = self.get_page_json().get('results', [])
+        plan: SyncPlan = diff_blocks(docs, remote_blocks)
+        if plan.is_empty():
+            return list()
+
+        return self.apply_sync_plan(plan)
+
 
 # page_obj = PageOperator()
 # print(page_obj.get_page_contents())
@@ -0,0 +1,170 @@
+from BlockSync import longest_increasing_positions
+from typing import Dict, List, Tuple
+import uuid
+
+
+# 相鄰項目 order 的間隔，插入或移動時只需修改移動的文件
+ORDER_STEP = 1024
+
+# 舊版以 index 產生的 PyQt5 ObjectName，已由 key 取代
+LEGACY_FIELDS = ("content_ObjectName", "checkbox_ObjectName")
+
+
+def new_local_key() -> str:
+    '''
+    new_local_key(): 回傳在 Widget 新增的項目的 key (尚未同步至 Notion，沒有 block id)
+    '''
+    return f'local-{uuid.uuid4().hex}'
+
+
+def adopt_identity(docs: List[Dict], stored: List[Dict]):
+    '''
+    adopt_identity(docs: List[Dict], stored: List[Dict]): Notion 的 block 已存在於資料庫時，沿用資料庫文件的 _id, key 與 order
+    '''
+    stored_by_id: Dict[str, Dict] = {doc["id"]: doc for doc in stored
+                                     if doc.get("id") and "key" in doc}
+    used: set = {doc["key"] for doc in docs if "key" in doc}
+    for doc in docs:
+        match: Dict = stored_by_id.get(doc.get("id"))
+        if match is None or "key" in doc or match["key"] in used:
+            # key 已被其他文件使用 (例如本機保留的同一個 block) 時不沿用，由 assign_keys() 指定新的 key
+            continue
+        for field in ("_id", "key", "order"):
+            if field in match:
+                doc[field] = match[field]
+        used.add(match["key"])
+
+
+def _unique_keys(docs: List[Dict]) -> List[str]:
+    '''
+    _unique_keys(docs: List[Dict]): 回傳 docs 中已指定的 key，有重複的 key 時拋出 ValueError
+    '''
+    keys: List[str] = [doc["key"] for doc in docs if "key" in doc]
+    if len(set(keys)) != len(keys):
+        duplicates: List[str] = sorted({key for key in keys if keys.count(key) > 1})
+        raise ValueError(f'重複的 key: {", ".join(duplicates)}')
+    return keys
+
+
+def release_duplicate_keys(docs: List[Dict]) -> List[Dict]:
+    '''
+    release_duplicate_keys(docs: List[Dict]): 重複的 key 只保留第一份文件，其餘文件移除 key (之後由 assign_keys() 重新指定)，回傳被移除 key 的文件
+    '''
+    seen: set = set()
+    released: List[Dict] = list()
+    for doc in docs:
+        if "key" not in doc:
+            continue
+        if doc["key"] in seen:
+            doc.pop("key")
+            released.append(doc)
+        else:
+            seen.add(doc["key"])
+    return released
+
+
+def assign_keys(docs: List[Dict]) -> List[Dict]:
+    '''
+    assign_keys(docs: List[Dict]): 為沒有 key 的文件指定 key，回傳被指定的文件
+    曾與 Notion 同步的 block (有 base) 以 Notion block id 作為 key，其餘為新的 local key；key 指定後不再改變 (重新新增至 Notion 後 id 改變也相同)
+    已有的 key 重複時拋出 ValueError
+    '''
+    seen: set = set(_unique_keys(docs))
+    assigned: List[Dict] = list()
+    for doc in docs:
+        if "key" in doc:
+            continue
+
+        key: str = doc.get("id") if "base" in doc else None
+        if not key or key in seen:
+            key = new_local_key()
+        doc["key"] = key
+        seen.add(key)
+
+        for field in LEGACY_FIELDS:
+            doc.pop(field, None)
+        assigned.append(doc)
+    return assigned
+
+
+def next_order(docs: List[Dict]) -> int:
+    '''
+    next_order(docs: List[Dict]): 回傳加在 docs 最後的項目的 order
+    '''
+    orders: List[int] = [doc["order"] for doc in docs if doc.get("order") is not None]
+    return max(orders) + ORDER_STEP if orders else 0
+
+
+def assign_order(docs: List[Dict]) -> List[Dict]:
+    '''
+    assign_order(docs: List[Dict]): 依 docs 的順序設定 order，回傳 order 被修改的文件
+    相對順序不變的文件 (最長遞增子序列) 保留原本的 order，新增或移動的文件取前後文件之間的值；
+    間隔不足時才重新編號整天的文件
+    '''
+    # - 找出保留 order 的文件 (重複的 order 只保留第一個) -
+    orders: List[int] = list()
+    seen: set = set()
+    for doc in docs:
+        order = doc.get("order")
+        if isinstance(order, int) and order not in seen:
+            orders.append(order)
+            seen.add(order)
+    kept_orders = longest_increasing_positions(orders)
+
+    kept: List[bool] = list()
+    for doc in docs:
+        order = doc.get("order")
+        kept.append(order in kept_orders)
+        kept_orders.discard(order)
+    # - End. -
+
+    # - 連續需要設定 order 的文件，放在前後保留的文件之間 -
+    changed: List[Dict] = list()
+    start: int = 0
+    while start < len(docs):
+        if kept[start]:
+            start += 1
+            continue
+
+        end: int = start
+        while end < len(docs) and not kept[end]:
+            end += 1
+
+        count: int = end - start
+        low = docs[start - 1]["order"] if start > 0 else None
+        high = docs[end]["order"] if end < len(docs) else None
+        if low is None and high is None:
+            low, high = -ORDER_STEP, ORDER_STEP * count
+        elif low is None:
+            low = high - ORDER_STEP * (count + 1)
+        elif high is None:
+            high = low + ORDER_STEP * (count + 1)
+
+        if high - low <= count:
+            # 間隔不足，重新編號
+            changed = list()
+            for index, doc in enumerate(docs):
+                if doc.get("order") != index * ORDER_STEP:
+                    doc["order"] = index * ORDER_STEP
+                    changed.append(doc)
+            return changed
+
+        for offset, doc in enumerate(docs[start:end], start=1):
+            doc["order"] = low + (high - low) * offset // (count + 1)
+            changed.append(doc)
+        start = end
+    # - End. -
+
+    return changed
+
+
+def day_changes(stored: List[Dict], docs: List[Dict]) -> Tuple[List[Dict], List[str]]:
+    '''
+    day_changes(stored: List[Dict], docs: List[Dict]): 比對資料庫中的文件與新的文件 (以 key 對應)，回傳 (新增或修改的文件, 已移除的 key)
+    docs 的 key 重複時拋出 ValueError (update_day() 只會保留其中一份)
+    '''
+    stored_by_key: Dict[str, Dict] = {doc["key"]: doc for doc in stored}
+    keys: set = set(_unique_keys(docs))
+    changed: List[Dict] = [doc for doc in docs if stored_by_key.get(doc["key"]) != doc]
+    removed: List[str] = [key for key in stored_by_key if key not in keys]
+    return changed, removed
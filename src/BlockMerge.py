@@ -0,0 +1,178 @@
+from BlockTypes import get_block_type
+from typing import Dict, List
+
+
+# 三方合併比對的欄位，其餘欄位 (parent, depth 等) 以 Notion 為準
+MERGE_FIELDS = ('checked', 'content_text')
+
+
+class MergeConflictError(SystemError):
+    '''
+    MergeConflictError(SystemError): 本機與 Notion 修改了同一個 block 的同一個欄位，需要使用者選擇保留哪一邊
+    conflicts: merge_blocks() 回傳的衝突列表
+    '''
+
+    def __init__(self, date: str, conflicts: List[Dict], push: bool):
+        super().__init__(f'{date} 有 {len(conflicts)} 個項目在本機與 Notion 都被修改')
+        self.date: str = date
+        self.conflicts: List[Dict] = conflicts
+        self.push: bool = push  # 是否為上傳 Notion 的流程，解決衝突後以相同流程重新執行
+
+
+def snapshot(doc: Dict) -> Dict:
+    '''
+    snapshot(doc: Dict): 回傳 doc 中需要合併的欄位，作為之後三方合併的 base
+    '''
+    return {field: doc[field] for field in MERGE_FIELDS if field in doc}
+
+
+def migrate_legacy_docs(local_docs: List[Dict], remote_docs: List[Dict]) -> List[Dict]:
+    '''
+    migrate_legacy_docs(local_docs: List[Dict], remote_docs: List[Dict]): 為沒有 base 的舊版文件設定 base，回傳被修改的文件
+    block 仍存在於 Notion 時以 Notion 目前的內容作為 base (與 Notion 不同的欄位視為本機的修改)；
+    其餘的 id 無法與 Notion 對照 (舊版新增的項目以 page id 作為 id，或 block 已被刪除)，移除 id 並視為本機新增，避免未上傳的內容被刪除
+    註: 需在合併前呼叫，沒有 base 的文件在 merge_blocks() 中會被視為本機新增，造成同一個 block 出現兩份
+    '''
+    remote_by_id: Dict[str, Dict] = {doc["id"]: doc for doc in remote_docs}
+    migrated: List[Dict] = list()
+    for doc in local_docs:
+        if "base" in doc or not doc.get("id"):
+            continue
+
+        remote: Dict = remote_by_id.get(doc["id"])
+        if remote is not None and doc["id"] != (doc.get("parent") or {}).get("page_id"):
+            doc["base"] = snapshot(remote)
+        else:
+            doc.pop("id")
+        migrated.append(doc)
+    return migrated
+
+
+class MergeResult(object):
+    '''
+    MergeResult(): merge_blocks() 的結果
+
+    docs: 合併後的資料庫文件 (依頁面順序)
+    conflicts: [{"id", "key", "field", "base", "local", "remote"}]，field 為 "deleted" 表示 Notion 刪除了本機修改過的 block
+    '''
+
+    def __init__(self):
+        self.docs: List[Dict] = list()
+        self.conflicts: List[Dict] = list()
+
+
+def _conflict(doc: Dict, field: str, base, local, remote) -> Dict:
+    return {
+        "id": doc.get("id"),
+        "key": doc.get("key"),
+        "field": field,
+        "base": base,
+        "local": local,
+        "remote": remote,
+    }
+
+
+def _merge_fields(local: Dict, remote: Dict, result: MergeResult, resolution: str) -> Dict:
+    '''
+    _merge_fields(local: Dict, remote: Dict, result: MergeResult, resolution: str): 逐欄位合併同一個 block，回傳合併後的文件
+    只有一邊修改的欄位採用修改的一邊，兩邊改成不同的值時為衝突 (依 resolution 決定，未指定時保留本機並記錄衝突)
+    '''
+    base: Dict = local["base"]
+    merged: Dict = dict(local)
+    for key in ("parent", "depth", "type", "last_edited_time"):
+        merged[key] = remote[key]
+
+    for field in MERGE_FIELDS:
+        mine, theirs = local.get(field), remote.get(field)
+        if mine == theirs or mine == base.get(field):
+            value = theirs
+        elif theirs == base.get(field):
+            value = mine
+        elif resolution:
+            value = mine if resolution == 'local' else theirs
+        else:
+            result.conflicts.append(
+                _conflict(local, field, base.get(field), mine, theirs))
+            value = mine
+
+        if value is None:
+            merged.pop(field, None)
+        else:
+            merged[field] = value
+
+    # 文字樣式、顏色、icon 等只能在 Notion 修改，採用 Notion 的值；本機修改的文字於上傳時才套用 (RichText.apply_text_edit)
+    for key in get_block_type(remote["type"]).notion_fields:
+        if key in remote:
+            merged[key] = remote[key]
+        else:
+            merged.pop(key, None)
+
+    # 合併後 base 為 Notion 目前的狀態，只在本機修改的欄位仍會被視為本機的修改
+    merged["base"] = snapshot(remote)
+    return merged
+
+
+def merge_blocks(local_docs: List[Dict], remote_docs: List[Dict], resolution: str = None) -> MergeResult:
+    '''
+    merge_blocks(local_docs: List[Dict], remote_docs: List[Dict], resolution: str = None): 以 base 快照將本機與 Notion 的內容做三方合併
+    local_docs: 資料庫的文件 (依頁面順序)，有 base 表示曾與 Notion 同步，沒有 base 的文件為本機新增
+    remote_docs: PageOperator.get_page_contents() 的結果
+    resolution: 'local' 或 'remote'，衝突時採用的一邊；未指定時衝突記錄於 MergeResult.conflicts
+
+    註: Notion 新增的 block 加入本機；Notion 刪除且本機未修改的 block 從本機移除
+    本機新增的 block 依本機順序放在前一個仍存在的 block (包含其 children) 之後
+    '''
+    result = MergeResult()
+    remote_by_id: Dict[str, Dict] = {doc["id"]: doc for doc in remote_docs}
+    local_by_id: Dict[str, Dict] = {doc["id"]: doc for doc in local_docs
+                                    if "base" in doc and doc.get("id") in remote_by_id}
+
+    # - 本機新增或 Notion 已刪除的文件，依附在前一個仍存在的 block 之後 -
+    attached: Dict[str, List[Dict]] = dict()  # remote block id (None 為最前面) -> 文件
+    anchor: str = None
+    for doc in local_docs:
+        if doc.get("id") in local_by_id:
+            anchor = doc["id"]
+            continue
+
+        if "base" in doc:
+            # Notion 已刪除，本機沒有修改時一併刪除
+            changed: bool = snapshot(doc) != doc["base"]
+            if not changed or resolution == 'remote':
+                continue
+            if not resolution:
+                result.conflicts.append(
+                    _conflict(doc, "deleted", doc["base"], snapshot(doc), None))
+            # 保留本機的內容，上傳時重新新增
+            doc = {key: value for key, value in doc.items()
+                   if key not in ("id", "base")}
+
+        attached.setdefault(anchor, list()).append(doc)
+    # - End. -
+
+    # - 依 Notion 的順序合併，本機新增的文件等到離開 anchor 的 children 後才放入 -
+    waiting: List[Dict] = list(attached.get(None, []))
+
+    def release(depth: int):
+        ready = [doc for doc in waiting if doc.get("depth", 0) >= depth]
+        result.docs.extend(ready)
+        waiting[:] = [doc for doc in waiting if doc.get("depth", 0) < depth]
+
+    for remote in remote_docs:
+        release(remote.get("depth", 0))
+
+        local: Dict = local_by_id.get(remote["id"])
+        if local is None:
+            # Notion 新增的 block
+            doc: Dict = dict(remote)
+            doc["base"] = snapshot(remote)
+        else:
+            doc: Dict = _merge_fields(local, remote, result, resolution)
+        result.docs.append(doc)
+
+        waiting.extend(attached.get(remote["id"], []))
+
+    release(0)
+    # - End. -
+
+    return result
@@ -0,0 +1,232 @@
+from BlockTypes import get_block_type
+from typing import Dict, List
+import hashlib
+import json
+
+
+def is_creatable(block_type: str) -> bool:
+    '''
+    is_creatable(block_type: str): 回傳 block 類型是否可以透過 API 重新建立 (BlockTypes 中註冊的類型)
+    '''
+    return get_block_type(block_type).creatable
+
+
+def local_block_body(doc: Dict) -> Dict:
+    '''
+    local_block_body(doc: Dict): 將資料庫的文件轉成 Notion block 內容 (block[type] 的部分)
+    '''
+    return get_block_type(doc["type"]).serialize(doc)
+
+
+def remote_block_body(block: Dict) -> Dict:
+    '''
+    remote_block_body(block: Dict): 將 Notion 回傳的 block 整理成與 local_block_body() 相同的格式，用於比對內容
+    註: 與 PageOperator.get_page_contents() 相同經過 BlockType.parse()，未修改的 block 會得到相同的 hash
+    '''
+    block_type = get_block_type(block["type"])
+    return block_type.serialize(block_type.parse(block[block["type"]]))
+
+
+def content_hash(block_type: str, body: Dict) -> str:
+    '''
+    content_hash(block_type: str, body: Dict): 回傳 block 類型與內容的 hash，用於判斷 block 是否需要更新
+    '''
+    raw: str = json.dumps([block_type, body], sort_keys=True,
+                          ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def parent_id_of(item: Dict) -> str:
+    '''
+    parent_id_of(item: Dict): 回傳 Notion block 或資料庫文件的父容器 id (page_id 或 block_id)
+    '''
+    parent: Dict = item.get("parent") or {}
+    return parent.get(parent.get("type"))
+
+
+def to_notion_block(doc: Dict) -> Dict:
+    '''
+    to_notion_block(doc: Dict): 將資料庫的文件轉成新增 block 時的 Notion API 格式
+    '''
+    return {
+        "object": "block",
+        "type": doc["type"],
+        doc["type"]: local_block_body(doc),
+    }
+
+
+def longest_increasing_positions(positions: List[int]) -> set:
+    '''
+    longest_increasing_positions(positions: List[int]): 回傳最長遞增子序列中的 positions 集合
+    用於找出相對順序沒有改變的 block，這些 block 保留在原位置，其餘視為移動
+    '''
+    tails: List[int] = list()  # tails[k]: 長度 k+1 的遞增子序列結尾在 positions 中的 index
+    previous: List[int] = [-1] * len(positions)
+
+    for index, position in enumerate(positions):
+        low, high = 0, len(tails)
+        while low < high:
+            middle = (low + high) // 2
+            if positions[tails[middle]] < position:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low > 0:
+            previous[index] = tails[low - 1]
+        if low == len(tails):
+            tails.append(index)
+        else:
+            tails[low] = index
+
+    kept = set()
+    index = tails[-1] if tails else -1
+    while index != -1:
+        kept.add(positions[index])
+        index = previous[index]
+
+    return kept
+
+
+class SyncPlan(object):
+    '''
+    SyncPlan(): 資料庫與 Notion 內容的差異，即同步所需的最少請求
+
+    updates: [(block_id, notion block)]，內容改變的 block，使用 PATCH /blocks/{id}
+    deletes: [block_id]，Notion 上已不存在於資料庫的 block (或需要移動位置的 block)
+    appends: [(parent_id, after_block_id, [doc])]，需要新增在 parent_id 底下的連續 block 與其前一個 block 的 id，None 表示附加在最後
+    '''
+
+    def __init__(self):
+        self.updates: List = list()
+        self.deletes: List[str] = list()
+        self.appends: List = list()
+
+    def is_empty(self) -> bool:
+        return not (self.updates or self.deletes or self.appends)
+
+
+def _is_pinned(doc: Dict, remote: Dict) -> bool:
+    '''
+    _is_pinned(doc: Dict, remote: Dict): 回傳 block 是否需要固定在 Notion 上的位置 (不支援的類型或含有 children，無法完整重新建立)
+    '''
+    if remote is None or remote["type"] != doc["type"]:
+        return False
+    return not is_creatable(doc["type"]) or bool(remote.get("has_children"))
+
+
+def _diff_siblings(parent_id: str, local_docs: List[Dict], remote_blocks: List[Dict], plan: SyncPlan):
+    '''
+    _diff_siblings(parent_id, local_docs, remote_blocks, plan): 比對同一個父容器底下的 block，將請求加入 plan
+    註: 固定位置的 block (_is_pinned()) 不移動，也不參與順序的比對，只比對其餘 block 之間的相對順序
+    '''
+    remote_position: Dict[str, int] = {
+        block["id"]: position for position, block in enumerate(remote_blocks)}
+    remote_by_id: Dict[str, Dict] = {block["id"]: block for block in remote_blocks}
+
+    # - 找出仍存在且相對順序不變的 block -
+    retained: List[Dict] = [
+        doc for doc in local_docs if doc.get("id") in remote_position
+        and not _is_pinned(doc, remote_by_id[doc["id"]])]
+    in_place = longest_increasing_positions(
+        [remote_position[doc["id"]] for doc in retained])
+    # - End. -
+
+    # - 依資料庫順序產生新增與更新的請求 -
+    anchor: str = None  # 目前最後一個保留在原位置的 block id
+    run: List[Dict] = list()  # 連續需要新增的 block
+    leading_run: bool = False  # 第一個保留的 block 之前有需要新增的 block
+    floor: int = None  # 最前面的新增改放在固定的 block 之後時，該 block 在 Notion 的位置
+
+    for doc in local_docs:
+        block_id: str = doc.get("id")
+        remote: Dict = remote_by_id.get(block_id)
+        if remote is None and not is_creatable(doc["type"]):
+            continue  # 無法重新建立不支援的 block
+
+        pinned: bool = _is_pinned(doc, remote)
+        stays: bool = pinned or (remote is not None and remote["type"] == doc["type"]
+                                 and remote_position[block_id] in in_place)
+
+        if stays and not pinned and (leading_run or (floor is not None and remote_position[block_id] < floor)):
+            stays = False  # 前面有新增的 block，需要重新排在其後
+
+        if not stays:
+            if remote is not None:
+                plan.deletes.append(block_id)
+            if anchor is None:
+                leading_run = True
+            run.append(doc)
+            continue
+
+        if run and anchor is None:
+            # Notion 無法在第一個 block 之前新增，固定的 block 也無法移動：
+            # 最前面的新增改放在此 block 之後，Notion 上位置在此 block 之前的 block 也需要重新新增
+            floor = remote_position[block_id]
+            leading_run = False
+        elif run:
+            plan.appends.append((parent_id, anchor, run))
+            run = list()
+
+        anchor = block_id
+        if not is_creatable(doc["type"]):
+            continue
+
+        local_body: Dict = local_block_body(doc)
+        if content_hash(doc["type"], local_body) != content_hash(remote["type"], remote_block_body(remote)):
+            plan.updates.append((block_id, {doc["type"]: local_body}))
+
+    if run:
+        plan.appends.append((parent_id, anchor, run))
+    # - End. -
+
+    # - 資料庫中已不存在的 block -
+    local_ids = {doc.get("id") for doc in local_docs}
+    plan.deletes.extend(
+        block["id"] for block in remote_blocks if block["id"] not in local_ids)
+    # - End. -
+
+
+def diff_blocks(local_docs: List[Dict], remote_blocks: List[Dict]) -> SyncPlan:
+    '''
+    diff_blocks(local_docs: List[Dict], remote_blocks: List[Dict]): 以 block id 與內容 hash 比對資料庫與 Notion 的 block，回傳 SyncPlan
+    註: 依父容器分組比對，巢狀的 block 只與同一層的 block 比較順序
+    註2: Notion API 無法移動 block，順序改變的 block 以刪除後重新新增處理；
+        Notion 也無法在第一個 block 之前插入，因此有新增至最前面的 block 時，後面原有的 block 都需要重新新增
+    註3: 不支援的 block 類型 (is_creatable() 為 False) 與含有 children 的 block 無法完整重新建立，只要仍存在於資料庫就保持原樣且不移動；
+        這些 block 之前的新增會放在其後 (已知的限制)，之後再比對時不視為差異，不會重複刪除與新增
+    '''
+    plan = SyncPlan()
+
+    # - 依父容器分組 (保持原本順序) -
+    local_groups: Dict[str, List[Dict]] = dict()
+    for doc in local_docs:
+        local_groups.setdefault(parent_id_of(doc), list()).append(doc)
+
+    remote_groups: Dict[str, List[Dict]] = dict()
+    for block in remote_blocks:
+        remote_groups.setdefault(parent_id_of(block), list()).append(block)
+    # - End. -
+
+    for parent_id in list(local_groups) + [key for key in remote_groups if key not in local_groups]:
+        _diff_siblings(parent_id, local_groups.get(parent_id, []),
+                       remote_groups.get(parent_id, []), plan)
+
+    # - 刪除父 block 時底下的 block 會一併刪除，不需要另外發送請求 -
+    remote_parent: Dict[str, str] = {
+        block["id"]: parent_id_of(block) for block in remote_blocks}
+    deleted = set(plan.deletes)
+
+    def has_deleted_ancestor(block_id: str) -> bool:
+        parent_id: str = remote_parent.get(block_id)
+        while parent_id in remote_parent:
+            if parent_id in deleted:
+                return True
+            parent_id = remote_parent[parent_id]
+        return False
+
+    plan.deletes = [block_id for block_id in plan.deletes
+                    if not has_deleted_ancestor(block_id)]
+    # - End. -
+
+    return plan
@@ -0,0 +1,172 @@
+from RichText import apply_text_edit, from_notion, plain_text, to_notion
+from typing import Dict, Tuple
+
+
+class BlockType(object):
+    '''
+    BlockType(): 一種 Notion block 類型的處理方式，讀取 (parse)、顯示 (render)、上傳 (serialize) 都只在此定義一次
+    預設為沒有文字的 block (例如 divider)
+
+    attributes:
+    has_text: 是否有可編輯的文字 (content_text)
+    checkable: 是否有勾選框 (checked)
+    creatable: 是否可以透過 API 重新建立，不能建立的類型只保留原樣，不修改也不移動
+    notion_fields: 只能在 Notion 修改的欄位，三方合併時採用 Notion 的值
+    heading: 標題層級 (0 表示不是標題)，顯示時放大字體
+
+    methods:
+    parse(): block[type] -> 資料庫文件的欄位
+    serialize(): 資料庫文件 -> block[type]
+    render(): 資料庫文件 -> 顯示的文字
+    new_fields(): 在 Widget 新增項目時的預設欄位
+    '''
+    has_text: bool = False
+    checkable: bool = False
+    creatable: bool = True
+    notion_fields: Tuple[str, ...] = ()
+    heading: int = 0
+
+    def __init__(self, name: str, prefix: str = ''):
+        self.name: str = name
+        self.prefix: str = prefix
+
+    def parse(self, body: Dict) -> Dict:
+        return dict()
+
+    def serialize(self, doc: Dict) -> Dict:
+        return dict()
+
+    def render(self, doc: Dict, number: int = None) -> str:
+        return self.prefix
+
+    def new_fields(self) -> Dict:
+        return dict()
+
+
+class TextBlockType(BlockType):
+    '''
+    TextBlockType(BlockType): 以 rich_text 為內容的 block (paragraph, 列表, 標題, toggle, quote 等)
+    '''
+    has_text: bool = True
+    notion_fields: Tuple[str, ...] = ("rich_text", "color")
+
+    def __init__(self, name: str, prefix: str = '', heading: int = 0):
+        super().__init__(name, prefix)
+        self.heading: int = heading
+
+    def parse(self, body: Dict) -> Dict:
+        segments = from_notion(body.get("rich_text", []))
+        fields: Dict = {"content_text": plain_text(segments)}
+        if segments:
+            fields["rich_text"] = segments
+        if body.get("color", "default") != "default":
+            fields["color"] = body["color"]
+        return fields
+
+    def serialize(self, doc: Dict) -> Dict:
+        '''
+        serialize(self, doc: Dict): content_text 被修改時只改寫修改的範圍，其餘文字保留原本的樣式、連結與 mention
+        '''
+        content_text: str = doc.get("content_text", "")
+        segments = apply_text_edit(doc.get("rich_text") or [], content_text)
+        body: Dict = {"rich_text": to_notion(segments) if content_text else []}
+        if doc.get("color"):
+            body["color"] = doc["color"]
+        return body
+
+    def render(self, doc: Dict, number: int = None) -> str:
+        return self.prefix + doc.get("content_text", "")
+
+    def new_fields(self) -> Dict:
+        return {"content_text": ""}
+
+
+class ToDoBlockType(TextBlockType):
+    checkable: bool = True
+
+    def parse(self, body: Dict) -> Dict:
+        fields: Dict = super().parse(body)
+        fields["checked"] = body.get("checked", False)
+        return fields
+
+    def serialize(self, doc: Dict) -> Dict:
+        body: Dict = super().serialize(doc)
+        body["checked"] = doc.get("checked", False)
+        return body
+
+    def new_fields(self) -> Dict:
+        return {"checked": False, "content_text": ""}
+
+
+class NumberedBlockType(TextBlockType):
+    def render(self, doc: Dict, number: int = None) -> str:
+        return f'{number or 1}. ' + doc.get("content_text", "")
+
+
+class CalloutBlockType(TextBlockType):
+    notion_fields: Tuple[str, ...] = ("rich_text", "color", "icon")
+
+    def parse(self, body: Dict) -> Dict:
+        fields: Dict = super().parse(body)
+        if body.get("icon"):
+            fields["icon"] = body["icon"]
+        return fields
+
+    def serialize(self, doc: Dict) -> Dict:
+        body: Dict = super().serialize(doc)
+        if doc.get("icon"):
+            body["icon"] = doc["icon"]
+        return body
+
+    def render(self, doc: Dict, number: int = None) -> str:
+        icon: Dict = doc.get("icon") or {}
+        emoji: str = icon.get("emoji", self.prefix) if icon.get("type") == "emoji" else self.prefix
+        return f'{emoji}  ' + doc.get("content_text", "")
+
+
+class UnknownBlockType(BlockType):
+    '''
+    UnknownBlockType(BlockType): 尚未支援的類型 (例如 image, table)，只顯示類型名稱，上傳時保持 Notion 上的原樣
+    '''
+    creatable: bool = False
+
+    def render(self, doc: Dict, number: int = None) -> str:
+        return f'[{self.name}]'
+
+
+BLOCK_TYPES: Dict[str, BlockType] = dict()
+_UNKNOWN_TYPES: Dict[str, BlockType] = dict()
+
+
+def register(block_type: BlockType) -> BlockType:
+    '''
+    register(block_type: BlockType): 註冊 block 類型，相同名稱會取代原本的定義
+    '''
+    BLOCK_TYPES[block_type.name] = block_type
+    return block_type
+
+
+def get_block_type(name: str) -> BlockType:
+    '''
+    get_block_type(name: str): 回傳 name 的 BlockType，未註冊的類型回傳 UnknownBlockType
+    '''
+    block_type: BlockType = BLOCK_TYPES.get(name)
+    if block_type is None:
+        block_type = _UNKNOWN_TYPES.setdefault(name, UnknownBlockType(name))
+    return block_type
+
+
+for _block_type in (
+    TextBlockType('paragraph'),
+    TextBlockType('bulleted_list_item', prefix='•  '),
+    NumberedBlockType('numbered_list_item'),
+    ToDoBlockType('to_do'),
+    TextBlockType('toggle', prefix='▸  '),
+    TextBlockType('quote', prefix='│  '),
+    TextBlockType('heading_1', heading=1),
+    TextBlockType('heading_2', heading=2),
+    TextBlockType('heading_3', heading=3),
+    CalloutBlockType('callout', prefix='💡'),
+    BlockType('divider', prefix='─' * 16),
+):
+    register(_block_type)
@@ -1,43 +1,79 @@
-from typing import Dict, List
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from pymongo import ASCENDING, DeleteMany, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from Storage import Storage, retry_delay
 import pymongo
 import os
 
 
-class DBOperation(object):
+class DBOperation(Storage):
     """
-    DBOperation(): 處理與資料庫的 CRUD 操作
+    DBOperation(Storage): 以 MongoDB 作為本機資料庫，處理與資料庫的 CRUD 操作
 
     methods:
     get_data()
     insert_data()
     update_data()
     delete_data()
+    bulk_update()
+    replace_day()
+    update_day()
+    find_page_index()
+    upsert_page_index()
+    record_operations()
+    find_pending_operations()
+    mark_operations_done()
+    mark_operations_failed()
+    discard_operations()
     """
 
-    def __init__(self):
+    def __init__(self, database: str = 'NotionTask'):
         '''
-        __init__(self): 連接 MongoDB 資料庫，並創建 NotionTask 資料庫與 TaskList Collection
+        __init__(self, database: str = 'NotionTask'): 連接 MongoDB 資料庫，並創建 database 資料庫與 TaskList, PageIndex, SyncQueue Collection
         '''
         mongodb: str = os.getenv('LOCAL_MONGODB')
         if not mongodb:
             raise ValueError('環境變數沒有找到 LOCAL_MONGODB 的值')
 
         client = pymongo.MongoClient(mongodb)
-        self.db = client['NotionTask']
+        self.client = client
+        self.db = client[database]
         self.collection = self.db['TaskList']
+        self.page_index = self.db['PageIndex']  # 任務日期 -> Notion page 的索引
+        self.sync_queue = self.db['SyncQueue']  # 尚未同步至 Notion 的操作紀錄
+        self._create_indexes()
+
+    def _create_indexes(self):
+        '''
+        _create_indexes(self): 建立查詢與更新時使用的索引，索引已存在時不會重複建立
+        註: 更新內容時以 task_date + key 查詢，讀取一天的資料時依 task_date + order 排序
+        舊版以 ObjectName 建立的索引已不再使用，一併移除
+        '''
+        for name in self.collection.index_information():
+            if 'ObjectName' in name:
+                self.collection.drop_index(name)
+
+        self.collection.create_index([("task_date", ASCENDING), ("key", ASCENDING)])
+        self.collection.create_index([("task_date", ASCENDING), ("order", ASCENDING)])
+        self.page_index.create_index([("task_date", ASCENDING)], unique=True)
+        self.sync_queue.create_index(
+            [("status", ASCENDING), ("next_attempt_at", ASCENDING)])
 
     def find_data(self, query: Dict = {}) -> List[Dict]:
         '''
-        find_data(self, query: Dict = {}): 回傳符合 query 條件的所有資料
+        find_data(self, query: Dict = {}): 回傳符合 query 條件的所有資料 (依 task_date, order 排序，沒有 order 的舊資料依 _id 即寫入順序)
         '''
-        return list(self.collection.find(query))
+        return list(self.collection.find(query).sort(
+            [("task_date", ASCENDING), ("order", ASCENDING), ("_id", ASCENDING)]))
 
     def insert_data(self, data: List[Dict]) -> List:
         '''
         insert_data(self, data: List[Dict]): 插入 Data 資料 (單筆或多筆資料皆可)，回傳 ids
         '''
-        ids = self.collection.insert_many(data)
-        return ids
+        if not data:
+            return list()
+
+        return self.collection.insert_many(data).inserted_ids
 
     def update_data(self, query, new_data):
         '''
@@ -54,6 +90,127 @@ class DBOperation(object):
         delete_result = self.collection.delete_many(query)
         return delete_result.deleted_count
 
+    def bulk_update(self, operations: List[Tuple[Dict, Dict]]) -> int:
+        '''
+        bulk_update(self, operations: List[Tuple[Dict, Dict]]): 以單次 bulk_write 依序執行多筆 (query, new_data) 更新，回傳 update_count
+        '''
+        if not operations:
+            return 0
+
+        requests = [UpdateMany(query, {"$set": new_data})
+                    for query, new_data in operations]
+        result = self.collection.bulk_write(requests, ordered=True)
+        return result.modified_count
+
+    def replace_day(self, date: str, data: List[Dict]) -> int:
+        '''
+        replace_day(self, date: str, data: List[Dict]): 以單次 bulk_write 刪除 date 的所有資料並插入 data，回傳插入數量
+        '''
+        requests = [DeleteMany({"task_date": date})]
+        requests.extend(InsertOne(doc) for doc in data)
+        result = self.collection.bulk_write(requests, ordered=True)
+        return result.inserted_count
+
+    def update_day(self, date: str, docs: List[Dict], removed_keys: List[str]) -> int:
+        '''
+        update_day(self, date: str, docs: List[Dict], removed_keys: List[str]): 以單次 bulk_write 依 key 取代 (或新增) docs 並刪除 removed_keys，回傳寫入與刪除的數量
+        '''
+        requests = list()
+        if removed_keys:
+            requests.append(DeleteMany({"task_date": date, "key": {"$in": removed_keys}}))
+        requests.extend(ReplaceOne({"task_date": date, "key": doc["key"]},
+                                   {key: value for key, value in doc.items() if key != "_id"}, upsert=True)
+                        for doc in docs)
+        if not requests:
+            return 0
+
+        result = self.collection.bulk_write(requests, ordered=True)
+        return result.upserted_count + result.modified_count + result.deleted_count
+
+    def find_page_index(self) -> List[Dict]:
+        '''
+        find_page_index(self): 回傳 PageIndex 中所有任務日期的 page 資訊
+        '''
+        return list(self.page_index.find({}, {"_id": 0}))
+
+    def upsert_page_index(self, pages: List[Dict]) -> int:
+        '''
+        upsert_page_index(self, pages: List[Dict]): 以 task_date 為 key 新增或更新 page 資訊 (單次 bulk_write)，回傳 upsert + modified 數量
+        '''
+        if not pages:
+            return 0
+
+        operations = [UpdateOne({"task_date": page["task_date"]}, {"$set": page}, upsert=True)
+                      for page in pages]
+        result = self.page_index.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    def record_operations(self, operations: List[Dict]) -> int:
+        '''
+        record_operations(self, operations: List[Dict]): 將操作紀錄 (op: create / update / delete, task_date, target) 加入 SyncQueue，回傳新增數量
+        註: 每筆紀錄會加上 status, attempts, next_attempt_at 等重試狀態
+        '''
+        if not operations:
+            return 0
+
+        now = datetime.now()
+        records = [dict(operation, status="pending", attempts=0, last_error=None,
+                        created_at=now, next_attempt_at=now) for operation in operations]
+        return len(self.sync_queue.insert_many(records).inserted_ids)
+
+    def find_pending_operations(self, limit: int = 200) -> List[Dict]:
+        '''
+        find_pending_operations(self, limit: int = 200): 回傳已到重試時間、尚未同步的操作紀錄 (依建立時間排序)
+        '''
+        query = {"status": "pending", "next_attempt_at": {"$lte": datetime.now()}}
+        return list(self.sync_queue.find(query).sort("created_at", ASCENDING).limit(limit))
+
+    def pending_dates(self) -> List[str]:
+        '''
+        pending_dates(self): 回傳仍有尚未同步操作的日期 (不論重試時間)
+        '''
+        return self.sync_queue.distinct("task_date", {"status": "pending"})
+
+    def mark_operations_done(self, ids: List) -> int:
+        '''
+        mark_operations_done(self, ids: List): 將操作紀錄標記為已同步，回傳 update_count
+        '''
+        if not ids:
+            return 0
+
+        result = self.sync_queue.update_many({"_id": {"$in": ids}}, {
+            "$set": {"status": "done", "synced_at": datetime.now()}})
+        return result.modified_count
+
+    def mark_operations_failed(self, operations: List[Dict], error: str, base_delay: int = 30, max_delay: int = 3600) -> int:
+        '''
+        mark_operations_failed(self, operations: List[Dict], error: str): 紀錄同步失敗，並依失敗次數延後下次重試時間 (exponential backoff)，回傳 update_count
+        '''
+        if not operations:
+            return 0
+
+        now = datetime.now()
+        requests = list()
+        for operation in operations:
+            attempts: int = operation.get("attempts", 0) + 1
+            delay: int = retry_delay(attempts, base_delay, max_delay)
+            requests.append(UpdateOne({"_id": operation["_id"]}, {"$set": {
+                "attempts": attempts,
+                "last_error": error,
+                "next_attempt_at": now + timedelta(seconds=delay),
+            }}))
+
+        result = self.sync_queue.bulk_write(requests, ordered=False)
+        return result.modified_count
+
+    def discard_operations(self, date: str) -> int:
+        '''
+        discard_operations(self, date: str): 捨棄 date 尚未同步的操作紀錄 (例如已改用 Notion 的資料)，回傳 update_count
+        '''
+        result = self.sync_queue.update_many({"task_date": date, "status": "pending"}, {
+            "$set": {"status": "discarded"}})
+        return result.modified_count
+
 
 # db_test = DBOperation()
 # db_test.insert_data([{'key': "value"}])
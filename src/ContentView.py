@@ -0,0 +1,266 @@
+from PyQt5.QtWidgets import QApplication, QAbstractItemView, QFrame, QListView, QPlainTextEdit, QStyle, QStyledItemDelegate, QStyleOptionViewItem, QWidget
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, pyqtSignal
+from PyQt5.QtGui import QFont
+from BlockTypes import BlockType, get_block_type
+from typing import Dict, List
+
+
+class ContentModel(QAbstractListModel):
+    '''
+    ContentModel(QAbstractListModel): 內容區塊的資料，每一列對應資料庫的一份文件，以 key (Notion block id 或本機產生的 id) 作為識別
+    顯示的文字、是否可編輯或勾選由 BlockTypes 中各類型的定義決定，未支援的類型只顯示類型名稱
+
+    methods:
+    reconcile(): 依新的資料只新增、移除、移動或更新有差異的列
+    row_of(): 回傳 key 所在的列
+    document(): 回傳 key 對應的文件
+    '''
+    edited = pyqtSignal(object, str)  # (被修改的文件, 修改的欄位 content_text 或 checked)
+
+    KeyRole = Qt.UserRole + 1
+    TypeRole = Qt.UserRole + 2
+
+    HEADING_SIZES = {1: 4, 2: 2, 3: 1}  # 標題層級 -> 放大的字體大小 (pt)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.datas: List[Dict] = list()
+        self.rows: Dict[str, int] = dict()  # key -> 列，以 O(1) 找到文件
+        self.numbers: List[int] = list()  # numbered_list_item 的編號，其餘為 None
+        self.read_only: bool = False  # 顯示啟動時的快照等尚未載入完成的資料時不允許修改
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.datas)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        data: Dict = self.datas[index.row()]
+        block_type: BlockType = get_block_type(data["type"])
+        if role == Qt.DisplayRole:
+            indent: str = '    ' * data.get("depth", 0)  # 巢狀 block 依層數縮排
+            return indent + block_type.render(data, self.numbers[index.row()])
+
+        if role == Qt.EditRole:
+            return data.get("content_text", "")
+
+        if role == Qt.CheckStateRole and block_type.checkable:
+            return Qt.Checked if data.get("checked", False) else Qt.Unchecked
+
+        if role == Qt.FontRole and block_type.heading:
+            font = QFont()
+            font.setBold(True)
+            font.setPointSize(font.pointSize() +
+                              self.HEADING_SIZES.get(block_type.heading, 0))
+            return font
+
+        if role == self.KeyRole:
+            return data["key"]
+
+        if role == self.TypeRole:
+            return data["type"]
+
+        return None
+
+    def flags(self, index: QModelIndex):
+        if not index.isValid():
+            return Qt.NoItemFlags
+
+        block_type: BlockType = get_block_type(self.datas[index.row()]["type"])
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if self.read_only:
+            return flags
+        if block_type.has_text:
+            flags |= Qt.ItemIsEditable
+        if block_type.checkable:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def setData(self, index: QModelIndex, value, role: int = Qt.EditRole) -> bool:
+        '''
+        setData(self, index, value, role): 使用者修改內容或勾選狀態時更新文件，並發送 edited signal
+        '''
+        if not index.isValid():
+            return False
+
+        data: Dict = self.datas[index.row()]
+        block_type: BlockType = get_block_type(data["type"])
+        if role == Qt.EditRole and block_type.has_text:
+            if value == data.get("content_text", ""):
+                return False
+            data["content_text"] = value
+            field: str = "content_text"
+
+        elif role == Qt.CheckStateRole and block_type.checkable:
+            data["checked"] = int(value) == Qt.Checked
+            field: str = "checked"
+
+        else:
+            return False
+
+        self.dataChanged.emit(index, index, [role])
+        self.edited.emit(data, field)
+        return True
+
+    def row_of(self, key: str) -> int:
+        '''
+        row_of(self, key: str): 回傳 key 所在的列，不存在時回傳 -1
+        '''
+        return self.rows.get(key, -1)
+
+    def document(self, key: str) -> Dict:
+        '''
+        document(self, key: str): 回傳 key 對應的文件，不存在時回傳 None
+        '''
+        row: int = self.row_of(key)
+        return self.datas[row] if row != -1 else None
+
+    def _index_rows(self, start: int = 0, end: int = None):
+        # 更新 start 到 end (不含) 之間的列在 rows 中的位置
+        end = len(self.datas) if end is None else end
+        for row in range(start, end):
+            self.rows[self.datas[row]["key"]] = row
+
+    def reconcile(self, datas: List[Dict]):
+        '''
+        reconcile(self, datas: List[Dict]): 比對目前的列與 datas，只處理新增、移除、順序或內容改變的列
+        註: 列的位置不變時不會通知 view 重新排版，順序不變時每一列只查詢一次 rows
+        '''
+        keys = {data["key"] for data in datas}
+
+        # - 移除已不存在的列 -
+        removed: bool = False
+        for row in range(len(self.datas) - 1, -1, -1):
+            if self.datas[row]["key"] not in keys:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.rows[self.datas[row]["key"]]
+                del self.datas[row]
+                del self.numbers[row]
+                self.endRemoveRows()
+                removed = True
+        if removed:
+            self._index_rows()
+        # - End. -
+
+        # - 依序新增、移動或更新列 (index 之前的列已與 datas 相同，因此 row 只會在 index 之後) -
+        for index, data in enumerate(datas):
+            row: int = self.row_of(data["key"])
+            if row == -1:
+                self.beginInsertRows(QModelIndex(), index, index)
+                self.datas.insert(index, data)
+                self.numbers.insert(index, None)
+                self.endInsertRows()
+                self._index_rows(index)
+                continue
+
+            if row != index:
+                self.beginMoveRows(QModelIndex(), row, row,
+                                   QModelIndex(), index)
+                self.datas.insert(index, self.datas.pop(row))
+                self.numbers.insert(index, self.numbers.pop(row))
+                self.endMoveRows()
+                self._index_rows(index, row + 1)
+
+            changed: bool = self.datas[index] != data
+            self.datas[index] = data
+            if changed:
+                model_index = self.index(index)
+                self.dataChanged.emit(model_index, model_index)
+        # - End. -
+
+        self._update_numbers()
+
+    def _update_numbers(self):
+        '''
+        _update_numbers(self): 重新計算 numbered_list_item 的編號 (同一層連續的項目依序編號)，只通知編號改變的列
+        '''
+        counters: Dict[int, int] = dict()  # depth -> 目前的編號
+        for row, data in enumerate(self.datas):
+            depth: int = data.get("depth", 0)
+            for deeper in [key for key in counters if key > depth]:
+                del counters[deeper]
+
+            if data["type"] == 'numbered_list_item':
+                counters[depth] = counters.get(depth, 0) + 1
+            else:
+                counters.pop(depth, None)
+
+            number: int = counters.get(depth)
+            if self.numbers[row] != number:
+                self.numbers[row] = number
+                model_index = self.index(row)
+                self.dataChanged.emit(model_index, model_index)
+
+
+class ContentDelegate(QStyledItemDelegate):
+    '''
+    ContentDelegate(QStyledItemDelegate): 繪製內容區塊的列，只有正在編輯的列才建立編輯元件
+    '''
+
+    ROW_HEIGHT = 25
+
+    def createEditor(self, parent: QWidget, option, index: QModelIndex) -> QWidget:
+        editor = QPlainTextEdit(parent)
+        editor.setFrameShape(QFrame.NoFrame)
+        editor.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        editor.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        font = index.data(Qt.FontRole)
+        if font is not None:
+            editor.setFont(font)  # 標題編輯時維持相同的字體
+
+        # 每次輸入都交給 model，由 write_buffer 合併後再寫入資料庫
+        editor.textChanged.connect(lambda: self.commitData.emit(editor))
+        return editor
+
+    def setEditorData(self, editor: QPlainTextEdit, index: QModelIndex):
+        text: str = index.data(Qt.EditRole)
+        if editor.toPlainText() != text:  # 避免 commitData 後重設游標位置
+            editor.setPlainText(text)
+
+    def setModelData(self, editor: QPlainTextEdit, model: ContentModel, index: QModelIndex):
+        model.setData(index, editor.toPlainText(), Qt.EditRole)
+
+    def updateEditorGeometry(self, editor: QWidget, option, index: QModelIndex):
+        '''
+        updateEditorGeometry(self, editor, option, index): 編輯元件只覆蓋文字區域，不遮住 to_do 的勾選框
+        '''
+        style_option = QStyleOptionViewItem(option)
+        self.initStyleOption(style_option, index)
+        widget = style_option.widget
+        style = widget.style() if widget else QApplication.style()
+        editor.setGeometry(style.subElementRect(
+            QStyle.SE_ItemViewItemText, style_option, widget))
+
+    def sizeHint(self, option, index: QModelIndex) -> QSize:
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+
+class ContentView(QListView):
+    '''
+    ContentView(QListView): 內容區塊，只繪製可見的列，編輯元件在需要時才建立
+    項目數量增加時，記憶體與繪製時間不會跟著增加
+
+    methods:
+    reconcile(): 將顯示內容更新為 datas
+    '''
+
+    def __init__(self, parent: QWidget = None):
+        super().__init__(parent)
+        self.content_model = ContentModel(self)
+        self.setModel(self.content_model)
+        self.setItemDelegate(ContentDelegate(self))
+
+        self.setUniformItemSizes(True)  # 所有列高度相同，不需逐列計算排版
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setEditTriggers(QAbstractItemView.CurrentChanged |
+                             QAbstractItemView.SelectedClicked | QAbstractItemView.EditKeyPressed)
+        # 背景與邊框由 ThemeResources 的樣式表設定
+
+    def reconcile(self, datas: List[Dict], read_only: bool = False):
+        '''
+        reconcile(self, datas: List[Dict], read_only: bool = False): 將顯示內容更新為 datas，只處理有差異的列
+        read_only: 是否禁止修改 (例如啟動時的快照)
+        '''
+        self.content_model.read_only = read_only
+        self.content_model.reconcile(datas)
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from typing import Dict
+import threading
+import json
+
+
+class DayCache(object):
+    '''
+    DayCache(): 以 task_date 為 key 的 LRU 快取，保存已整理好的當日資料 (_load_task_data 的結果)
+    同時限制筆數與估計的大小，超過時移除最久未使用的日期；可於背景執行緒使用
+
+    methods:
+    get(): 取得快取的資料
+    put(): 寫入快取
+    version(): 取得日期目前的版本，用於避免寫入過期的資料
+    invalidate(): 使快取失效
+    '''
+
+    def __init__(self, max_entries: int = 14, max_bytes: int = 2 * 1024 * 1024):
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.entries: OrderedDict = OrderedDict()  # task_date -> (payload, size)
+        self.versions: Dict[str, int] = dict()  # task_date -> 失效次數
+        self.total_bytes: int = 0
+        self.lock = threading.Lock()
+
+    def _estimate_size(self, payload: Dict) -> int:
+        '''
+        _estimate_size(self, payload: Dict): 以 JSON 長度估計資料大小
+        '''
+        return len(json.dumps(payload, default=str, ensure_ascii=False))
+
+    def get(self, date: str) -> Dict:
+        '''
+        get(self, date: str): 回傳 date 的快取資料並標記為最近使用，沒有時回傳 None
+        '''
+        with self.lock:
+            entry = self.entries.get(date)
+            if entry is None:
+                return None
+
+            self.entries.move_to_end(date)
+            return entry[0]
+
+    def version(self, date: str) -> int:
+        '''
+        version(self, date: str): 回傳 date 目前的版本，開始讀取資料前取得，寫入快取時一併傳入
+        '''
+        with self.lock:
+            return self.versions.get(date, 0)
+
+    def put(self, date: str, payload: Dict, version: int = None) -> bool:
+        '''
+        put(self, date: str, payload: Dict, version: int = None): 寫入快取，回傳是否寫入
+        version: 讀取資料前取得的版本，期間若已失效 (例如使用者修改了內容) 則不寫入
+        '''
+        size: int = self._estimate_size(payload)
+        with self.lock:
+            if version is not None and version != self.versions.get(date, 0):
+                return False
+            if size > self.max_bytes:
+                return False
+
+            self._remove(date)
+            self.entries[date] = (payload, size)
+            self.total_bytes += size
+
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+
+        return True
+
+    def _remove(self, date: str):
+        entry = self.entries.pop(date, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def invalidate(self, date: str = None):
+        '''
+        invalidate(self, date: str = None): 使 date 的快取失效，未指定時清空全部
+        '''
+        with self.lock:
+            dates = [date] if date else list(
+                set(self.entries) | set(self.versions))
+            for target in dates:
+                self._remove(target)
+                self.versions[target] = self.versions.get(target, 0) + 1
+
+    def __contains__(self, date: str) -> bool:
+        with self.lock:
+            return date in self.entries
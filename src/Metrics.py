@@ -0,0 +1,198 @@
+from contextlib import contextmanager
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, List
+import functools
+import threading
+import json
+import time
+import os
+
+
+class OperationStats(object):
+    '''
+    OperationStats(): 單一操作的統計，延遲的百分位數以最近 window 筆的樣本計算
+    '''
+
+    def __init__(self, window: int):
+        self.count: int = 0
+        self.errors: int = 0
+        self.retries: int = 0
+        self.total_seconds: float = 0.0
+        self.payload: int = 0  # HTTP 為 byte 數，資料庫為文件數，畫面為列數
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float, size: int, retries: int, error: bool):
+        self.count += 1
+        self.errors += int(error)
+        self.retries += retries
+        self.total_seconds += seconds
+        self.payload += size
+        self.samples.append(seconds)
+
+    def summary(self) -> Dict:
+        ordered: List[float] = sorted(self.samples)
+
+        def percentile(percent: int) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "sum_seconds": self.total_seconds,
+            "payload": self.payload,
+            "p50": percentile(50),
+            "p95": percentile(95),
+            "p99": percentile(99),
+        }
+
+
+class MetricsRegistry(object):
+    '''
+    MetricsRegistry(): 記錄各操作 (Notion API, 資料庫, 畫面更新) 的次數、延遲、payload 大小與重試次數，所有執行緒共用
+    可用環境變數 NOTION_WIDGET_METRICS=0 停用 (observe() 不記錄任何資料)
+
+    methods:
+    observe(): 記錄一次操作
+    timer(): 以 with 區塊記錄一次操作的時間
+    timed(): 記錄函式每次呼叫的時間 (decorator)
+    snapshot(): 回傳所有操作的統計
+    to_json(), to_prometheus(): 匯出統計
+    export(): 依副檔名 (.json / .prom) 寫入檔案
+    reset(): 清除所有統計
+    '''
+    PREFIX = 'notion_widget_operation'
+
+    def __init__(self, enabled: bool = True, window: int = 2048):
+        self.enabled: bool = enabled
+        self.window: int = window
+        self.stats: Dict[str, OperationStats] = dict()
+        self.lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, size: int = 0, retries: int = 0, error: bool = False):
+        '''
+        observe(self, name: str, seconds: float, size: int = 0, retries: int = 0, error: bool = False): 記錄一次 name 操作
+        '''
+        if not self.enabled:
+            return
+
+        with self.lock:
+            stats: OperationStats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = OperationStats(self.window)
+            stats.add(seconds, size, retries, error)
+
+    @contextmanager
+    def timer(self, name: str, size: int = 0) -> Iterator[Dict]:
+        '''
+        timer(self, name: str, size: int = 0): 記錄 with 區塊的執行時間，區塊中可修改 yield 的 dict 的 size, retries, error
+        發生例外時記錄為 error 並重新拋出
+        '''
+        record: Dict = {"size": size, "retries": 0, "error": False}
+        started: float = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record["error"] = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started,
+                         record["size"], record["retries"], record["error"])
+
+    def timed(self, name: str, size: Callable = None) -> Callable:
+        '''
+        timed(self, name: str, size: Callable = None): 記錄函式每次呼叫的時間，size(result) 回傳 payload 大小
+        '''
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name) as record:
+                    result = func(*args, **kwargs)
+                    if size is not None:
+                        record["size"] = size(result)
+                return result
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        '''
+        snapshot(self): 回傳 {操作名稱: {"count", "errors", "retries", "sum_seconds", "payload", "p50", "p95", "p99"}}，延遲單位為秒
+        '''
+        with self.lock:
+            return {name: stats.summary() for name, stats in sorted(self.stats.items())}
+
+    def to_json(self) -> str:
+        return json.dumps({"generated_at": time.time(), "operations": self.snapshot()},
+                          ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        '''
+        to_prometheus(self): 以 Prometheus text format (summary) 匯出，可由 node_exporter 的 textfile collector 收集
+        '''
+        snapshot: Dict[str, Dict] = self.snapshot()
+        lines: List[str] = [
+            f'# HELP {self.PREFIX}_seconds Latency of widget operations (recent samples).',
+            f'# TYPE {self.PREFIX}_seconds summary',
+        ]
+        for name, stats in snapshot.items():
+            label: str = _label(name)
+            for field, quantile in (("p50", "0.5"), ("p95", "0.95"), ("p99", "0.99")):
+                lines.append(f'{self.PREFIX}_seconds{{operation="{label}",quantile="{quantile}"}} '
+                             f'{stats[field]:.6f}')
+            lines.append(f'{self.PREFIX}_seconds_sum{{operation="{label}"}} {stats["sum_seconds"]:.6f}')
+            lines.append(f'{self.PREFIX}_seconds_count{{operation="{label}"}} {stats["count"]}')
+
+        for metric, field, description in (
+                ('errors_total', 'errors', 'Failed widget operations.'),
+                ('retries_total', 'retries', 'Retries performed by widget operations.'),
+                ('payload_total', 'payload', 'Payload size (bytes for HTTP, documents for DB, rows for render).')):
+            lines.append(f'# HELP {self.PREFIX}_{metric} {description}')
+            lines.append(f'# TYPE {self.PREFIX}_{metric} counter')
+            for name, stats in snapshot.items():
+                lines.append(f'{self.PREFIX}_{metric}{{operation="{_label(name)}"}} {stats[field]}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str):
+        '''
+        export(self, path: str): 將統計寫入 path，副檔名為 .prom 時使用 Prometheus text format，其餘為 JSON
+        註: 先寫入暫存檔再取代，收集程式不會讀到不完整的檔案
+        '''
+        text: str = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        directory: str = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path: str = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(temp_path, path)
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _result_size(result) -> int:
+    # 回傳 list 的操作以文件數量為 payload，回傳數量的操作直接使用該數量
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return 0
+
+
+def instrument_methods(obj, prefix: str, names: Iterable[str]):
+    '''
+    instrument_methods(obj, prefix: str, names: Iterable[str]): 將 obj 的方法換成記錄時間的版本 (只影響此物件)，操作名稱為 prefix.方法名稱
+    '''
+    for name in names:
+        method: Callable = getattr(obj, name)
+        setattr(obj, name, METRICS.timed(f'{prefix}.{name}', size=_result_size)(method))
+    return obj
+
+
+METRICS = MetricsRegistry(enabled=os.getenv('NOTION_WIDGET_METRICS', '1') != '0')
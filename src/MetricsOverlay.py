@@ -0,0 +1,78 @@
+from PyQt5.QtWidgets import QLabel, QWidget
+from PyQt5.QtCore import Qt, QTimer
+from Metrics import METRICS, MetricsRegistry
+from typing import Dict, List
+import os
+
+
+class MetricsOverlay(QLabel):
+    '''
+    MetricsOverlay(QLabel): 覆蓋在視窗上的除錯資訊，列出花費時間最多的操作 (次數, p50/p95/p99, 重試, payload)
+    顯示時每秒更新一次，隱藏時不更新；不接收滑鼠事件，不影響視窗的操作
+    樣式由 ThemeResources 的樣式表設定 (#metrics-overlay)
+
+    methods:
+    toggle(): 顯示或隱藏
+    refresh(): 重新產生內容
+    export(): 將統計匯出為 JSON 與 Prometheus text format
+    '''
+
+    def __init__(self, parent: QWidget, registry: MetricsRegistry = METRICS, limit: int = 12, interval_ms: int = 1000):
+        super().__init__(parent)
+        self.registry: MetricsRegistry = registry
+        self.limit: int = limit  # 顯示的操作數量
+
+        self.setObjectName('metrics-overlay')
+        self.setTextFormat(Qt.PlainText)
+        self.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        if self.isVisible():
+            self.timer.stop()
+            self.hide()
+            return
+
+        self.refresh()
+        self.show()
+        self.raise_()
+        self.timer.start()
+
+    def refresh(self):
+        '''
+        refresh(self): 依總花費時間排序，顯示前 limit 個操作，延遲單位為 ms
+        '''
+        snapshot: Dict[str, Dict] = self.registry.snapshot()
+        names: List[str] = sorted(snapshot, key=lambda name: snapshot[name]["sum_seconds"],
+                                  reverse=True)[:self.limit]
+
+        lines: List[str] = [f'{"operation":<34}{"n":>6}{"p50":>8}{"p95":>8}{"p99":>8}{"retry":>6}{"payload":>10}']
+        for name in names:
+            stats: Dict = snapshot[name]
+            lines.append(f'{name[:33]:<34}{stats["count"]:>6}'
+                         f'{stats["p50"] * 1000:>8.1f}{stats["p95"] * 1000:>8.1f}{stats["p99"] * 1000:>8.1f}'
+                         f'{stats["retries"]:>6}{stats["payload"]:>10}')
+        if not names:
+            lines.append('(尚無資料)')
+
+        self.setText('\n'.join(lines))
+        parent: QWidget = self.parentWidget()
+        self.setGeometry(0, 0, parent.width(), parent.height())
+
+    def export(self, directory: str = None) -> List[str]:
+        '''
+        export(self, directory: str = None): 將統計寫入 directory 的 metrics.json 與 metrics.prom，回傳檔案路徑
+        directory 未指定時使用環境變數 NOTION_WIDGET_METRICS_DIR (預設 ~/.notion-widget)
+        '''
+        directory = directory if directory else os.getenv(
+            'NOTION_WIDGET_METRICS_DIR', os.path.expanduser('~/.notion-widget'))
+        paths: List[str] = [os.path.join(directory, 'metrics.json'),
+                            os.path.join(directory, 'metrics.prom')]
+        for path in paths:
+            self.registry.export(path)
+        return paths
@@ -0,0 +1,194 @@
+from requests.adapters import HTTPAdapter
+from Metrics import METRICS
+from typing import Dict, Tuple
+from urllib.parse import urlparse
+import threading
+import random
+import time
+import requests
+import re
+
+
+_ID_SEGMENT = re.compile(r'/[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}(?=/|$)')
+
+
+def _endpoint(url: str) -> str:
+    '''
+    _endpoint(url: str): 將 url 的 path 中的 page / block id 換成 {id}，相同 API 的請求合併統計
+    '''
+    return _ID_SEGMENT.sub('/{id}', urlparse(url).path)
+
+
+def _body_size(body) -> int:
+    if body is None:
+        return 0
+    return len(body.encode('utf-8') if isinstance(body, str) else body)
+
+
+class RateLimiter(object):
+    '''
+    RateLimiter(): Token bucket 限流器，所有執行緒共用同一個 bucket
+    註: Notion API 的限制約為平均每秒 3 個請求
+    https://developers.notion.com/reference/request-limits
+
+    methods:
+    acquire(): 取得一個 token，不足時等待
+    pause(): 暫停發送請求 (收到 429 Retry-After 時使用)
+    '''
+
+    def __init__(self, rate: float = 3.0, capacity: int = 3):
+        self.rate: float = rate  # 每秒補充的 token 數
+        self.capacity: int = capacity  # 允許的瞬間請求數
+        self.tokens: float = capacity
+        self.updated: float = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens +
+                          (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        '''
+        acquire(self): 取得一個 token，bucket 為空時等待到下一個 token 補充為止
+        '''
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait: float = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        '''
+        pause(self, seconds: float): 清空 bucket，讓所有執行緒至少等待 seconds 秒後才能再發送請求
+        '''
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+class NotionClient(object):
+    '''
+    NotionClient(): 所有 Notion API 請求共用的 HTTP client
+    使用 requests.Session 保持連線 (keep-alive) 並重複使用 connection pool，
+    搭配 RateLimiter 限流、429 Retry-After 與暫時性錯誤的 jitter exponential backoff 重試，以及每個請求的 timeout
+
+    methods:
+    shared(): 取得共用的 NotionClient
+    request(): 發送請求
+    get(), post(), patch(), delete()
+    '''
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    IDEMPOTENT_METHODS = {'GET', 'DELETE'}
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, rate: float = 3.0, max_retries: int = 5, backoff: float = 0.5,
+                 max_backoff: float = 30.0, timeout: Tuple[float, float] = (5.0, 30.0), pool_size: int = 10):
+        self.max_retries: int = max_retries
+        self.backoff: float = backoff  # 第一次重試的基準等待秒數
+        self.max_backoff: float = max_backoff
+        self.timeout: Tuple[float, float] = timeout  # (connect, read) 秒數，避免連線卡住時視窗無回應
+        self.limiter = RateLimiter(rate=rate)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def shared(cls) -> 'NotionClient':
+        '''
+        shared(cls): 回傳所有 RequestNotionDatabase 共用的 NotionClient，第一次呼叫時建立
+        '''
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _backoff_delay(self, attempt: int) -> float:
+        '''
+        _backoff_delay(self, attempt: int): 回傳第 attempt 次重試前的等待秒數 (full jitter)
+        '''
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _retry_after(self, response: requests.Response, attempt: int) -> float:
+        '''
+        _retry_after(self, response, attempt: int): 優先使用 Retry-After header 的秒數，沒有時使用 backoff
+        '''
+        retry_after: str = response.headers.get('Retry-After')
+        try:
+            return max(float(retry_after), 0.0)
+        except (TypeError, ValueError):
+            return self._backoff_delay(attempt)
+
+    def request(self, method: str, url: str, headers: Dict = None, idempotent: bool = None, **kwargs) -> requests.Response:
+        '''
+        request(self, method: str, url: str, headers: Dict = None, idempotent: bool = None, **kwargs): 發送請求並回傳 response
+        註: 429 一律重試 (Notion 未處理該請求)；5xx 與連線中斷只有 idempotent 的請求才重試，避免重複新增 block
+        註2: idempotent 預設依 method 判斷 (GET, DELETE)，查詢或更新單一 block 等請求可由呼叫端指定
+        '''
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in self.IDEMPOTENT_METHODS
+        kwargs.setdefault('timeout', self.timeout)
+
+        with METRICS.timer(f'notion.{method} {_endpoint(url)}') as record:
+            response = self._send(method, url, headers, idempotent, record, **kwargs)
+            record["size"] = len(response.content) + _body_size(response.request.body)
+            record["error"] = response.status_code >= 400
+        return response
+
+    def _send(self, method: str, url: str, headers: Dict, idempotent: bool, record: Dict, **kwargs) -> requests.Response:
+        '''
+        _send(self, method, url, headers, idempotent, record, **kwargs): request() 的重試迴圈，重試次數寫入 record["retries"]
+        '''
+        attempt: int = 0
+        while True:
+            record["retries"] = attempt
+            with METRICS.timer('notion.rate_limit_wait'):
+                self.limiter.acquire()
+            try:
+                response = self.session.request(
+                    method, url, headers=headers, **kwargs)
+
+            except (requests.ConnectionError, requests.Timeout) as error:
+                # 連線逾時代表請求尚未送出，可以安全重試
+                retryable: bool = idempotent or isinstance(
+                    error, requests.ConnectTimeout)
+                if not retryable or attempt >= self.max_retries:
+                    raise SystemError('Notion API 連線失敗，請稍後再執行') from error
+
+                time.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            status: int = response.status_code
+            retryable: bool = status == 429 or (
+                idempotent and status in self.RETRY_STATUS)
+            if not retryable or attempt >= self.max_retries:
+                return response
+
+            delay: float = self._retry_after(response, attempt)
+            if status == 429:
+                self.limiter.pause(delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
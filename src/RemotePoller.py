@@ -0,0 +1,143 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from collections import deque
+from typing import Callable, Dict
+from Workers import TaskDispatcher
+import time
+import os
+
+
+class RequestBudget(object):
+    '''
+    RequestBudget(): 限制每分鐘可使用的請求數量 (滑動視窗)，讓背景輪詢遠低於 Notion 的速率限制
+
+    methods:
+    remaining(): 目前視窗內剩餘的請求數量
+    spend(): 記錄使用的請求數量
+    '''
+
+    def __init__(self, per_minute: int, window: float = 60.0):
+        self.per_minute: int = per_minute
+        self.window: float = window
+        self.spent: deque = deque()  # (時間, 請求數量)
+
+    def _expire(self):
+        now: float = time.monotonic()
+        while self.spent and now - self.spent[0][0] >= self.window:
+            self.spent.popleft()
+
+    def remaining(self) -> int:
+        self._expire()
+        return self.per_minute - sum(count for _, count in self.spent)
+
+    def spend(self, count: int):
+        self.spent.append((time.monotonic(), count))
+
+
+class RemotePoller(QObject):
+    '''
+    RemotePoller(QObject): 定期於背景以 last_edited_time 查詢 Notion 的變動並合併至資料庫
+    沒有變動或視窗閒置時逐步拉長間隔，使用者操作時縮短間隔；每分鐘的請求數量受 RequestBudget 限制
+    可用環境變數 NOTION_POLL_BUDGET 設定每分鐘的請求上限 (預設 12)，設為 0 時停用輪詢
+
+    methods:
+    start(): 開始輪詢
+    note_activity(): 使用者有操作，縮短輪詢間隔
+    trigger(): 立即執行一次輪詢 (已在執行時忽略)
+    '''
+    finished = pyqtSignal(object)  # poll() 的結果 {"changed": [task_date], "requests": int}
+
+    def __init__(self, dispatcher: TaskDispatcher, poll: Callable, is_busy: Callable = None,
+                 min_interval_ms: int = 15000, max_interval_ms: int = 300000, idle_ms: int = 120000,
+                 parent: QObject = None):
+        super().__init__(parent)
+        self.dispatcher: TaskDispatcher = dispatcher
+        self.poll: Callable = poll  # poll(max_requests: int) -> Dict，例如 HandleAPIandDB.poll_remote_changes
+        self.is_busy: Callable = is_busy  # 回傳 True 時延後輪詢 (例如尚有未寫入的修改)
+
+        self.min_interval_ms: int = min_interval_ms
+        self.max_interval_ms: int = max_interval_ms
+        self.idle_ms: int = idle_ms
+        self.interval_ms: int = min_interval_ms
+        self.last_activity: float = time.monotonic()
+
+        self.budget = RequestBudget(self._handle_budget())
+        self.running: bool = False
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.trigger)
+
+    def _handle_budget(self) -> int:
+        '''
+        _handle_budget(self): 處理每分鐘的請求上限，可用環境變數 NOTION_POLL_BUDGET 設定 (預設 12)
+        '''
+        budget: str = os.getenv('NOTION_POLL_BUDGET', '12')
+        if not budget.isdigit():
+            raise ValueError('環境變數 NOTION_POLL_BUDGET 必須為非負整數')
+
+        return int(budget)
+
+    def start(self):
+        if self.budget.per_minute > 0:
+            self._schedule()
+
+    def _is_idle(self) -> bool:
+        return (time.monotonic() - self.last_activity) * 1000 >= self.idle_ms
+
+    def _schedule(self):
+        '''
+        _schedule(self): 依目前的間隔安排下一次輪詢，視窗閒置時使用最長間隔
+        '''
+        if self.budget.per_minute <= 0:
+            return
+        interval: int = self.max_interval_ms if self._is_idle() else self.interval_ms
+        self.timer.start(interval)
+
+    def note_activity(self):
+        '''
+        note_activity(self): 使用者有操作 (切換日期、編輯、切換回視窗)，恢復最短間隔
+        '''
+        self.last_activity = time.monotonic()
+        self.interval_ms = self.min_interval_ms
+
+        if not self.running and self.timer.isActive() and self.timer.remainingTime() > self.interval_ms:
+            self._schedule()
+
+    def trigger(self):
+        '''
+        trigger(self): 於背景執行一次輪詢，完成後發送 finished signal
+        '''
+        if self.running:
+            return
+
+        remaining: int = self.budget.remaining()
+        if remaining < 1 or (self.is_busy and self.is_busy()):
+            self._schedule()
+            return
+
+        self.running = True
+        self.timer.stop()
+        self.dispatcher.submit(key='remote-poll', func=lambda: self.poll(remaining),
+                               on_result=self._on_finished, on_error=self._on_error)
+
+    def _on_finished(self, result: Dict):
+        self.running = False
+        self.budget.spend(result["requests"])
+
+        # 有變動時維持最短間隔，否則逐步加倍
+        if result["changed"]:
+            self.interval_ms = self.min_interval_ms
+        else:
+            self.interval_ms = min(self.interval_ms * 2, self.max_interval_ms)
+        if "error" in result:
+            self.interval_ms = self.max_interval_ms
+
+        self._schedule()
+        self.finished.emit(result)
+
+    def _on_error(self, error: Exception):
+        # 離線或資料庫無法連線，以最長間隔等待下一次輪詢
+        self.running = False
+        self.budget.spend(1)
+        self.interval_ms = self.max_interval_ms
+        self._schedule()
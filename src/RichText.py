@@ -0,0 +1,177 @@
+from typing import Dict, List
+
+
+# Notion 預設的文字樣式，精簡格式只保存與預設不同的部分
+DEFAULT_ANNOTATIONS = {
+    "bold": False,
+    "italic": False,
+    "strikethrough": False,
+    "underline": False,
+    "code": False,
+    "color": "default",
+}
+
+# 可以透過 API 新增的 mention 類型 (其餘類型以文字與連結保存)
+CREATABLE_MENTIONS = {'page', 'database', 'date', 'user'}
+
+MAX_TEXT_LENGTH = 2000  # Notion 單一 text 物件的字數上限
+
+# 精簡格式的文字片段 (segment):
+# {"text": 顯示文字, "annotations": {與預設不同的樣式}, "href": 連結, "mention": {...}, "equation": 公式}
+# 除了 text 以外的欄位只在需要時存在
+
+
+def _mention_body(mention: Dict) -> Dict:
+    '''
+    _mention_body(mention: Dict): 保留新增 mention 時需要的欄位，不能新增的類型回傳 None
+    '''
+    mention_type: str = mention.get("type")
+    if mention_type not in CREATABLE_MENTIONS:
+        return None
+    if mention_type == 'user':
+        return {"type": "user", "user": {"id": mention["user"]["id"]}}
+    return {"type": mention_type, mention_type: mention[mention_type]}
+
+
+def from_notion(rich_text: List[Dict]) -> List[Dict]:
+    '''
+    from_notion(rich_text: List[Dict]): 將 Notion 的 rich_text 轉成精簡格式的 segment 列表
+    '''
+    segments: List[Dict] = list()
+    for item in rich_text:
+        segment: Dict = {"text": item.get("plain_text", "")}
+
+        annotations: Dict = item.get("annotations") or {}
+        changed: Dict = {key: value for key, value in annotations.items()
+                         if DEFAULT_ANNOTATIONS.get(key) != value}
+        if changed:
+            segment["annotations"] = changed
+
+        if item.get("href"):
+            segment["href"] = item["href"]
+
+        if item.get("type") == 'mention':
+            mention: Dict = _mention_body(item.get("mention") or {})
+            if mention:
+                segment["mention"] = mention
+        elif item.get("type") == 'equation':
+            segment["equation"] = item["equation"]["expression"]
+
+        segments.append(segment)
+
+    return segments
+
+
+def to_notion(segments: List[Dict]) -> List[Dict]:
+    '''
+    to_notion(segments: List[Dict]): 將精簡格式轉成新增或更新 block 時的 rich_text
+    註: 超過 MAX_TEXT_LENGTH 的文字會分成多個 text 物件
+    '''
+    rich_text: List[Dict] = list()
+    for segment in segments:
+        annotations: Dict = segment.get("annotations")
+
+        if "mention" in segment or "equation" in segment:
+            item_type: str = 'mention' if "mention" in segment else 'equation'
+            item: Dict = {
+                "type": item_type,
+                item_type: segment["mention"] if "mention" in segment else {"expression": segment["equation"]},
+            }
+            if annotations:
+                item["annotations"] = annotations
+            rich_text.append(item)
+            continue
+
+        text: str = segment["text"]
+        link: Dict = {"url": segment["href"]} if segment.get("href") else None
+        for start in range(0, max(len(text), 1), MAX_TEXT_LENGTH):
+            item: Dict = {
+                "type": "text",
+                "text": {"content": text[start:start + MAX_TEXT_LENGTH], "link": link},
+            }
+            if annotations:
+                item["annotations"] = annotations
+            rich_text.append(item)
+
+    return rich_text
+
+
+def plain_text(segments: List[Dict]) -> str:
+    '''
+    plain_text(segments: List[Dict]): 回傳 segment 的純文字 (顯示與編輯使用)
+    '''
+    return ''.join(segment["text"] for segment in segments)
+
+
+def _style(segment: Dict) -> Dict:
+    return {key: value for key, value in segment.items()
+            if key not in ("text", "mention", "equation")}
+
+
+def _slice(segment: Dict, start: int, end: int) -> Dict:
+    '''
+    _slice(segment: Dict, start: int, end: int): 回傳 segment 的部分文字，mention 與 equation 被切開時改為一般文字
+    '''
+    if start == 0 and end == len(segment["text"]):
+        return segment
+    return dict(_style(segment), text=segment["text"][start:end])
+
+
+def _is_plain(segment: Dict) -> bool:
+    return "mention" not in segment and "equation" not in segment
+
+
+def apply_text_edit(segments: List[Dict], new_text: str) -> List[Dict]:
+    '''
+    apply_text_edit(segments: List[Dict], new_text: str): 將純文字的修改套用至 segment，保留未修改部分的樣式、連結與 mention
+    新輸入的文字沿用修改位置前一個字的樣式 (開頭則沿用第一個 segment)
+    註: 以共同的前綴與後綴找出修改範圍，文字沒有變動時直接回傳原本的 segments
+    '''
+    old_text: str = plain_text(segments)
+    if old_text == new_text:
+        return segments
+
+    # - 找出修改範圍 old_text[prefix:old_end] -> new_text[prefix:new_end] -
+    limit: int = min(len(old_text), len(new_text))
+    prefix: int = 0
+    while prefix < limit and old_text[prefix] == new_text[prefix]:
+        prefix += 1
+
+    suffix: int = 0
+    while suffix < limit - prefix and old_text[-1 - suffix] == new_text[-1 - suffix]:
+        suffix += 1
+
+    old_end: int = len(old_text) - suffix
+    inserted: str = new_text[prefix:len(new_text) - suffix]
+    # - End. -
+
+    head: List[Dict] = list()
+    tail: List[Dict] = list()
+    style: Dict = None
+    position: int = 0
+    for segment in segments:
+        start, end = position, position + len(segment["text"])
+        position = end
+
+        if start < prefix:
+            head.append(_slice(segment, 0, min(end, prefix) - start))
+        if end > old_end and end > start:
+            tail.append(_slice(segment, max(start, old_end) - start, end - start))
+
+        # 新輸入的文字沿用修改位置前一個字所在的 segment
+        if style is None and (end >= prefix > start or (prefix == 0 and end > start)):
+            style = _style(segment)
+
+    middle: List[Dict] = [dict(style or {}, text=inserted)] if inserted else []
+
+    # - 合併相鄰且樣式相同的一般文字 -
+    merged: List[Dict] = list()
+    for segment in head + middle + tail:
+        if merged and _is_plain(segment) and _is_plain(merged[-1]) and \
+                _style(segment) == _style(merged[-1]):
+            merged[-1] = dict(merged[-1], text=merged[-1]["text"] + segment["text"])
+        else:
+            merged.append(segment)
+    # - End. -
+
+    return merged
@@ -0,0 +1,389 @@
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+from Storage import Storage, retry_delay
+import threading
+import sqlite3
+import json
+import os
+
+
+def _encode(doc: Dict) -> str:
+    return json.dumps(doc, ensure_ascii=False)
+
+
+# 沒有 order 的文件 (舊資料) 的排序位置，排在有 order 的文件之前，彼此依 id (寫入順序)，與 MongoDB 排序 null 的方式相同
+UNORDERED_POSITION: int = -2 ** 62
+
+
+def _position(doc: Dict) -> int:
+    order = doc.get("order")
+    return order if isinstance(order, int) else UNORDERED_POSITION
+
+
+def _timestamp(moment: datetime) -> str:
+    # 固定包含微秒，字串比較即為時間比較
+    return moment.isoformat(timespec='microseconds')
+
+
+def _matches(doc: Dict, query: Dict) -> bool:
+    '''
+    _matches(doc: Dict, query: Dict): doc 是否符合 query (欄位相等、{"$in": [...]}、{"$and": [query, ...]})
+    '''
+    for key, value in query.items():
+        if key == "$and":
+            if not all(_matches(doc, sub_query) for sub_query in value):
+                return False
+        elif isinstance(value, dict) and "$in" in value:
+            if doc.get(key) not in value["$in"]:
+                return False
+        elif doc.get(key) != value:
+            return False
+    return True
+
+
+def _sql_filter(query: Dict) -> Tuple[str, List]:
+    '''
+    _sql_filter(query: Dict): 將 query 中 _id, task_date 與 key 的條件轉成 SQL 的 WHERE (使用索引)，其餘條件由 _matches() 比對
+    '''
+    clauses: List[str] = list()
+    params: List = list()
+    queries: List[Dict] = [query] + list(query.get("$and", []))
+    for sub_query in queries:
+        for key, column in (("_id", "id"), ("task_date", "task_date"), ("key", "key")):
+            if key not in sub_query:
+                continue
+            value = sub_query[key]
+            if isinstance(value, dict) and "$in" in value:
+                values: List = list(value["$in"])
+                if not values:
+                    return "0", list()
+                clauses.append(f'{column} IN ({", ".join("?" * len(values))})')
+                params.extend(values)
+            elif not isinstance(value, dict):
+                clauses.append(f'{column} = ?')
+                params.append(value)
+
+    return (" AND ".join(clauses) if clauses else "1"), params
+
+
+class SQLiteStorage(Storage):
+    '''
+    SQLiteStorage(Storage): 以內嵌的 SQLite 檔案作為本機資料庫，不需要另外啟動 MongoDB
+    可用環境變數 SQLITE_PATH 設定檔案路徑 (預設 ~/.notion-widget/tasks.db)
+
+    註: 使用 WAL 模式，讀取不會被寫入阻擋；每個執行緒使用各自的連線 (':memory:' 只存在於單一連線，所有執行緒共用一個連線並依序存取)
+    SQL 皆為固定字串並以參數傳值，sqlite3 會快取編譯後的 statement (prepared statement)
+    文件以 JSON 保存於 doc 欄位，task_date, key 與 order (position) 另存為有索引的欄位，_id 為 INTEGER PRIMARY KEY
+    '''
+    SCHEMA: Tuple[str, ...] = (
+        """CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_date TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            key TEXT,
+            doc TEXT NOT NULL)""",
+        "CREATE INDEX IF NOT EXISTS tasks_date ON tasks (task_date, position)",
+        """CREATE TABLE IF NOT EXISTS page_index (
+            task_date TEXT PRIMARY KEY,
+            doc TEXT NOT NULL)""",
+        """CREATE TABLE IF NOT EXISTS sync_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_date TEXT,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            next_attempt_at TEXT NOT NULL,
+            synced_at TEXT,
+            doc TEXT NOT NULL)""",
+        "CREATE INDEX IF NOT EXISTS sync_queue_due ON sync_queue (status, next_attempt_at)",
+    )
+
+    SELECT_TASKS: str = "SELECT id, doc FROM tasks WHERE {} ORDER BY task_date, position, id"
+    INSERT_TASK: str = "INSERT INTO tasks (id, task_date, position, key, doc) VALUES (?, ?, ?, ?, ?)"
+    UPDATE_TASK: str = "UPDATE tasks SET task_date = ?, position = ?, key = ?, doc = ? WHERE id = ?"
+    SELECT_KEY: str = "SELECT id FROM tasks WHERE task_date = ? AND key = ?"
+    DELETE_KEY: str = "DELETE FROM tasks WHERE task_date = ? AND key = ?"
+    DELETE_TASK: str = "DELETE FROM tasks WHERE id = ?"
+    DELETE_DAY: str = "DELETE FROM tasks WHERE task_date = ?"
+    UNORDERED_TASKS: str = ("UPDATE tasks SET position = ? "
+                            "WHERE COALESCE(json_type(doc, '$.order'), '') != 'integer'")
+
+    SELECT_PAGES: str = "SELECT doc FROM page_index"
+    SELECT_PAGE: str = "SELECT doc FROM page_index WHERE task_date = ?"
+    UPSERT_PAGE: str = ("INSERT INTO page_index (task_date, doc) VALUES (?, ?) "
+                        "ON CONFLICT (task_date) DO UPDATE SET doc = excluded.doc")
+
+    INSERT_OPERATION: str = ("INSERT INTO sync_queue (task_date, status, attempts, last_error, "
+                             "created_at, next_attempt_at, doc) VALUES (?, 'pending', 0, NULL, ?, ?, ?)")
+    SELECT_DUE: str = ("SELECT id, task_date, status, attempts, last_error, created_at, next_attempt_at, "
+                       "synced_at, doc FROM sync_queue WHERE status = 'pending' AND next_attempt_at <= ? "
+                       "ORDER BY created_at, id LIMIT ?")
+    SELECT_PENDING_DATES: str = "SELECT DISTINCT task_date FROM sync_queue WHERE status = 'pending'"
+    MARK_DONE: str = "UPDATE sync_queue SET status = 'done', synced_at = ? WHERE id = ? AND status != 'done'"
+    MARK_FAILED: str = "UPDATE sync_queue SET attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?"
+    DISCARD: str = "UPDATE sync_queue SET status = 'discarded' WHERE task_date = ? AND status = 'pending'"
+
+    def __init__(self, path: str = None):
+        '''
+        __init__(self, path: str = None): 開啟 (或建立) SQLite 檔案，並建立 tasks, page_index, sync_queue 資料表
+        '''
+        self.path: str = path if path else os.getenv(
+            'SQLITE_PATH', os.path.expanduser('~/.notion-widget/tasks.db'))
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self.local = threading.local()
+        self.shared: sqlite3.Connection = None  # ':memory:' 時所有執行緒共用的連線
+        self.guard = threading.RLock() if self.path == ':memory:' else nullcontext()
+        with self._transaction() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+            # 舊版的 tasks 沒有 key 欄位
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(tasks)")}
+            if "key" not in columns:
+                connection.execute("ALTER TABLE tasks ADD COLUMN key TEXT")
+            connection.execute("CREATE INDEX IF NOT EXISTS tasks_key ON tasks (task_date, key)")
+
+            # 舊版沒有 order 的文件以寫入順序作為位置，改為排在最前面 (與 MongoDB 相同)
+            if connection.execute("PRAGMA user_version").fetchone()[0] < 1:
+                connection.execute(self.UNORDERED_TASKS, (UNORDERED_POSITION,))
+                connection.execute("PRAGMA user_version = 1")
+
+    def _connection(self) -> sqlite3.Connection:
+        '''
+        _connection(self): 回傳目前執行緒的連線 (':memory:' 時為共用的連線)，第一次使用時建立
+        註: isolation_level=None 由 _transaction() 自行控制交易範圍；共用的連線需在 guard 內使用
+        '''
+        memory: bool = self.path == ':memory:'
+        connection: sqlite3.Connection = self.shared if memory else getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None, cached_statements=256,
+                check_same_thread=not memory)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")  # WAL 模式下只在 checkpoint 時 fsync
+            connection.execute("PRAGMA foreign_keys = OFF")
+            if memory:
+                self.shared = connection
+            else:
+                self.local.connection = connection
+        return connection
+
+    def _read(self, statement: str, params: Tuple = ()) -> List[Tuple]:
+        '''
+        _read(self, statement: str, params: Tuple = ()): 在交易之外執行查詢，回傳所有結果
+        '''
+        with self.guard:
+            return self._connection().execute(statement, params).fetchall()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        '''
+        _transaction(self): 以 BEGIN IMMEDIATE 開始寫入交易，成功時 COMMIT，發生例外時 ROLLBACK
+        註: 開始時即取得寫入鎖，避免讀取後升級為寫入時與其他連線互相等待
+        '''
+        with self.guard:
+            connection: sqlite3.Connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def _select_tasks(self, connection: sqlite3.Connection, query: Dict) -> List[Dict]:
+        where, params = _sql_filter(query)
+        datas: List[Dict] = list()
+        for row_id, doc in connection.execute(self.SELECT_TASKS.format(where), params):
+            data: Dict = json.loads(doc)
+            data["_id"] = row_id
+            if _matches(data, query):
+                datas.append(data)
+        return datas
+
+    @staticmethod
+    def _stored(doc: Dict) -> str:
+        return _encode({key: value for key, value in doc.items() if key != "_id"})
+
+    def _insert(self, connection: sqlite3.Connection, doc: Dict, row_id: int = None):
+        '''
+        _insert(self, connection, doc, row_id=None): 插入文件並設定 _id，以 order 作為排序位置
+        '''
+        cursor = connection.execute(self.INSERT_TASK, (
+            row_id, doc["task_date"], _position(doc), doc.get("key"), self._stored(doc)))
+        doc["_id"] = cursor.lastrowid
+
+    # - TaskList -
+    def find_data(self, query: Dict = {}) -> List[Dict]:
+        with self.guard:
+            return self._select_tasks(self._connection(), query)
+
+    def insert_data(self, data: List[Dict]) -> List:
+        '''
+        insert_data(self, data: List[Dict]): 插入資料並為每份文件設定 _id (與 pymongo 相同)，回傳 ids
+        '''
+        ids: List = list()
+        with self._transaction() as connection:
+            for doc in data:
+                self._insert(connection, doc)
+                ids.append(doc["_id"])
+        return ids
+
+    def _update(self, connection: sqlite3.Connection, query: Dict, new_data: Dict) -> int:
+        count: int = 0
+        for doc in self._select_tasks(connection, query):
+            updated: Dict = dict(doc, **new_data)
+            if updated == doc:
+                continue
+            self._replace(connection, doc["_id"], updated)
+            count += 1
+        return count
+
+    def _replace(self, connection: sqlite3.Connection, row_id: int, doc: Dict):
+        connection.execute(self.UPDATE_TASK, (
+            doc["task_date"], _position(doc), doc.get("key"), self._stored(doc), row_id))
+
+    def update_data(self, query: Dict, new_data: Dict) -> int:
+        with self._transaction() as connection:
+            return self._update(connection, query, new_data)
+
+    def delete_data(self, query: Dict) -> int:
+        with self._transaction() as connection:
+            if set(query) == {"task_date"} and not isinstance(query["task_date"], dict):
+                return connection.execute(self.DELETE_DAY, (query["task_date"],)).rowcount
+
+            ids = [(doc["_id"],) for doc in self._select_tasks(connection, query)]
+            connection.executemany(self.DELETE_TASK, ids)
+            return len(ids)
+
+    def bulk_update(self, operations: List[Tuple[Dict, Dict]]) -> int:
+        '''
+        bulk_update(self, operations: List[Tuple[Dict, Dict]]): 在同一個交易中依序執行多筆 (query, new_data) 更新，回傳 update_count
+        '''
+        if not operations:
+            return 0
+
+        with self._transaction() as connection:
+            return sum(self._update(connection, query, new_data)
+                       for query, new_data in operations)
+
+    def replace_day(self, date: str, data: List[Dict]) -> int:
+        '''
+        replace_day(self, date: str, data: List[Dict]): 在同一個交易中刪除 date 的所有資料並依順序插入 data，回傳插入數量
+        註: 文件原本的 _id 會保留 (合併後的文件仍可用 _id 更新)，新文件設定新的 _id
+        '''
+        with self._transaction() as connection:
+            connection.execute(self.DELETE_DAY, (date,))
+            for doc in data:
+                row_id = doc.get("_id") if isinstance(doc.get("_id"), int) else None
+                self._insert(connection, doc, row_id)
+        return len(data)
+
+    def update_day(self, date: str, docs: List[Dict], removed_keys: List[str]) -> int:
+        '''
+        update_day(self, date: str, docs: List[Dict], removed_keys: List[str]): 在同一個交易中依 key 取代 (或新增) docs 並刪除 removed_keys，回傳寫入與刪除的數量
+        '''
+        if not docs and not removed_keys:
+            return 0
+
+        count: int = 0
+        with self._transaction() as connection:
+            for key in removed_keys:
+                count += connection.execute(self.DELETE_KEY, (date, key)).rowcount
+
+            for doc in docs:
+                row = connection.execute(self.SELECT_KEY, (date, doc["key"])).fetchone()
+                if row is None:
+                    self._insert(connection, doc)
+                else:
+                    self._replace(connection, row[0], doc)
+                    doc["_id"] = row[0]
+                count += 1
+        return count
+    # - End. -
+
+    # - PageIndex -
+    def find_page_index(self) -> List[Dict]:
+        return [json.loads(doc) for doc, in self._read(self.SELECT_PAGES)]
+
+    def upsert_page_index(self, pages: List[Dict]) -> int:
+        if not pages:
+            return 0
+
+        count: int = 0
+        with self._transaction() as connection:
+            for page in pages:
+                row = connection.execute(self.SELECT_PAGE, (page["task_date"],)).fetchone()
+                current: Dict = json.loads(row[0]) if row else dict()
+                updated: Dict = dict(current, **page)
+                if row and updated == current:
+                    continue
+                connection.execute(self.UPSERT_PAGE, (page["task_date"], _encode(updated)))
+                count += 1
+        return count
+    # - End. -
+
+    # - SyncQueue -
+    def record_operations(self, operations: List[Dict]) -> int:
+        if not operations:
+            return 0
+
+        now: str = _timestamp(datetime.now())
+        with self._transaction() as connection:
+            connection.executemany(self.INSERT_OPERATION, [
+                (operation.get("task_date"), now, now, _encode(operation)) for operation in operations])
+        return len(operations)
+
+    def find_pending_operations(self, limit: int = 200) -> List[Dict]:
+        rows = self._read(self.SELECT_DUE, (_timestamp(datetime.now()), limit if limit else -1))
+
+        operations: List[Dict] = list()
+        for row_id, task_date, status, attempts, last_error, created_at, next_attempt_at, synced_at, doc in rows:
+            operation: Dict = json.loads(doc)
+            operation.update({
+                "_id": row_id,
+                "task_date": task_date,
+                "status": status,
+                "attempts": attempts,
+                "last_error": last_error,
+                "created_at": datetime.fromisoformat(created_at),
+                "next_attempt_at": datetime.fromisoformat(next_attempt_at),
+            })
+            if synced_at:
+                operation["synced_at"] = datetime.fromisoformat(synced_at)
+            operations.append(operation)
+        return operations
+
+    def pending_dates(self) -> List[str]:
+        return [task_date for task_date, in self._read(self.SELECT_PENDING_DATES)]
+
+    def mark_operations_done(self, ids: List) -> int:
+        if not ids:
+            return 0
+
+        now: str = _timestamp(datetime.now())
+        with self._transaction() as connection:
+            return connection.executemany(self.MARK_DONE, [(now, row_id) for row_id in ids]).rowcount
+
+    def mark_operations_failed(self, operations: List[Dict], error: str, base_delay: int = 30, max_delay: int = 3600) -> int:
+        if not operations:
+            return 0
+
+        now = datetime.now()
+        rows = list()
+        for operation in operations:
+            attempts: int = operation.get("attempts", 0) + 1
+            delay: int = retry_delay(attempts, base_delay, max_delay)
+            rows.append((attempts, error, _timestamp(now + timedelta(seconds=delay)), operation["_id"]))
+
+        with self._transaction() as connection:
+            return connection.executemany(self.MARK_FAILED, rows).rowcount
+
+    def discard_operations(self, date: str) -> int:
+        with self._transaction() as connection:
+            return connection.execute(self.DISCARD, (date,)).rowcount
+    # - End. -
@@ -0,0 +1,70 @@
+from typing import Dict, List, Tuple
+import json
+import time
+import os
+
+
+class StartupProfiler(object):
+    '''
+    StartupProfiler(): 記錄啟動各階段的時間，以 --profile-startup 啟動時於取得資料後輸出
+    未啟用時 mark() 與 report() 不做任何事
+
+    methods:
+    mark(): 記錄一個階段完成的時間
+    report(): 輸出各階段花費的時間 (只輸出一次)
+    '''
+
+    def __init__(self, enabled: bool = False, started: float = None):
+        self.enabled: bool = enabled
+        self.started: float = started if started is not None else time.perf_counter()
+        self.phases: List[Tuple[str, float]] = list()
+        self.reported: bool = False
+
+    def mark(self, phase: str):
+        if self.enabled and not self.reported:
+            self.phases.append((phase, time.perf_counter()))
+
+    def report(self):
+        if not self.enabled or self.reported:
+            return
+
+        self.reported = True
+        previous: float = self.started
+        print('startup phase            phase(ms)   total(ms)')
+        for phase, moment in self.phases:
+            print(f'{phase:<24}{(moment - previous) * 1000:>9.1f}'
+                  f'{(moment - self.started) * 1000:>12.1f}')
+            previous = moment
+
+
+class DaySnapshot(object):
+    '''
+    DaySnapshot(): 將最後顯示的日期資料存成本機 JSON 檔，下次啟動時在連接資料庫前先顯示
+    可用環境變數 NOTION_WIDGET_SNAPSHOT 設定檔案路徑 (預設 ~/.notion-widget/last-day.json)
+
+    methods:
+    load(): 讀取快照，不存在或格式錯誤時回傳 None
+    save(): 寫入快照
+    '''
+
+    def __init__(self, path: str = None):
+        self.path: str = path if path else os.getenv(
+            'NOTION_WIDGET_SNAPSHOT', os.path.expanduser('~/.notion-widget/last-day.json'))
+
+    def load(self) -> Dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, payload: Dict):
+        '''
+        save(self, payload: Dict): 寫入 load_task_data() 的結果，先寫入暫存檔再取代，避免中斷時留下不完整的檔案
+        註: _id 等無法轉成 JSON 的值以字串保存，快照只用於顯示
+        '''
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path: str = f'{self.path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(payload, file, default=str, ensure_ascii=False)
+        os.replace(temp_path, self.path)
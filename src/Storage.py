@@ -0,0 +1,136 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+from Metrics import instrument_methods
+import os
+
+
+class Storage(ABC):
+    '''
+    Storage(): 本機資料庫的介面，TaskList (每日的 block)、PageIndex (日期 -> page)、SyncQueue (待同步的操作) 三種資料
+    目前的實作: ConnectDB.DBOperation (MongoDB)、SQLiteStorage.SQLiteStorage (SQLite)，以 open_storage() 依設定建立
+
+    註: query 只支援欄位相等、{"$in": [...]} 與 {"$and": [query, ...]}，文件的 _id 由各實作產生
+    同一天沒有 order 的文件 (舊資料) 排在有 order 的文件之前，彼此依寫入順序
+    '''
+
+    @abstractmethod
+    def find_data(self, query: Dict = {}) -> List[Dict]:
+        '''
+        find_data(self, query: Dict = {}): 回傳符合 query 條件的所有資料 (依 task_date, order 排序，沒有 order 的文件在前並依寫入順序)
+        '''
+
+    @abstractmethod
+    def insert_data(self, data: List[Dict]) -> List:
+        '''
+        insert_data(self, data: List[Dict]): 插入資料並為每份文件設定 _id，回傳 ids
+        '''
+
+    @abstractmethod
+    def update_data(self, query: Dict, new_data: Dict) -> int:
+        '''
+        update_data(self, query: Dict, new_data: Dict): 將符合 query 的資料設定成 new_data 的值，回傳 update_count
+        '''
+
+    @abstractmethod
+    def delete_data(self, query: Dict) -> int:
+        '''
+        delete_data(self, query: Dict): 刪除符合 query 的資料，回傳 delete_count
+        '''
+
+    @abstractmethod
+    def bulk_update(self, operations: List[Tuple[Dict, Dict]]) -> int:
+        '''
+        bulk_update(self, operations: List[Tuple[Dict, Dict]]): 以單次請求 (或交易) 依序執行多筆 (query, new_data) 更新，回傳 update_count
+        '''
+
+    @abstractmethod
+    def replace_day(self, date: str, data: List[Dict]) -> int:
+        '''
+        replace_day(self, date: str, data: List[Dict]): 以單次請求 (或交易) 刪除 date 的所有資料並插入 data，回傳插入數量
+        '''
+
+    @abstractmethod
+    def update_day(self, date: str, docs: List[Dict], removed_keys: List[str]) -> int:
+        '''
+        update_day(self, date: str, docs: List[Dict], removed_keys: List[str]): 以單次請求 (或交易) 依 key 新增或取代 docs，並刪除 removed_keys，回傳寫入與刪除的數量
+        註: 只寫入有變動的文件，其餘文件不受影響
+        '''
+
+    @abstractmethod
+    def find_page_index(self) -> List[Dict]:
+        '''
+        find_page_index(self): 回傳 PageIndex 中所有任務日期的 page 資訊 (不含 _id)
+        '''
+
+    @abstractmethod
+    def upsert_page_index(self, pages: List[Dict]) -> int:
+        '''
+        upsert_page_index(self, pages: List[Dict]): 以 task_date 為 key 新增或更新 page 資訊 (只更新 pages 中的欄位)，回傳 upsert + modified 數量
+        '''
+
+    @abstractmethod
+    def record_operations(self, operations: List[Dict]) -> int:
+        '''
+        record_operations(self, operations: List[Dict]): 將操作紀錄加入 SyncQueue (加上 status, attempts, next_attempt_at 等重試狀態)，回傳新增數量
+        '''
+
+    @abstractmethod
+    def find_pending_operations(self, limit: int = 200) -> List[Dict]:
+        '''
+        find_pending_operations(self, limit: int = 200): 回傳已到重試時間、尚未同步的操作紀錄 (依建立時間排序)，limit 為 0 時不限制數量
+        '''
+
+    @abstractmethod
+    def pending_dates(self) -> List[str]:
+        '''
+        pending_dates(self): 回傳仍有尚未同步操作的日期 (不論重試時間)
+        '''
+
+    @abstractmethod
+    def mark_operations_done(self, ids: List) -> int:
+        '''
+        mark_operations_done(self, ids: List): 將操作紀錄標記為已同步，回傳 update_count
+        '''
+
+    @abstractmethod
+    def mark_operations_failed(self, operations: List[Dict], error: str, base_delay: int = 30, max_delay: int = 3600) -> int:
+        '''
+        mark_operations_failed(self, operations: List[Dict], error: str): 紀錄同步失敗，並依失敗次數延後下次重試時間 (exponential backoff)，回傳 update_count
+        '''
+
+    @abstractmethod
+    def discard_operations(self, date: str) -> int:
+        '''
+        discard_operations(self, date: str): 捨棄 date 尚未同步的操作紀錄，回傳 update_count
+        '''
+
+
+def retry_delay(attempts: int, base_delay: int, max_delay: int) -> int:
+    '''
+    retry_delay(attempts: int, base_delay: int, max_delay: int): 第 attempts 次失敗後等待的秒數 (exponential backoff)
+    '''
+    return min(base_delay * (2 ** (attempts - 1)), max_delay)
+
+
+# Storage 的操作，open_storage() 會記錄每個操作的時間 (Metrics)
+OPERATIONS = tuple(sorted(Storage.__abstractmethods__))
+
+
+def open_storage(backend: str = None) -> Storage:
+    '''
+    open_storage(backend: str = None): 依環境變數 STORAGE_BACKEND 建立本機資料庫 (mongodb 或 sqlite，預設 mongodb)
+    mongodb 需要設定 LOCAL_MONGODB；sqlite 的檔案路徑可用 SQLITE_PATH 設定 (預設 ~/.notion-widget/tasks.db)
+    註: 各實作需要時才載入 (pymongo 載入較慢)；每個操作的時間記錄於 Metrics.METRICS (db.<backend>.<操作>)
+    '''
+    backend = (backend or os.getenv('STORAGE_BACKEND', 'mongodb')).lower()
+
+    if backend == 'mongodb':
+        from ConnectDB import DBOperation
+        storage: Storage = DBOperation()
+    elif backend == 'sqlite':
+        from SQLiteStorage import SQLiteStorage
+        storage: Storage = SQLiteStorage()
+    else:
+        raise ValueError('環境變數 STORAGE_BACKEND 必須為 mongodb 或 sqlite')
+
+    return instrument_methods(storage, f'db.{backend}', OPERATIONS)
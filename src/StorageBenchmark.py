@@ -0,0 +1,156 @@
+from typing import Callable, Dict, List
+from Storage import Storage
+import statistics
+import argparse
+import tempfile
+import time
+import sys
+import os
+
+
+def _rss_mb() -> float:
+    '''
+    _rss_mb(): 回傳目前程序的 RSS (MB)，優先使用 psutil，沒有安裝時讀取 /proc 或 resource 的最大值
+    '''
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        pass
+
+    try:
+        with open('/proc/self/status', 'r') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    import resource
+    # Linux 以 KB、macOS 以 byte 為單位
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def _percentile(samples: List[float], percent: int) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def _make_day(date: str, blocks: int) -> List[Dict]:
+    return [{
+        "task_date": date,
+        "id": f'{date}-{index}',
+        "type": "to_do" if index % 2 else "paragraph",
+        "parent": {"type": "page_id", "page_id": date},
+        "depth": 0,
+        "content_text": f'任務 {index} ' * 8,
+        "checked": False,
+        "key": f'{date}-{index}',
+        "order": index * 1024,
+        "base": {"content_text": f'任務 {index} ' * 8, "checked": False},
+    } for index in range(blocks)]
+
+
+def open_backend(backend: str, path: str = None) -> Storage:
+    '''
+    open_backend(backend: str, path: str = None): 開啟測試用的資料庫，不使用正式的資料
+    sqlite 使用暫存檔 (或 path)；mongodb 使用 LOCAL_MONGODB 的 NotionTaskBenchmark 資料庫
+    '''
+    if backend == 'sqlite':
+        from SQLiteStorage import SQLiteStorage
+        return SQLiteStorage(path if path else os.path.join(tempfile.mkdtemp(), 'benchmark.db'))
+
+    from ConnectDB import DBOperation
+    storage = DBOperation(database='NotionTaskBenchmark')
+    storage.client.drop_database('NotionTaskBenchmark')
+    storage._create_indexes()
+    return storage
+
+
+def run_benchmark(storage: Storage, days: int, blocks: int, rounds: int) -> Dict:
+    '''
+    run_benchmark(storage: Storage, days: int, blocks: int, rounds: int): 以 Widget 的存取模式測量各操作的延遲
+    回傳 {"latency": {操作: [秒]}, "final": 最後一天的資料 (不含 _id，用於比對不同實作的結果)}
+    '''
+    dates: List[str] = [f'2024-{month:02d}-{day:02d}' for month in range(1, 13)
+                        for day in range(1, 29)][:days]
+    latency: Dict[str, List[float]] = {name: list() for name in (
+        "replace_day", "update_day", "find_data", "bulk_update", "update_data",
+        "record_operations", "find_pending_operations")}
+
+    def measure(name: str, func: Callable):
+        started: float = time.perf_counter()
+        result = func()
+        latency[name].append(time.perf_counter() - started)
+        return result
+
+    for date in dates:
+        storage.replace_day(date, _make_day(date, blocks))
+
+    for round_index in range(rounds):
+        for date in dates:
+            docs: List[Dict] = measure("find_data", lambda: storage.find_data({"task_date": date}))
+            measure("bulk_update", lambda: storage.bulk_update([
+                ({"_id": doc["_id"]}, {"checked": not doc["checked"]}) for doc in docs[:10]]))
+            measure("update_data", lambda: storage.update_data(
+                {"$and": [{"task_date": date}, {"key": f'{date}-{round_index % blocks}'}]},
+                {"content_text": f'第 {round_index} 輪'}))
+            measure("record_operations", lambda: storage.record_operations([
+                {"op": "update", "task_date": date, "target": {"task_date": date}, "fields": ["checked"]}]))
+            measure("find_pending_operations", lambda: storage.find_pending_operations(limit=50))
+            # 移動一個項目只寫入該文件，整天改寫作為對照
+            moved: Dict = dict(docs[-1], order=docs[0]["order"] - round_index - 1)
+            measure("update_day", lambda: storage.update_day(date, [moved], []))
+            measure("replace_day", lambda: storage.replace_day(date, storage.find_data({"task_date": date})))
+
+    final: List[Dict] = [{key: value for key, value in doc.items() if key != "_id"}
+                         for doc in storage.find_data({"task_date": dates[-1]})]
+    return {"latency": latency, "final": final}
+
+
+def report(backend: str, result: Dict, rss_before: float, rss_after: float, output=sys.stdout):
+    output.write(f'\n{backend}  (client RSS {rss_before:.1f} -> {rss_after:.1f} MB)\n')
+    output.write('operation                    count   p50(ms)   p95(ms)  mean(ms)\n')
+    for name, samples in result["latency"].items():
+        if not samples:
+            continue
+        output.write(f'{name:<26}{len(samples):>8}{_percentile(samples, 50) * 1000:>10.3f}'
+                     f'{_percentile(samples, 95) * 1000:>10.3f}{statistics.mean(samples) * 1000:>10.3f}\n')
+
+
+def main(argv: List[str] = None) -> int:
+    '''
+    main(argv: List[str] = None): 比較 MongoDB 與 SQLite 的延遲與記憶體用量，並確認兩者的結果相同
+    例: python StorageBenchmark.py --backend sqlite mongodb --days 30 --blocks 40 --rounds 5
+    '''
+    parser = argparse.ArgumentParser(description='比較本機資料庫實作的延遲與 RSS')
+    parser.add_argument('--backend', nargs='+', choices=('sqlite', 'mongodb'),
+                        default=['sqlite', 'mongodb'], help='要測試的實作')
+    parser.add_argument('--days', type=int, default=30, help='日期數量')
+    parser.add_argument('--blocks', type=int, default=40, help='每天的 block 數量')
+    parser.add_argument('--rounds', type=int, default=5, help='每個日期重複的次數')
+    args = parser.parse_args(argv)
+
+    finals: Dict[str, List[Dict]] = dict()
+    for backend in args.backend:
+        rss_before: float = _rss_mb()
+        storage: Storage = open_backend(backend)
+        result: Dict = run_benchmark(storage, args.days, args.blocks, args.rounds)
+        report(backend, result, rss_before, _rss_mb())
+
+        if backend == 'mongodb':
+            resident = storage.db.command('serverStatus').get('mem', {}).get('resident')
+            sys.stdout.write(f'mongod RSS {resident} MB\n')
+            storage.client.drop_database('NotionTaskBenchmark')
+        finals[backend] = result["final"]
+
+    results: List[List[Dict]] = list(finals.values())
+    if len(results) > 1 and any(final != results[0] for final in results[1:]):
+        sys.stdout.write('\n實作之間的結果不一致\n')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from Metrics import METRICS
+from TaskData import HandleAPIandDB
+from typing import Callable, Dict, List
+import argparse
+import time
+import sys
+
+
+class RangeSync(HandleAPIandDB):
+    '''
+    RangeSync(HandleAPIandDB): 不開啟視窗，一次同步多個日期的 Notion 與 MongoDB 資料
+    用於在新電腦建立本機資料，或修正本機與 Notion 不一致的資料
+
+    methods:
+    select_dates(): 取得範圍內 Notion 上有頁面的日期
+    pull(): Notion -> MongoDB
+    push(): MongoDB -> Notion
+    '''
+
+    def __init__(self, workers: int = 3, output=sys.stdout):
+        super().__init__()
+        self.workers: int = workers  # 同時處理的日期數量 (請求速率仍受 NotionClient 限流)
+        self.output = output
+
+    def select_dates(self, start: str = None, end: str = None) -> List[str]:
+        '''
+        select_dates(self, start: str = None, end: str = None): 回傳 start ~ end (包含) 之間 Notion 上有頁面的日期，未指定時不限制
+        '''
+        page_index = self.get_page_index()
+        page_index.refresh()  # 取得上次之後新增的頁面
+
+        return sorted(date for date in page_index.dates()
+                      if (not start or date >= start) and (not end or date <= end))
+
+    def _report(self, done: int, total: int, date: str, message: str, started: float):
+        elapsed: float = max(time.perf_counter() - started, 1e-6)
+        self.output.write(
+            f'[{done}/{total}] {date} {message} ({done / elapsed:.2f} 天/秒)\n')
+        self.output.flush()
+
+    def _run(self, dates: List[str], func: Callable, describe: Callable) -> Dict:
+        '''
+        _run(self, dates: List[str], func: Callable, describe: Callable): 以最多 self.workers 個執行緒對每個日期執行 func 並回報進度
+        回傳 {"done": 成功數量, "failed": {date: error}, "seconds": 花費秒數}
+        '''
+        started: float = time.perf_counter()
+        failed: Dict[str, Exception] = dict()
+        done: int = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(func, date): date for date in dates}
+            for future in as_completed(futures):
+                date: str = futures[future]
+                done += 1
+                try:
+                    message: str = describe(future.result())
+                except Exception as error:
+                    failed[date] = error
+                    message = f'失敗: {error}'
+                self._report(done, len(dates), date, message, started)
+
+        return {"done": len(dates) - len(failed), "failed": failed,
+                "seconds": time.perf_counter() - started}
+
+    def pull(self, dates: List[str], force: bool = False) -> Dict:
+        '''
+        pull(self, dates: List[str], force: bool = False): 將 Notion 資料寫入 MongoDB (每個日期以單次 bulk write 取代)
+        force: False 時略過仍有未同步本機修改的日期 (避免覆蓋尚未上傳的資料) 與 Notion 上沒有變動的日期
+        '''
+        if not force:
+            pending = set(self.db.pending_dates())
+            skipped = [date for date in dates if date in pending]
+            for date in skipped:
+                self.output.write(f'略過 {date}: 有尚未同步至 Notion 的本機修改\n')
+            dates = [date for date in dates if date not in pending]
+
+            # Notion 上沒有變動且本機已有資料的日期不需要取得 block
+            page_index = self.get_page_index()
+            local_dates = {data["task_date"] for data in self.db.find_data(
+                {"task_date": {"$in": dates}})}
+            unchanged = [date for date in dates
+                         if date in local_dates and page_index.is_synced(date)]
+            if unchanged:
+                self.output.write(f'略過 {len(unchanged)} 個沒有變動的日期\n')
+            dates = [date for date in dates if date not in unchanged]
+
+        return self._run(dates, self.pull_notion_data, lambda count: f'{count} 個項目')
+
+    def push(self, dates: List[str]) -> Dict:
+        '''
+        push(self, dates: List[str]): 將 MongoDB 的資料與 Notion 比對差異後上傳
+        '''
+        local_dates = {data["task_date"] for data in self.db.find_data(
+            {"task_date": {"$in": dates}})}
+        dates = [date for date in dates if date in local_dates]
+
+        # 每個日期只由一個執行緒處理，不會重複新增 block
+        return self._run(dates, self.push_date, lambda _: '已同步')
+
+
+def _valid_date(value: str) -> str:
+    datetime.strptime(value, '%Y-%m-%d')
+    return value
+
+
+def main(argv: List[str] = None) -> int:
+    '''
+    main(argv: List[str] = None): 命令列進入點，例如
+    python SyncCli.py pull --start 2024-11-01 --end 2024-11-30
+    python SyncCli.py push --all
+    '''
+    parser = argparse.ArgumentParser(
+        description='同步多個日期的 Notion 與 MongoDB 資料')
+    parser.add_argument('direction', choices=['pull', 'push'],
+                        help='pull: Notion -> MongoDB, push: MongoDB -> Notion')
+    parser.add_argument('--start', type=_valid_date, help='開始日期 yyyy-mm-dd')
+    parser.add_argument('--end', type=_valid_date, help='結束日期 yyyy-mm-dd (包含)')
+    parser.add_argument('--all', action='store_true',
+                        help='同步整個 Notion database')
+    parser.add_argument('--workers', type=int, default=3, help='同時處理的日期數量')
+    parser.add_argument('--force', action='store_true',
+                        help='pull 時覆蓋尚未同步的本機修改，並重新取得沒有變動的日期')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='完成後將各操作的延遲統計寫入 PATH (.prom 為 Prometheus text format，其餘為 JSON)')
+    args = parser.parse_args(argv)
+
+    if not args.all and not (args.start or args.end):
+        parser.error('需要指定 --start / --end 或 --all')
+
+    sync = RangeSync(workers=max(args.workers, 1))
+    dates: List[str] = sync.select_dates(
+        start=None if args.all else args.start, end=None if args.all else args.end)
+
+    if args.direction == 'pull':
+        result: Dict = sync.pull(dates, force=args.force)
+    else:
+        result: Dict = sync.push(dates)
+
+    print(f'完成 {result["done"]} 天，失敗 {len(result["failed"])} 天，'
+          f'耗時 {result["seconds"]:.1f} 秒')
+    if args.metrics:
+        METRICS.export(args.metrics)
+    return 1 if result["failed"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
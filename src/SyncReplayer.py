@@ -0,0 +1,47 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from typing import Callable, Dict
+from Workers import TaskDispatcher
+
+
+class SyncReplayer(QObject):
+    '''
+    SyncReplayer(QObject): 定期於背景將 SyncQueue 中尚未同步的操作送至 Notion
+    離線或請求失敗時操作會保留在 SyncQueue，依各自的重試時間於之後的批次再送出
+
+    methods:
+    start(): 開始定期同步
+    trigger(): 立即執行一次同步 (已在執行時忽略)
+    '''
+    finished = pyqtSignal(object)  # replay() 的結果 {"synced": [task_date], "failed": {task_date: error}}
+
+    def __init__(self, dispatcher: TaskDispatcher, replay: Callable, interval_ms: int = 30000, parent: QObject = None):
+        super().__init__(parent)
+        self.dispatcher: TaskDispatcher = dispatcher
+        self.replay: Callable = replay  # replay() -> Dict，例如 HandleAPIandDB.replay_operations
+        self.running: bool = False
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.trigger)
+
+    def start(self):
+        self.timer.start()
+
+    def trigger(self):
+        '''
+        trigger(self): 於背景執行一次同步，完成後發送 finished signal
+        '''
+        if self.running:
+            return
+
+        self.running = True
+        self.dispatcher.submit(key='sync-replay', func=self.replay,
+                               on_result=self._on_finished, on_error=self._on_error)
+
+    def _on_finished(self, result: Dict):
+        self.running = False
+        self.finished.emit(result)
+
+    def _on_error(self, error: Exception):
+        # 讀取 SyncQueue 失敗 (例如資料庫無法連線)，等待下一次定期同步
+        self.running = False
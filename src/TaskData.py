@@ -0,0 +1,391 @@
+from BlockIdentity import adopt_identity, assign_keys, assign_order, day_changes, next_order, release_duplicate_keys
+from BlockMerge import MergeConflictError, MergeResult, merge_blocks, migrate_legacy_docs, snapshot
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Tuple
+import threading
+
+if TYPE_CHECKING:
+    from ApiRequest import PageIndex  # 只用於型別註記，執行時於 get_page_index() 才載入
+
+
+class HandleAPIandDB(object):
+    def __init__(self):
+        self._db = None  # 第一次使用時才開啟本機資料庫，見 db
+        self.db_lock = threading.Lock()
+        self.flag: bool = True  # 是否為資料庫的資料，True 為是，False 為 API 的資料
+
+        self.data: List[Dict] = None
+        self.page_id: str = None  # 當前頁面的 page_id, 相當於創建 block 時的 parent page_id
+        self.page_index: PageIndex = None  # 任務日期 -> page_id 的索引，第一次需要時才建立
+        self.page_index_lock = threading.Lock()  # 背景執行緒可能同時需要索引
+        self.sync_lock = threading.Lock()  # 同一時間只允許一個上傳 Notion 的流程，避免重複新增 block
+        self.day_lock = threading.Lock()  # 讀取、合併並寫回一天的資料時持有 (不包含 Notion 的請求)，避免期間的本機修改被覆蓋
+
+    @property
+    def db(self):
+        '''
+        db(self): 回傳本機資料庫 (Storage.open_storage()，依 STORAGE_BACKEND 為 MongoDB 或 SQLite)
+        第一次使用時才載入並連接 (通常在背景執行緒)，避免啟動時等待
+        '''
+        with self.db_lock:
+            if self._db is None:
+                from Storage import open_storage
+                self._db = open_storage()
+        return self._db
+
+    def get_page_index(self) -> 'PageIndex':
+        '''
+        get_page_index(self): 回傳任務日期 -> page_id 的索引，第一次呼叫時才從 db 載入(或向 Notion 建立)
+        '''
+        with self.page_index_lock:
+            if self.page_index is None:
+                from ApiRequest import PageIndex  # requests 等模組需要時才載入，加快啟動
+                self.page_index = PageIndex(self.db)
+        return self.page_index
+
+    def fetch_task_data(self, date: str) -> Tuple[List[Dict], bool, str]:
+        '''
+        fetch_task_data(self, date: str): 取得當日資料庫的資料，若無則向 Notion API 請求取得最新資料
+        回傳 (資料 List[Dict], 是否為資料庫的資料, 當前頁面的 page_id)
+        註: 不修改 self 的屬性，可以在背景執行緒中呼叫
+        '''
+        datas: List[Dict] = self._find_day(date)
+        if len(datas) == 0:
+            from ApiRequest import PageOperator
+            page_operator = PageOperator(
+                currentDate=date, page_index=self.get_page_index())
+            datas = page_operator.get_page_contents()
+            for data in datas:
+                data["base"] = snapshot(data)  # 三方合併的 base
+            return datas, False, page_operator.current_page_id
+
+        # 巢狀 block 的 parent 為 block_id，需找出第一層 block 的 page_id
+        page_id: str = next((data["parent"]["page_id"] for data in datas
+                             if data["parent"].get("type") == "page_id"), None)
+        return datas, True, page_id
+
+    def get_task_data(self, date: str) -> List[Dict]:
+        '''
+        get_task_data(self): 取得當日資料庫的資料，若無則向 Notion API 請求取得最新資料，回傳找到的所有資料 List[Dict]
+        '''
+        datas, self.flag, self.page_id = self.fetch_task_data(date)
+        self.data = datas
+        return datas
+
+    def create_db_data(self, data: List[Dict]):
+        '''
+        create_db_data(self, data: List[Dict]): 新增資料至資料庫
+        '''
+        self.db.insert_data(data=data)
+
+    def create_local_item(self, item: Dict):
+        '''
+        create_local_item(self, item: Dict): 新增項目至當日的最後 (只寫入一份文件)，並記錄 create 操作，之後由 replay_operations() 同步至 Notion
+        item: 需包含 key (BlockIdentity.new_local_key())
+        註: parent 依 task_date 從 PageIndex 取得 (不使用畫面上目前的 page_id，切換日期時可能尚未更新)，日期在 Notion 上沒有頁面時拋出 SystemError
+        '''
+        page: Dict = self.get_page_index().get(item["task_date"])
+        if not page:
+            raise SystemError(f'{item["task_date"]} 在 Notion 上沒有頁面，無法新增項目')
+        item["parent"] = {"type": "page_id", "page_id": page["page_id"]}
+
+        with self.day_lock:
+            item["order"] = next_order(self.db.find_data({"task_date": item["task_date"]}))
+            self.create_db_data(data=[item])
+            self.db.record_operations([{
+                "op": "create",
+                "task_date": item["task_date"],
+                "target": {"task_date": item["task_date"], "key": item["key"]},
+            }])
+
+    def apply_local_edits(self, operations: List[Tuple[Dict, Dict]]):
+        '''
+        apply_local_edits(self, operations: List[Tuple[Dict, Dict]]): 批次更新資料庫的內容，並記錄 update 操作
+        operations: [(query, new_data)]，query 需包含 task_date
+        註: 持有 day_lock，避免在同步讀取資料庫與寫回合併結果之間寫入，使修改被合併結果覆蓋；
+            不等待 sync_lock，離線時 Notion 的請求逾時也不會延遲寫入
+        '''
+        with self.day_lock:
+            self.db.bulk_update(operations)
+            self.db.record_operations([{
+                "op": "update",
+                "task_date": query["task_date"],
+                "target": query,
+                "fields": list(new_data.keys()),
+            } for query, new_data in operations])
+
+    def replay_operations(self, dates: List[str] = None, limit: int = 200) -> Dict:
+        '''
+        replay_operations(self, dates: List[str] = None, limit: int = 200): 將 SyncQueue 中到期的操作依日期分批同步至 Notion
+        dates: 無論是否有待同步的操作都要同步的日期 (例如使用者按下上傳)
+        回傳 {"synced": [task_date], "failed": {task_date: error}}
+        註: 每個日期以 upload_data_db_to_notion() 比對差異後上傳，重複執行不會重複新增或修改，失敗時操作保留並延後重試
+        '''
+        with self.sync_lock:
+            operations: List[Dict] = self.db.find_pending_operations(
+                limit=limit)
+            by_date: Dict[str, List[Dict]] = dict()
+            for operation in operations:
+                by_date.setdefault(operation["task_date"], list()).append(
+                    operation)
+            for date in dates or []:
+                by_date.setdefault(date, list())
+
+            result: Dict = {"synced": list(), "failed": dict()}
+            for date, date_operations in by_date.items():
+                try:
+                    self.upload_data_db_to_notion(date)
+                except Exception as error:
+                    self.db.mark_operations_failed(date_operations, str(error))
+                    result["failed"][date] = error
+                else:
+                    self.db.mark_operations_done(
+                        [operation["_id"] for operation in date_operations])
+                    result["synced"].append(date)
+
+            return result
+
+    def push_date(self, date: str, resolution: str = None):
+        '''
+        push_date(self, date: str, resolution: str = None): 將 date 的資料同步至 Notion，成功後將上傳前 date 尚未同步的操作標記為完成
+        註: 不經過 sync_lock，呼叫端需確保同一個日期不會同時上傳；上傳途中新增的操作保留至下次同步
+        '''
+        operations: List[Dict] = [operation for operation in self.db.find_pending_operations(limit=0)
+                                  if operation["task_date"] == date]
+        self.upload_data_db_to_notion(date, resolution=resolution)
+        self.db.mark_operations_done([operation["_id"] for operation in operations])
+
+    def resolve_conflicts(self, date: str, resolution: str, push: bool):
+        '''
+        resolve_conflicts(self, date: str, resolution: str, push: bool): 以 resolution ('local' 或 'remote') 解決 MergeConflictError 後重新同步
+        push: 與 MergeConflictError.push 相同，是否上傳至 Notion
+        '''
+        if push:
+            with self.sync_lock:
+                self.push_date(date, resolution=resolution)
+        else:
+            self.synchronous_notion_to_db_data(date, resolution=resolution)
+
+    def update_content(self, query: List[Dict], new_data):
+        '''
+        update_content(query, new_data): 更新資料庫的內容
+        '''
+        self.db.update_data(query={"$and": query}, new_data=new_data)
+
+    def synchronous_notion_to_db_data(self, date: str, resolution: str = None) -> bool:
+        '''
+        synchronous_notion_to_db_data(self, date: str, resolution: str = None): 將 Notion 資料合併至 Database，回傳是否有取得資料
+        註：先以 last_edited_time 查詢有變動的 page (單次請求)，Notion 沒有變動且本機沒有未同步的修改時不取得 block
+        本機的修改會保留 (三方合併)，兩邊修改同一欄位時拋出 MergeConflictError，由 resolution 決定保留哪一邊
+        '''
+        with self.sync_lock:
+            page_index: PageIndex = self.get_page_index()
+            page_index.refresh()
+
+            if not self.db.find_data({"task_date": date}):
+                self.pull_notion_data(date)
+                return True
+
+            if page_index.is_synced(date) and date not in self.db.pending_dates():
+                return False
+
+            self.merge_with_notion(date, push=False, resolution=resolution)
+            return True
+
+    def upload_data_db_to_notion(self, date: str, resolution: str = None):
+        '''
+        upload_data_db_to_notion(self, date: str, resolution: str = None): 將 Database 資料與 Notion 合併後更新至 Notion
+        註：Notion 上的修改會先合併至資料庫，不會被本機的資料覆蓋
+        '''
+        self.merge_with_notion(date, push=True, resolution=resolution)
+
+    def merge_with_notion(self, date: str, push: bool, resolution: str = None) -> MergeResult:
+        '''
+        merge_with_notion(self, date: str, push: bool, resolution: str = None): 以 base 快照將資料庫與 Notion 的內容做三方合併並寫入資料庫
+        push: 是否將合併的結果上傳至 Notion (只送出有差異的 block)，未上傳的本機修改仍保留於 SyncQueue
+        resolution: 'local' 或 'remote'，衝突時採用的一邊；未指定且有衝突時拋出 MergeConflictError，不寫入任何資料
+        註: 呼叫端需持有 sync_lock (或確保同一個日期不會同時同步)；只在讀取、合併並寫回資料庫時持有 day_lock，Notion 的請求期間不阻擋本機修改
+        '''
+        return self._merge_day(date, push, resolution)[0]
+
+    def _merge_day(self, date: str, push: bool, resolution: str = None) -> Tuple[MergeResult, int]:
+        '''
+        _merge_day(self, date: str, push: bool, resolution: str = None): merge_with_notion() 的實作，回傳 (MergeResult, 取得 block 的請求數量)
+        '''
+        page_index: PageIndex = self.get_page_index()
+        page: Dict = page_index.get(date) or dict()
+        edited_iso: str = page.get("last_edited_iso")
+        fetched_at: datetime = datetime.now(timezone.utc)
+
+        from ApiRequest import PageOperator, PartialSyncError
+        page_operator = PageOperator(currentDate=date, page_index=page_index)
+        remote_blocks: List[Dict] = page_operator.get_page_json().get('results', [])
+        remote_docs: List[Dict] = page_operator.get_page_contents(
+            blocks=remote_blocks)
+
+        with self.day_lock:
+            stored: List[Dict] = self._find_day(date)
+            local_docs: List[Dict] = [dict(doc) for doc in stored]
+            migrate_legacy_docs(local_docs, remote_docs)  # 舊版沒有 base 的文件，與 stored 比對後一併寫回資料庫
+            result: MergeResult = merge_blocks(
+                local_docs, remote_docs, resolution=resolution)
+            if result.conflicts:
+                raise MergeConflictError(date, result.conflicts, push)
+
+            self.save_day(date, stored=stored, docs=result.docs)
+
+        if not push:
+            page_index.mark_synced(date, edited_iso, fetched_at)
+            return result, page_operator.request_count
+
+        try:
+            created = page_operator.sync_page_data(
+                docs=result.docs, remote_blocks=remote_blocks)
+        except PartialSyncError as error:
+            # 先記錄已新增的 block，下次上傳時從中斷處繼續
+            self._save_created_block_ids(error.created)
+            raise
+
+        self._save_created_block_ids(created)
+
+        # 上傳後 Notion 與資料庫一致，更新 base
+        created_ids = {id(doc) for doc, _ in created}
+        self.db.bulk_update([(self._doc_query(doc), {"base": snapshot(doc)})
+                             for doc in result.docs
+                             if id(doc) not in created_ids and doc.get("base") != snapshot(doc)])
+        return result, page_operator.request_count
+
+    def _save_created_block_ids(self, created: List[Tuple[Dict, str]]):
+        '''
+        _save_created_block_ids(self, created: List[Tuple[Dict, str]]): 將新增至 Notion 的 block id 與 base 寫回資料庫的文件
+        '''
+        self.db.bulk_update([(self._doc_query(doc), {"id": block_id, "base": snapshot(doc)})
+                            for doc, block_id in created])
+
+    @staticmethod
+    def _doc_query(doc: Dict) -> Dict:
+        '''
+        _doc_query(doc: Dict): 回傳只對應 doc 一份文件的 query (task_date + key)
+        '''
+        return {"task_date": doc["task_date"], "key": doc["key"]}
+
+    def delete_db_data(self, date: str):
+        '''
+        delete_db_data(self, date: str): 刪除 date 的 db 資料
+        '''
+        self.db.delete_data({"task_date": date})
+
+    def _find_day(self, date: str) -> List[Dict]:
+        '''
+        _find_day(self, date: str): 回傳資料庫中 date 的文件，舊版的文件 (沒有 key 或 key 重複) 先指定 key 並寫回資料庫
+        註: 沒有 base 的文件於 merge_with_notion() 與 Notion 對照後才設定 base
+        '''
+        stored: List[Dict] = self.db.find_data({"task_date": date})
+        datas: List[Dict] = [dict(doc) for doc in stored]
+        released: List[Dict] = release_duplicate_keys(datas)
+        if released or any("key" not in doc for doc in datas):
+            self.save_day(date, stored=stored, docs=datas)
+        return datas
+
+    def save_day(self, date: str, stored: List[Dict], docs: List[Dict]) -> int:
+        '''
+        save_day(self, date: str, stored: List[Dict], docs: List[Dict]): 將 date 的資料更新為 docs (依頁面順序)，只寫入新增、修改或移動的文件，回傳寫入與刪除的數量
+        stored: 資料庫中 date 目前的文件 (find_data() 的結果)
+        註: 為 docs 指定 key 與 order，Notion 的 block 已存在於資料庫時沿用原本的 key；
+            舊版沒有 key (或 key 重複) 的資料只在第一次以 replace_day() 整天改寫
+        '''
+        before: List[Dict] = [dict(doc) for doc in stored]  # docs 可能與 stored 為相同的物件
+        adopt_identity(docs, before)
+        assign_keys(docs)
+        assign_order(docs)
+
+        stored_keys: List[str] = [doc.get("key") for doc in before]
+        if None in stored_keys or len(set(stored_keys)) != len(stored_keys):
+            return self.db.replace_day(date=date, data=docs)
+
+        changed, removed = day_changes(before, docs)
+        return self.db.update_day(date, changed, removed)
+
+    def load_task_data(self, date: str) -> Dict:
+        '''
+        load_task_data(self, date: str): 取得 date 的資料，為每個項目指定 key 與 order，必要時寫入資料庫
+        註：不修改 self 的屬性，可以在背景執行緒中呼叫
+        '''
+        fetched_at: datetime = datetime.now(timezone.utc)
+        datas, flag, page_id = self.fetch_task_data(date)
+        last_edited_time: str = datas[0]["last_edited_time"] if datas else ''
+
+        self.save_day(date, stored=datas if flag else list(), docs=datas)
+        if not flag:
+            self.get_page_index().mark_synced(date, fetched_at=fetched_at)
+
+        return {
+            "date": date,
+            "datas": datas,
+            "flag": flag,
+            "page_id": page_id,
+            "last_edited_time": last_edited_time,
+        }
+
+    def pull_notion_data(self, date: str) -> int:
+        '''
+        pull_notion_data(self, date: str): 向 Notion 取得 date 的資料並取代資料庫中的資料 (單次 bulk write)，回傳項目數量
+        註: 與 synchronous_notion_to_db_data() 相同，尚未同步的本機操作會被捨棄
+        '''
+        page_index: PageIndex = self.get_page_index()
+        page: Dict = page_index.get(date) or dict()
+        edited_iso: str = page.get("last_edited_iso")  # 取得 block 前的版本，期間的變動會在下次同步取得
+        fetched_at: datetime = datetime.now(timezone.utc)
+
+        from ApiRequest import PageOperator
+        page_operator = PageOperator(currentDate=date, page_index=page_index)
+        datas: List[Dict] = page_operator.get_page_contents()
+        for data in datas:
+            data["base"] = snapshot(data)
+
+        with self.day_lock:
+            self.save_day(date, stored=self.db.find_data({"task_date": date}), docs=datas)
+            self.db.discard_operations(date)
+        page_index.mark_synced(date, edited_iso, fetched_at)
+        return len(datas)
+
+    def poll_remote_changes(self, max_requests: int = 10) -> Dict:
+        '''
+        poll_remote_changes(self, max_requests: int = 10): 查詢 Notion 上有變動的 page，並以 merge_with_notion() 將變動合併至資料庫 (與「更新」相同的三方合併，不上傳)
+        回傳 {"changed": [已更新的 task_date], "requests": 使用的請求數量}，途中失敗時另外包含 "error"
+        只更新本機已有資料、且沒有未同步修改的日期；超過 max_requests 後其餘日期留待下次
+        註: 以 sync_lock 與上傳 Notion 的流程互斥，避免上傳途中資料被取代；本機修改只在寫回資料庫時等待 (day_lock)
+        '''
+        with self.sync_lock:
+            page_index: PageIndex = self.get_page_index()
+            page_index.refresh()
+            requests: int = 1
+
+            candidates: List[str] = [date for date in page_index.dates()
+                                     if not page_index.is_synced(date)]
+            if not candidates:
+                return {"changed": list(), "requests": requests}
+
+            pending = set(self.db.pending_dates())
+            local_dates = {data["task_date"] for data in self.db.find_data(
+                {"task_date": {"$in": candidates}})}
+            candidates = [date for date in candidates
+                          if date in local_dates and date not in pending]
+
+            # 最近修改的日期優先
+            candidates.sort(key=lambda date: page_index.get(date, {}).get(
+                "last_edited_iso", ''), reverse=True)
+
+            result: Dict = {"changed": list(), "requests": requests}
+            for date in candidates:
+                if result["requests"] >= max_requests:
+                    break
+                try:
+                    result["requests"] += self._merge_day(date, push=False)[1]
+                except Exception as error:
+                    # 已更新的日期仍要回報，其餘留待下次
+                    result["error"] = error
+                    break
+                result["changed"].append(date)
+
+            return result
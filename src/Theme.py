@@ -0,0 +1,122 @@
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtGui import QIcon
+from typing import Dict
+import os
+
+
+class ThemeResources(object):
+    '''
+    ThemeResources(): 視窗的主題資源，icon 每個檔案只讀取一次，樣式表只產生一次
+    樣式表以視窗的 theme 屬性 (bright / dark) 區分模式，切換模式時只需更改屬性並 repolish，不需重新建立元件
+
+    methods:
+    icon(): 取得快取的 icon
+    button_icon(): 取得按鈕在指定模式的 icon
+    stylesheet(): 取得包含所有模式的樣式表 (套用於 QApplication)
+    repolish(): 屬性改變後重新套用樣式
+    '''
+    STYLES: Dict[str, Dict[str, str]] = {
+        'bright': {
+            'window-bg': '',
+            'text-color': 'black',
+            'btn-border': 'rgb(192, 192, 192)',
+            'btn-bg-color': 'white',
+            'btn-bg-hover': 'rgb(224, 224, 224)'
+        },
+        'dark': {
+            'window-bg': 'rgb(64, 64, 64)',
+            'text-color': 'white',
+            'btn-border': 'rgb(192, 192, 192)',
+            'btn-bg-color': '',
+            'btn-bg-hover': 'rgb(104, 198, 104)'
+        }
+    }
+
+    def __init__(self, root: str = 'Notion-Widget', icon_dir: str = None):
+        self.root: str = root  # 主視窗的 objectName，樣式只套用於其底下的元件
+        self.icon_dir: str = icon_dir if icon_dir else os.path.join(
+            os.path.dirname(__file__), '../images')
+        self.icons: Dict[str, QIcon] = dict()
+        self._stylesheet: str = None
+
+    def icon_path(self, filename: str) -> str:
+        '''
+        icon_path(self, filename: str): 回傳 icon 檔案的絕對路徑
+        '''
+        return os.path.join(self.icon_dir, filename)
+
+    def icon(self, filename: str) -> QIcon:
+        '''
+        icon(self, filename: str): 回傳 filename 的 QIcon，同一個檔案只讀取一次 (QIcon 會快取解碼後的圖片)
+        '''
+        icon: QIcon = self.icons.get(filename)
+        if icon is None:
+            icon = QIcon(self.icon_path(filename))
+            self.icons[filename] = icon
+        return icon
+
+    def button_icon(self, name: str, mode: str) -> QIcon:
+        '''
+        button_icon(self, name: str, mode: str): 回傳按鈕在 mode (bright / dark) 的 icon
+        '''
+        return self.icon(f'{name}-{mode}.ico')
+
+    def stylesheet(self) -> str:
+        '''
+        stylesheet(self): 回傳所有模式的樣式表，第一次呼叫時產生
+        註: 以 #root[theme="mode"] 作為前綴，模式由主視窗的 theme 屬性決定
+        '''
+        if self._stylesheet is None:
+            self._stylesheet = '\n'.join(
+                self._mode_stylesheet(mode, styles) for mode, styles in self.STYLES.items())
+        return self._stylesheet
+
+    def _mode_stylesheet(self, mode: str, styles: Dict[str, str]) -> str:
+        scope: str = f'#{self.root}[theme="{mode}"]'
+        return f"""
+            QMainWindow{scope} {{
+                background-color: {styles['window-bg']};
+            }}
+            {scope} QWidget {{
+                background-color: {styles['window-bg']};
+                color: {styles['text-color']};
+                font-size: 12px;
+            }}
+            {scope} QLabel {{
+                color: {styles['text-color']};
+                font-family: '新細明體';
+                font-size: 16px;
+            }}
+            {scope} QLabel#metrics-overlay {{
+                background-color: rgba(0, 0, 0, 190);
+                color: rgb(220, 255, 220);
+                font-family: 'Consolas', 'Courier New', monospace;
+                font-size: 11px;
+            }}
+            {scope} QListView {{
+                background-color: rgba(255, 255, 255, 0);
+                border: none;
+            }}
+            {scope} QPushButton {{
+                border: 1px solid {styles['btn-border']};
+                border-radius: 12px;
+                background-color: {styles['btn-bg-color']};
+            }}
+            {scope} QPushButton#mode {{
+                border-radius: 16px;
+            }}
+            {scope} QPushButton:hover {{
+                background-color: {styles['btn-bg-hover']};
+            }}
+        """
+
+    @staticmethod
+    def repolish(widget: QWidget):
+        '''
+        repolish(widget: QWidget): 屬性改變後，重新套用 widget 與其所有子元件的樣式
+        '''
+        style = widget.style()
+        for target in [widget] + widget.findChildren(QWidget):
+            style.unpolish(target)
+            style.polish(target)
+            target.update()
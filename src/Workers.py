@@ -0,0 +1,149 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from typing import Callable, Dict, List
+
+
+class WorkerSignals(QObject):
+    '''
+    WorkerSignals(QObject): Worker 完成時通知 GUI 執行緒的 signal (QRunnable 本身無法發送 signal)
+    finished: (job_id, result)
+    error: (job_id, exception)
+    '''
+    finished = pyqtSignal(int, object)
+    error = pyqtSignal(int, object)
+
+
+class Worker(QRunnable):
+    '''
+    Worker(QRunnable): 在 QThreadPool 中執行 func，結果透過 WorkerSignals 傳回 GUI 執行緒
+    '''
+
+    def __init__(self, job_id: int, key: str, func: Callable, cancellable: bool = False):
+        super().__init__()
+        self.setAutoDelete(False)  # 由 TaskDispatcher 保留參考，完成後才釋放
+
+        self.job_id: int = job_id
+        self.key: str = key
+        self.func: Callable = func
+        self.cancellable: bool = cancellable  # 只有單純讀取的工作可以在過期時取消
+        self.callbacks: List = list()  # [(channel, token, on_result, on_error)]
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self.func()
+        except Exception as error:
+            self.signals.error.emit(self.job_id, error)
+        else:
+            self.signals.finished.emit(self.job_id, result)
+
+
+class TaskDispatcher(QObject):
+    '''
+    TaskDispatcher(QObject): 將網路與資料庫的 I/O 交給背景執行緒，完成後在 GUI 執行緒呼叫 callback
+
+    - 相同 key 的工作尚未完成時，新的請求直接共用該工作的結果 (coalesce)
+    - 同一個 channel 只有最新的請求會收到結果；尚未開始執行的過期工作會從 QThreadPool 移除
+
+    methods:
+    submit(): 送出背景工作
+    supersede(): 使 channel 中尚未完成的請求過期
+    shutdown(): 等待所有背景工作完成
+    '''
+    error = pyqtSignal(str, object)  # (key, exception)，沒有提供 on_error 的工作發生錯誤時發送
+
+    def __init__(self, parent: QObject = None, max_threads: int = 4):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+
+        self.workers: Dict[int, Worker] = dict()  # job_id -> Worker
+        self.jobs: Dict[str, int] = dict()  # key -> 最新的 job_id
+        self.latest: Dict[str, int] = dict()  # channel -> 最新請求的 token
+        self.counter: int = 0
+
+    def submit(self, key: str, func: Callable, on_result: Callable = None, on_error: Callable = None,
+               channel: str = None, coalesce: bool = True, cancellable: bool = False) -> int:
+        '''
+        submit(self, key, func, on_result, on_error, channel, coalesce, cancellable): 送出背景工作，回傳此次請求的 token
+        key: 工作的識別名稱，例如 fetch-2024-11-13
+        channel: 同一 channel 只保留最新請求的 callback (例如 content)
+        coalesce: False 時不共用執行中的工作 (例如寫入資料後需要重新讀取)
+        cancellable: 過期且尚未開始時可以取消，包含寫入的工作不應設為 True
+        '''
+        self.counter += 1
+        token: int = self.counter
+
+        if channel:
+            self.latest[channel] = token
+
+        worker: Worker = self.workers.get(
+            self.jobs.get(key)) if coalesce else None
+        if worker is None:
+            worker = Worker(job_id=token, key=key, func=func,
+                            cancellable=cancellable)
+            worker.signals.finished.connect(self._on_finished)
+            worker.signals.error.connect(self._on_error)
+            self.workers[token] = worker
+            self.jobs[key] = token
+            self.pool.start(worker)
+
+        worker.callbacks.append((channel, token, on_result, on_error))
+
+        if channel:
+            self._cancel_stale(channel)
+
+        return token
+
+    def supersede(self, channel: str):
+        '''
+        supersede(self, channel: str): 使 channel 中尚未完成的請求過期 (例如已從快取取得資料，不需要再顯示背景讀取的結果)
+        '''
+        self.counter += 1
+        self.latest[channel] = self.counter
+        self._cancel_stale(channel)
+
+    def _is_current(self, channel: str, token: int) -> bool:
+        return not channel or self.latest.get(channel) == token
+
+    def _cancel_stale(self, channel: str):
+        '''
+        _cancel_stale(self, channel: str): 移除可取消、尚未開始執行且所有 callback 都已過期的工作
+        '''
+        for job_id, worker in list(self.workers.items()):
+            if not worker.cancellable or any(self._is_current(cb_channel, token) or cb_channel != channel
+                   for cb_channel, token, _, _ in worker.callbacks):
+                continue
+
+            if self.pool.tryTake(worker):
+                self._release(job_id)
+
+    def _release(self, job_id: int) -> Worker:
+        worker: Worker = self.workers.pop(job_id)
+        if self.jobs.get(worker.key) == job_id:
+            del self.jobs[worker.key]
+        return worker
+
+    @pyqtSlot(int, object)
+    def _on_finished(self, job_id: int, result):
+        worker: Worker = self._release(job_id)
+        for channel, token, on_result, _ in worker.callbacks:
+            if on_result and self._is_current(channel, token):
+                on_result(result)
+
+    @pyqtSlot(int, object)
+    def _on_error(self, job_id: int, error: Exception):
+        worker: Worker = self._release(job_id)
+        for channel, token, _, on_error in worker.callbacks:
+            if not self._is_current(channel, token):
+                continue
+
+            if on_error:
+                on_error(error)
+            else:
+                self.error.emit(worker.key, error)
+
+    def shutdown(self, timeout_ms: int = 10000) -> bool:
+        '''
+        shutdown(self, timeout_ms: int = 10000): 等待所有背景工作完成 (例如關閉視窗前確保資料已寫入)
+        '''
+        return self.pool.waitForDone(timeout_ms)
@@ -0,0 +1,80 @@
+from PyQt5.QtCore import QObject, QTimer
+from typing import Callable, Dict, List, Tuple
+from Workers import TaskDispatcher
+import threading
+
+
+class WriteBehindBuffer(QObject):
+    '''
+    WriteBehindBuffer(QObject): 暫存內容區塊的修改，停止輸入一段時間後才以單次 bulk write 寫入資料庫
+    同一個項目同一個欄位的多次修改只保留最後的狀態，例如輸入一句話只會寫入一次
+
+    methods:
+    add(): 加入一筆修改並重新計時
+    flush(): 立即於背景寫入所有暫存的修改
+    take(): 取出並清空暫存的修改
+    wait_for_writes(): 等待背景寫入完成 (於背景執行緒讀取資料前呼叫)
+    '''
+
+    def __init__(self, dispatcher: TaskDispatcher, writer: Callable, interval_ms: int = 500, parent: QObject = None):
+        super().__init__(parent)
+        self.dispatcher: TaskDispatcher = dispatcher
+        self.writer: Callable = writer  # writer(operations: List[Tuple[Dict, Dict]])
+        self.pending: Dict[str, Tuple[Dict, Callable]] = dict()  # key/欄位 -> (query, 讀取最新資料的函式)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+
+        self.in_flight: int = 0  # 背景寫入中的批次數量
+        self.condition = threading.Condition()
+        self.counter: int = 0
+
+    def add(self, key: str, query: Dict, read: Callable):
+        '''
+        add(self, key: str, query: Dict, read: Callable): 加入一筆修改，read() 於寫入時才呼叫以取得元件的最新狀態
+        '''
+        self.pending[key] = (query, read)
+        self.timer.start()
+
+    def take(self) -> List[Tuple[Dict, Dict]]:
+        '''
+        take(self): 取出並清空暫存的修改，回傳 [(query, new_data)]
+        註：需在 GUI 執行緒呼叫，read() 會讀取 model 中文件的狀態
+        '''
+        self.timer.stop()
+        operations: List[Tuple[Dict, Dict]] = [
+            (query, read()) for query, read in self.pending.values()]
+        self.pending.clear()
+        return operations
+
+    def flush(self):
+        '''
+        flush(self): 立即於背景寫入所有暫存的修改
+        '''
+        operations = self.take()
+        if not operations:
+            return
+
+        with self.condition:
+            self.in_flight += 1
+
+        def job():
+            try:
+                self.writer(operations)
+            finally:
+                with self.condition:
+                    self.in_flight -= 1
+                    self.condition.notify_all()
+
+        self.counter += 1
+        self.dispatcher.submit(
+            key=f'write-behind-{self.counter}', func=job, coalesce=False)
+
+    def wait_for_writes(self, timeout: float = None) -> bool:
+        '''
+        wait_for_writes(self, timeout: float = None): 等待已送出的寫入完成，確保之後讀取到最新資料
+        '''
+        with self.condition:
+            return self.condition.wait_for(lambda: self.in_flight == 0, timeout)
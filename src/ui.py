@@ -1,11 +1,25 @@
-from PyQt5.QtWidgets import QApplication, QMainWindow, QMessageBox, QWidget, QHBoxLayout, QVBoxLayout, QLabel, QPushButton, QCheckBox, QScrollArea, QTextEdit
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QIcon, QFont
-from ApiRequest import PageOperator
-from ConnectDB import DBOperation
+import time
+_STARTED: float = time.perf_counter()  # --profile-startup 由此開始計算 (包含載入模組的時間)
+
+from PyQt5.QtWidgets import QAbstractItemView, QApplication, QMainWindow, QMessageBox, QShortcut, QWidget, QHBoxLayout, QVBoxLayout, QLabel, QPushButton
+from PyQt5.QtCore import Qt, QEvent, QSize, QTimer
+from PyQt5.QtGui import QFont, QKeySequence
+from BlockIdentity import new_local_key
+from BlockMerge import MergeConflictError
+from BlockTypes import get_block_type
+from ContentView import ContentModel, ContentView
+from DayCache import DayCache
+from Metrics import METRICS
+from MetricsOverlay import MetricsOverlay
+from RemotePoller import RemotePoller
+from Startup import DaySnapshot, StartupProfiler
+from SyncReplayer import SyncReplayer
+from TaskData import HandleAPIandDB
+from Theme import ThemeResources
+from Workers import TaskDispatcher
+from WriteBuffer import WriteBehindBuffer
 from datetime import date, datetime, timedelta
 from typing import Dict, List
-import time
 import sys
 import os
 
@@ -42,103 +56,6 @@ class DatePicker(object):
         self.current += timedelta(days=1)
 
 
-class HandleAPIandDB(object):
-    def __init__(self):
-        self.db = DBOperation()
-        self.flag: bool = True  # 是否為資料庫的資料，True 為是，False 為 API 的資料
-
-        self.data: List[Dict] = None
-        self.page_id: str = None  # 當前頁面的 page_id, 相當於創建 block 時的 parent page_id
-
-    def get_task_data(self, date: str) -> List[Dict]:
-        '''
-        get_task_data(self): 取得當日資料庫的資料，若無則向 Notion API 請求取得最新資料，回傳找到的所有資料 List[Dict]
-        '''
-        datas: List[Dict] = self.db.find_data({"task_date": date})
-        if len(datas) == 0:
-            self.flag: bool = False
-            page_operator = PageOperator(currentDate=date)
-            datas = page_operator.get_page_contents()
-            self.page_id = page_operator.current_page_id
-
-        else:
-            self.page_id = datas[0]["parent"]["page_id"]
-            self.flag: bool = True
-
-        self.data = datas
-        return datas
-
-    def create_db_data(self, data: List[Dict]):
-        '''
-        create_db_data(self, data: List[Dict]): 若資料庫不存在資料，則需要在創建 PyQt5 元件的時候將 ObjectName 也新增至 DB 做儲存
-        '''
-        self.db.insert_data(data=data)
-
-    def update_content(self, query: List[Dict], new_data):
-        '''
-        update_content(query, new_data): 更新資料庫的內容
-        '''
-        self.db.update_data(query={"$and": query}, new_data=new_data)
-
-    def synchronous_notion_to_db_data(self, date: str):
-        '''
-        synchronous_notion_to_db_data(self, date: str): 將 Notion 資料更新至 Database
-        註：此處僅處理刪除 date 的 db 資料
-        '''
-        self.db.delete_data({"task_date": date})
-
-    def upload_data_db_to_notion(self, date: str):
-        '''
-        upload_data_db_to_notion(self, date: str): 將 Database 資料更新至 Notion
-        '''
-        target = self.db.find_data({"task_date": date})
-
-        # 將 MongoDB 的資料轉成 Notion API 格式
-        notion_blocks: List[Dict] = list()
-        for data in target:
-            notion_type: str = data["type"]
-            block = {
-                "object": "block",
-                "type": notion_type,
-            }
-
-            if notion_type == "to_do":
-                block[notion_type] = {
-                    "rich_text": [
-                        {
-                            "type": "text",
-                            "text": {
-                                "content": data["content_text"],
-                                "link": None
-                            }
-                        }
-                    ],
-                    "checked": data.get("checked", False)
-                }
-            else:
-                block[notion_type] = {
-                    "rich_text": [
-                        {
-                            "type": "text",
-                            "text": {
-                                "content": data["content_text"],
-                                "link": None
-                            }
-                        }
-                    ]
-                }
-            notion_blocks.append(block)
-
-        # 呼叫 API
-        PageOperator(currentDate=date).upload_page_data(data=notion_blocks)
-
-    def delete_db_data(self, date: str):
-        '''
-        delete_db_data(self, date: str): 刪除 date 的 db 資料
-        '''
-        self.db.delete_data({"task_date": date})
-
-
 class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
     """
     DesktopWidget(QMainWindow, DatePicker):
@@ -154,40 +71,69 @@ class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
     next: 下一天
     """
 
-    def __init__(self):
+    def __init__(self, profiler: StartupProfiler = None):
         QMainWindow.__init__(self)
         DatePicker.__init__(self)
-        HandleAPIandDB.__init__(self)
+        HandleAPIandDB.__init__(self)  # MongoDB 與 Notion 於第一次使用時才在背景連接
+
+        self.profiler: StartupProfiler = profiler if profiler else StartupProfiler()
+        self.snapshot = DaySnapshot()  # 最後顯示的日期資料，啟動時在取得資料前先顯示
+        self.current_payload: Dict = None  # 目前顯示的 load_task_data() 結果
 
         # UI 的相關屬性
         self.dark: bool = False  # 當前背景是 Dark 還是 Bright
-        self.windows_style: Dict = {
-            'bright': {
-                'window-bg': '',
-                'text-color': 'black',
-                'btn-border': 'rgb(192, 192, 192)',
-                'btn-bg-color': 'white',
-                'btn-bg-hover': 'rgb(224, 224, 224)'
-            },
-            'dark': {
-                'window-bg': 'rgb(64, 64, 64)',
-                'text-color': 'white',
-                'btn-border': 'rgb(192, 192, 192)',
-                'btn-bg-color': '',
-                'btn-bg-hover': 'rgb(104, 198, 104)'
-            }
-        }
+        self.theme = ThemeResources()  # icon 與樣式表只建立一次，切換模式時重複使用
+        self.mode_button: QPushButton = None  # 切換背景模式的按鈕
+        self.buttons: Dict[str, QPushButton] = dict()  # 按鈕區塊的按鈕 (objectName -> 按鈕)
 
         # 需要更新內容元件的變數
         self.date_label = QLabel('', self)  # 定義日期的初始狀態
         self.last_edited_time_label = QLabel('', self)  # 定義最後 Notion 更新時間
-
-        self.content_widget = QWidget()
-        self.v1_layout = QVBoxLayout(self.content_widget)
-
-        # - 創建 UI 同時需要向 db 索取資料 -
+        self.last_edited_time: str = None  # 目前顯示日期的 Notion 最後更新時間
+
+        # 網路與資料庫的 I/O 於背景執行，避免視窗凍結
+        self.dispatcher = TaskDispatcher(self)
+        self.dispatcher.error.connect(
+            lambda key, error: self._show_error_message(error))
+
+        # 已整理好的當日資料，切換日期時優先使用，並於背景預先讀取前後一天
+        self.day_cache = DayCache()
+
+        # 內容區塊的修改先暫存，停止輸入後才一次寫入資料庫
+        self.write_buffer = WriteBehindBuffer(
+            self.dispatcher, writer=self.apply_local_edits, parent=self)
+
+        # 本機的修改記錄於 SyncQueue，定期於背景同步至 Notion，離線時也可以繼續使用
+        self.sync_replayer = SyncReplayer(
+            self.dispatcher, replay=self.replay_operations, parent=self)
+        self.sync_replayer.finished.connect(self._handle_replay_finished)
+        self.sync_replayer.start()
+
+        # 定期查詢 Notion 上的變動並合併至資料庫，目前顯示的日期只更新有變動的項目
+        self.remote_changed_dates: set = set()  # 已合併但尚未重新顯示的日期
+        self.remote_poller = RemotePoller(
+            self.dispatcher, poll=self._poll_remote_changes,
+            is_busy=lambda: bool(self.write_buffer.pending), parent=self)
+        self.remote_poller.finished.connect(self._handle_poll_finished)
+        self.remote_poller.start()
+
+        # 內容區塊只繪製可見的項目，切換日期時只更新有差異的項目
+        self.content_view = ContentView()
+        self.content_view.content_model.edited.connect(
+            self._handle_content_events)
+
+        # - 先建立視窗與快照的內容，資料於背景連接資料庫後取得 -
         self._windows_setting()
-        self.ui()
+        with METRICS.timer('render.build'):
+            self.ui()
+        self.profiler.mark('ui')
+
+        # 除錯用: Ctrl+Shift+M 顯示各操作的延遲統計，Ctrl+Shift+E 匯出 (JSON / Prometheus)
+        self.metrics_overlay = MetricsOverlay(self)
+        QShortcut(QKeySequence('Ctrl+Shift+M'), self, activated=self.metrics_overlay.toggle)
+        QShortcut(QKeySequence('Ctrl+Shift+E'), self, activated=self._export_metrics)
+        self._update_content_section()
+        self._render_snapshot()
 
     def _windows_setting(self):
         '''
@@ -198,41 +144,27 @@ class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
         self.setWindowTitle('Notion Widget')
         self.setWindowFlags(self.windowFlags() | Qt.WindowStaysOnTopHint)
 
-        self.setWindowIcon(QIcon(self._handle_icon_path('task.ico')))
+        self.setWindowIcon(self.theme.icon('task.ico'))
         self.setFixedSize(360, 280)
 
-        styles: Dict = self.windows_style['dark'] if self.dark else self.windows_style['bright']
-        self.setStyleSheet(f"""
-            QMainWindow{{
-                background-color: {styles['window-bg']};
-            }}
-            QWidget {{
-                background-color: {styles['window-bg']};
-                color: {styles['text-color']};
-                font-size: 12px;
-            }}
-            QLabel {{
-                color: {styles['text-color']};
-                font-family: '新細明體';
-                font-size: 16px;
-            }}
-        """)
-
-    def _handle_icon_path(self, filename: str) -> str:
-        '''
-        _handle_icon_path(self, filename: str) -> str: 處理 Icon 文件的絕對路徑
-        filename: str, 圖片文件的名稱
-        '''
-        return os.path.join(os.path.dirname(__file__), f'../images/{filename}')
+        # 所有模式的樣式只產生一次並套用於整個應用程式，以 theme 屬性選擇目前的模式
+        self.setProperty('theme', 'dark' if self.dark else 'bright')
+        QApplication.instance().setStyleSheet(self.theme.stylesheet())
 
     def _switch_bg_mode(self):
         '''
-        _switch_bg_mode(self): 切換背景樣式，重新渲染 UI
+        _switch_bg_mode(self): 切換背景樣式，只更換 icon 與重新套用樣式，不重新建立元件
         '''
         self.dark = not self.dark
+        mode: str = 'dark' if self.dark else 'bright'
 
-        self._windows_setting()
-        self.ui()
+        self.setProperty('theme', mode)
+        self.mode_button.setIcon(self.theme.icon(
+            'bright.ico' if self.dark else 'dark.ico'))
+        for name, button in self.buttons.items():
+            button.setIcon(self.theme.button_icon(name, mode))
+
+        self.theme.repolish(self)
 
     def _show_message_box(self, name: str):
         '''
@@ -242,7 +174,7 @@ class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
         message_box.setWindowTitle('提醒訊息')
         message_box.setWindowFlags(
             message_box.windowFlags() | Qt.WindowStaysOnTopHint)
-        message_box.setWindowIcon(QIcon(self._handle_icon_path('task.ico')))
+        message_box.setWindowIcon(self.theme.icon('task.ico'))
 
         if name == 'update':
             message_box.setText('是否確定將 Notion 資料同步至本機資料庫')
@@ -257,18 +189,71 @@ class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
         message_box.exec_()
 
         if message_box.clickedButton() == btn_ok:
+            date: str = self.format_date()
             if name == "update":
-                self.synchronous_notion_to_db_data(self.format_date())
+                action = lambda: self.synchronous_notion_to_db_data(date)
 
             elif name == "submit":
-                self.upload_data_db_to_notion(self.format_date())
+                action = lambda: self._submit_operations(date)
 
-            # 重新渲染 UI
-            self._update_content_section()
+            # 於背景同步完成後重新渲染 UI
+            self._update_content_section(before=action)
 
         elif message_box.clickedButton() == btn_cancel:
             pass
 
+    def _submit_operations(self, date: str):
+        '''
+        _submit_operations(self, date: str): 立即將 date 與 SyncQueue 中到期的操作同步至 Notion (於背景執行緒呼叫)
+        註：失敗時操作仍保留於 SyncQueue，之後會自動重試
+        '''
+        result: Dict = self.replay_operations(dates=[date])
+        if isinstance(result["failed"].get(date), MergeConflictError):
+            raise result["failed"][date]
+        if date in result["failed"]:
+            raise SystemError(
+                f'{result["failed"][date]}\n本機資料已保留，稍後會自動重新同步')
+
+    def _handle_replay_finished(self, result: Dict):
+        '''
+        _handle_replay_finished(self, result: Dict): 背景同步完成後，使已同步日期的快取失效，當前日期則重新讀取 (取得新增 block 的 id)
+        '''
+        for task_date in result["synced"]:
+            self.day_cache.invalidate(task_date)
+
+        if self.format_date() in result["synced"]:
+            self._update_content_section()
+
+    def _poll_remote_changes(self, max_requests: int) -> Dict:
+        '''
+        _poll_remote_changes(self, max_requests: int): 等待暫存的修改寫入後，將 Notion 的變動合併至資料庫 (於背景執行緒呼叫)
+        '''
+        self.write_buffer.wait_for_writes(timeout=30)
+        return self.poll_remote_changes(max_requests=max_requests)
+
+    def _handle_poll_finished(self, result: Dict):
+        '''
+        _handle_poll_finished(self, result: Dict): 使有變動日期的快取失效，目前顯示的日期於使用者沒有在編輯時重新讀取
+        註：重新讀取後 reconcile 只會更新有變動的項目
+        '''
+        for task_date in result["changed"]:
+            self.day_cache.invalidate(task_date)
+        self.remote_changed_dates.update(result["changed"])
+
+        date: str = self.format_date()
+        editing: bool = self.content_view.state() == QAbstractItemView.EditingState
+        if date in self.remote_changed_dates and not editing and not self.write_buffer.pending:
+            self.remote_changed_dates.discard(date)
+            self._update_content_section()
+
+    def changeEvent(self, event):
+        '''
+        changeEvent(self, event): 視窗切換回前景時縮短背景輪詢的間隔
+        '''
+        if event.type() == QEvent.ActivationChange and self.isActiveWindow():
+            self.remote_poller.note_activity()
+        super().changeEvent(event)
+
     def _handle_btn_events(self):
         '''
         _handle_btn_events(self): 處理按鈕功能觸發時，引導相應的處理函式
@@ -276,265 +261,272 @@ class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
         '''
         # objectName 於 ui 中的 btn_setting 的 key
         btn_object_name = self.sender().objectName()
+        self.remote_poller.note_activity()
 
         key_functions: Dict[str, function] = {
             'previous': self.previous_day,
             'next': self.next_day,
             'update': lambda: self._show_message_box(name='update'),
             'submit': lambda: self._show_message_box(name='submit'),
-            'bullet-list': lambda: self._create_bullet_list(date=self.format_date()),
-            'to-do': lambda: self._create_to_do(date=self.format_date()),
-            'P': lambda: self._create_paragraph(date=self.format_date())
+            'bullet-list': lambda: self._create_block(date=self.format_date(), block_type='bulleted_list_item'),
+            'to-do': lambda: self._create_block(date=self.format_date(), block_type='to_do'),
+            'P': lambda: self._create_block(date=self.format_date(), block_type='paragraph')
         }
 
         if btn_object_name in key_functions:
             key_functions[btn_object_name]()
 
-        self.ui()  # 將整個 Widget 重新渲染一次
+        # 切換日期時只更新日期與內容區塊，按鈕等元件保持不變
+        if btn_object_name in ('previous', 'next'):
+            self.date_label.setText(self.format_date())
+            self._update_content_section()
 
-    def _handle_content_events(self):
+    def _handle_content_events(self, data: Dict, field: str):
         '''
-        _handle_content_events(self): 處理 content 區塊中的事件。例如：更新 TextEdit 內容、CheckBox 狀態等
-        註：一旦內容變動即時與 db 做更新資訊的操作
+        _handle_content_events(self, data: Dict, field: str): 處理 content 區塊中的事件。例如：更新文字內容、CheckBox 狀態等
+        data: 被修改的文件 (ContentModel 中的資料)，field: 修改的欄位 content_text 或 checked
+        註：修改先暫存於 write_buffer，停止輸入後才與 db 做更新資訊的操作
         '''
-        event_object_name = self.sender().objectName()
-        object_info = event_object_name.split('-')
-        _, object_type, object_element = object_info[0], object_info[1], object_info[2]
+        self.day_cache.invalidate(data["task_date"])
+        self.remote_poller.note_activity()
 
-        # - 更新資料庫內容 -
-        query: List[Dict] = [
-            {"task_date": self.format_date(), "type": object_type}
-        ]
-        last_edited_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # - 更新資料庫內容 (以 key 只更新這一份文件) -
+        if field not in ('checked', 'content_text'):
+            raise ValueError('Object 類型不正確')
+
+        key: str = data["key"]
+        query: Dict = {"task_date": data["task_date"], "key": key}
+        model: ContentModel = self.content_view.content_model
+
+        # 寫入時才讀取文件的最新狀態
+        def read() -> Dict:
+            current: Dict = model.document(key) or data
+            return {
+                field: current[field],
+                "last_edited_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+
+        self.write_buffer.add(key=f'{key}/{field}', query=query, read=read)
+        # - End. -
+
+    def _load_and_cache(self, date: str) -> Dict:
+        '''
+        _load_and_cache(self, date: str): 執行 load_task_data() 並將結果寫入 day_cache
+        註：讀取期間若快取已失效 (例如使用者修改了內容)，則不寫入過期的結果
+        '''
+        version: int = self.day_cache.version(date)
+        with METRICS.timer('load.day') as record:
+            payload: Dict = self.load_task_data(date)
+            record["size"] = len(payload["datas"])
+        self.day_cache.put(date, payload, version=version)
+        return payload
 
-        if object_element == 'checkbox':
-            query.append(
-                {"checkbox_ObjectName": event_object_name})
+    def _prefetch_adjacent(self, date: str):
+        '''
+        _prefetch_adjacent(self, date: str): 於背景預先讀取 date 前後一天的資料，讓切換日期時直接使用快取
+        '''
+        current = datetime.strptime(date, '%Y-%m-%d')
+        for offset in (-1, 1):
+            target: str = (current + timedelta(days=offset)
+                           ).strftime('%Y-%m-%d')
+            if target in self.day_cache:
+                continue
 
-            # 取得觸發事件元件的狀態
-            checkbox = self.findChild(QCheckBox, event_object_name)
-            self.update_content(query=query, new_data={
-                                "checked": checkbox.isChecked(),
-                                "last_edited_time": last_edited_time
-                                })
+            self.dispatcher.submit(key=f'fetch-{target}',
+                                   func=lambda target=target: self._load_and_cache(
+                                       target),
+                                   on_error=lambda error: None,  # 預先讀取失敗時忽略，切換日期時會再讀取一次
+                                   cancellable=True)
 
-        elif object_element == 'content':
-            query.append({"content_ObjectName": event_object_name})
+    def _update_content_section(self, before=None):
+        '''
+        _update_content_section(self, before=None): 在背景取得當日資料後更新內容文字區塊的元件
+        before: 取得資料前需要先在背景執行的動作 (例如新增、上傳資料)，有值時不共用執行中的讀取工作
+        註：快速切換日期時只會顯示最後一次請求的日期
+        '''
+        date: str = self.format_date()
 
-            # 取得觸發事件元件的狀態
-            text_edit = self.findChild(QTextEdit, event_object_name)
-            self.update_content(query=query, new_data={
-                                "content_text": text_edit.toPlainText(),
-                                "last_edited_time": last_edited_time
-                                })
+        # 重新渲染前先寫入尚未儲存的修改 (model 中的文件即將被替換)
+        self.write_buffer.flush()
 
+        if before:
+            self.day_cache.invalidate(date)  # 新增或同步後資料會改變
         else:
-            raise ValueError('Object 類型不正確')
-        # - End. -
+            payload: Dict = self.day_cache.get(date)
+            if payload is not None:
+                self.dispatcher.supersede('content')  # 不再顯示其他日期的讀取結果
+                self._render_content_section(payload)
+                return
+
+        self.last_edited_time_label.setText("Notion 最後更新:\n載入中...")
+
+        def job() -> Dict:
+            self.write_buffer.wait_for_writes(timeout=30)
+            if before:
+                before()
+            return self._load_and_cache(date)
+
+        self.dispatcher.submit(key=f'fetch-{date}', func=job,
+                               on_result=self._render_content_section,
+                               on_error=self._handle_load_error,
+                               channel='content', coalesce=before is None,
+                               cancellable=before is None)
+
+    def _handle_load_error(self, error: Exception):
+        '''
+        _handle_load_error(self, error: Exception): 背景取得資料失敗時顯示錯誤訊息
+        '''
+        if isinstance(error, MergeConflictError):
+            self._resolve_conflicts(error)
+            return
+
+        self.last_edited_time_label.setText("Notion 最後更新:\n載入失敗")
+        self._show_error_message(error)
+
+    def _resolve_conflicts(self, error: MergeConflictError):
+        '''
+        _resolve_conflicts(self, error: MergeConflictError): 列出本機與 Notion 都修改的項目，由使用者選擇保留哪一邊後重新同步
+        註：只有兩邊修改同一欄位時才會詢問，其餘修改已自動合併
+        '''
+        field_names: Dict[str, str] = {
+            'content_text': '內容', 'checked': '勾選', 'deleted': '已於 Notion 刪除'}
+        lines: List[str] = [
+            f'[{field_names[conflict["field"]]}] 本機: {conflict["local"]} / Notion: {conflict["remote"]}'
+            for conflict in error.conflicts[:5]]
+        if len(error.conflicts) > 5:
+            lines.append(f'... 共 {len(error.conflicts)} 項')
+
+        message_box = QMessageBox(self)
+        message_box.setWindowTitle('同步衝突')
+        message_box.setIcon(QMessageBox.Question)
+        message_box.setText(f'{error}\n' + '\n'.join(lines))
+        btn_local = message_box.addButton('保留本機', QMessageBox.AcceptRole)
+        btn_remote = message_box.addButton('使用 Notion', QMessageBox.AcceptRole)
+        message_box.addButton('取消', QMessageBox.RejectRole)
+        message_box.exec_()
 
-    def _update_content_section(self):
+        resolution: str = None
+        if message_box.clickedButton() == btn_local:
+            resolution = 'local'
+        elif message_box.clickedButton() == btn_remote:
+            resolution = 'remote'
+
+        if resolution is None:
+            # 保持本機資料不變，修改仍保留於 SyncQueue
+            self._update_content_section()
+            return
+
+        self._update_content_section(before=lambda: self.resolve_conflicts(
+            error.date, resolution, push=error.push))
+
+    def _show_error_message(self, error: Exception):
         '''
-        _update_content_section(self): 更新內容文字區塊的元件
-        註：需要清空 content_widget 元件的內容
+        _show_error_message(self, error: Exception): 顯示背景工作的錯誤訊息
         '''
-        # - 清空布局 -
-        self.content_widget = QWidget()
-        self.v1_layout = QVBoxLayout(self.content_widget)
-        # - End. -
+        message_box = QMessageBox(self)
+        message_box.setWindowTitle('錯誤訊息')
+        message_box.setIcon(QMessageBox.Warning)
+        message_box.setText(str(error))
+        message_box.exec_()
+
+    def _render_snapshot(self):
+        '''
+        _render_snapshot(self): 快照為目前日期時先以唯讀方式顯示，取得資料後由 _render_content_section() 取代
+        '''
+        payload: Dict = self.snapshot.load()
+        if not payload or payload.get("date") != self.format_date():
+            return
+        if any("key" not in data for data in payload.get("datas", [])):
+            return  # 舊版的快照沒有 key
 
-        # 取得當日的 Notion 資料
-        datas, flag = self.get_task_data(self.format_date()), self.flag
-        is_add_new_items: bool = False  # 額外新增的資料要放入 Pyqt5 的元件中
+        with METRICS.timer('render.snapshot', size=len(payload.get("datas", []))):
+            self.content_view.reconcile(payload.get("datas", []), read_only=True)
+        self.profiler.mark('snapshot')
+
+    def _render_content_section(self, payload: Dict):
+        '''
+        _render_content_section(self, payload: Dict): 依 load_task_data() 的結果更新內容文字區塊的元件
+        '''
+        self.write_buffer.flush()  # reconcile 會替換 model 中的文件，先寫入載入期間的修改
+
+        self.flag = payload["flag"]
+        self.page_id = payload["page_id"]
+        self.data = payload["datas"]
+
+        self.last_edited_time = payload["last_edited_time"]
         self.last_edited_time_label.setText(
-            f"Notion 最後更新:\n{datas[0]["last_edited_time"]}")  # 顯示最後更新時間
-
-        # index 提供給 self.sender 接收具體是更改哪個元件
-        # 過濾沒有 content_text 欄位的資料
-        datas = [data for data in datas if 'content_text' in data]
-
-        for index, data in enumerate(datas):
-            if data['type'] == 'to_do':
-                if not flag:
-                    # - 用於從 API 提取資料時，需要提供資料庫資訊，用於 CRUD -
-                    data["checkbox_ObjectName"] = f'{index}-to_do-checkbox'
-                    data["content_ObjectName"] = f'{index}-to_do-content'
-                    # - End. -
-
-                elif 'content_ObjectName' not in data.keys():
-                    # - 表示透過 Pyqt5 新增元件 -
-                    data["checkbox_ObjectName"] = f'{index}-to_do-checkbox'
-                    data["content_ObjectName"] = f'{index}-to_do-content'
-                    is_add_new_items = True
-                    # - End. -
-
-                to_do_layout = QHBoxLayout()
-                checkbox = QCheckBox()
-                checkbox.setChecked(data['checked'])
-                checkbox.setObjectName(f'{index}-to_do-checkbox')
-
-                content = QTextEdit()
-                content.setText(data['content_text'])
-                content.setObjectName(f'{index}-to_do-content')
-                content.setFixedHeight(25)
-                content.setStyleSheet("""
-                QTextEdit {
-                    background-color: rgba(255, 255, 255, 0);
-                    border: none;
-                }
-                """)
-
-                # - 加入事件處理 -
-                checkbox.stateChanged.connect(self._handle_content_events)
-                content.textChanged.connect(self._handle_content_events)
-                # - End. -
-
-                to_do_layout.addWidget(checkbox)
-                to_do_layout.addWidget(content)
-                self.v1_layout.addLayout(to_do_layout)
-
-            if data['type'] == 'paragraph':
-                if not flag:
-                    # - 用於從 API 提取資料時，需要提供資料庫資訊，用於 CRUD -
-                    data["content_ObjectName"] = f'{
-                        index}-paragraph-content'
-                    # - End. -
-
-                elif 'content_ObjectName' not in data.keys():
-                    # - 表示透過 Pyqt5 新增元件 -
-                    data["content_ObjectName"] = f'{index}-paragraph-content'
-                    is_add_new_items = True
-                    # - End. -
-
-                content = QTextEdit()
-                content.setText(data['content_text'])
-                content.setObjectName(f'{index}-paragraph-content')
-                content.setFixedHeight(25)
-                content.setStyleSheet("""
-                QTextEdit {
-                    background-color: rgba(255, 255, 255, 0);
-                    border: none;
-                }
-                """)
-
-                # - 加入事件處理 -
-                content.textChanged.connect(self._handle_content_events)
-                # - End. -
-
-                self.v1_layout.addWidget(content)
-
-            if data['type'] == 'bulleted_list_item':
-                if not flag:
-                    # - 用於從 API 提取資料時，需要提供資料庫資訊，用於 CRUD -
-                    data["label_ObjectName"] = f'{
-                        index}-bulleted_list_item-label'
-                    data["content_ObjectName"] = f'{
-                        index}-bulleted_list_item-content'
-                    # - End. -
-
-                elif 'content_ObjectName' not in data.keys():
-                    # - 表示透過 Pyqt5 新增元件 -
-                    data["label_ObjectName"] = f'{
-                        index}-bulleted_list_item-label'
-                    data["content_ObjectName"] = f'{
-                        index}-bulleted_list_item-content'
-                    is_add_new_items = True
-                    # - End. -
-
-                bulleted_list_layout = QHBoxLayout()
-                label = QLabel('•')
-                label.setObjectName(f'{index}-bulleted_list_item-label')
-
-                content = QTextEdit()
-                content.setText(data['content_text'])
-                content.setObjectName(f'{index}-bulleted_list_item-content')
-                content.setFixedHeight(25)
-                content.setStyleSheet("""
-                QTextEdit {
-                    background-color: rgba(255, 255, 255, 0);
-                    border: none;
-                }
-                """)
-
-                # - 加入事件處理 -
-                content.textChanged.connect(self._handle_content_events)
-                # - End. -
-                bulleted_list_layout.addWidget(label)
-                bulleted_list_layout.addWidget(content)
-                self.v1_layout.addLayout(bulleted_list_layout)
-
-        if not flag:
-            self.create_db_data(data=datas)
-
-        elif is_add_new_items:
-            self.delete_db_data(date=self.format_date())
-            self.create_db_data(data=datas)
-
-    def _create_bullet_list(self, date: str):
-        '''
-        _create_bullet_list(self, date: str): 用於創建 Notion 中 bullet-list 物件
-        '''
-        # 所需資料: parent, task_date, last_edited_time, type, content_text(必要)
-        create_time = datetime.now().strftime('%y-%m-%d %H:%M:%S')
-        new_item = {
-            "id": self.page_id,
-            'parent': {"type": "page_id", "page_id": self.page_id},
-            'task_date': date,
-            'last_edited_time': create_time,
-            "type": "bulleted_list_item",
-            "content_text": "",
-        }
-        self.create_db_data(data=[new_item])
-        self._update_content_section()  # 重新渲染 UI
+            f"Notion 最後更新:\n{self.last_edited_time}")  # 顯示最後更新時間
 
-    def _create_to_do(self, date: str):
+        # 只新增、移除或更新有差異的項目
+        with METRICS.timer('render.content', size=len(self.data)):
+            self.content_view.reconcile(self.data)
+        self.remote_changed_dates.discard(payload["date"])
+        self.current_payload = payload
+
+        self.profiler.mark('data-ready')
+        self.profiler.report()
+
+        self._prefetch_adjacent(payload["date"])
+
+    def _create_block(self, date: str, block_type: str):
         '''
-        _create_to_do(self, date: str): 用於創建 Notion 中 to-do 物件
+        _create_block(self, date: str, block_type: str): 用於創建 Notion 中 block_type 類型的物件 (如: to_do, paragraph, bulleted_list_item)
+        註：各類型的預設欄位 (如 to_do 的 checked) 由 BlockTypes 定義
         '''
-        # 所需資料: parent, task_date, last_edited_time, type, checked(False), content_text(必要)
+        # 所需資料: task_date, last_edited_time, type, 以及類型的預設欄位 (parent 於背景由 create_local_item() 依日期設定)
         create_time = datetime.now().strftime('%y-%m-%d %H:%M:%S')
+        # 尚未同步至 Notion 前沒有 block id，以本機產生的 key 識別
         new_item = {
-            "id": self.page_id,
-            'parent': {"type": "page_id", "page_id": self.page_id},
+            "key": new_local_key(),
             'task_date': date,
             'last_edited_time': create_time,
-            "type": "to_do",
-            "checked": False,
-            "content_text": "",
+            "type": block_type,
         }
-        self.create_db_data(data=[new_item])
-        self._update_content_section()  # 重新渲染 UI
+        new_item.update(get_block_type(block_type).new_fields())
+
+        # 於背景寫入資料庫後重新渲染 UI
+        self._update_content_section(
+            before=lambda: self.create_local_item(item=new_item))
 
-    def _create_paragraph(self, date: str):
+    def _export_metrics(self):
         '''
-        _create_paragraph(self, date: str): 用於創建 Notion 中 paragraph 物件
+        _export_metrics(self): 將延遲統計匯出為 JSON 與 Prometheus text format，並顯示檔案位置
         '''
-        # 所需資料: parent, task_date, last_edited_time, type, content_text(必要)
-        create_time = datetime.now().strftime('%y-%m-%d %H:%M:%S')
-        new_item = {
-            "id": self.page_id,
-            'parent': {"type": "page_id", "page_id": self.page_id},
-            'task_date': date,
-            'last_edited_time': create_time,
-            "type": "paragraph",
-            "content_text": "",
-        }
-        self.create_db_data(data=[new_item])
-        self._update_content_section()  # 重新渲染 UI
+        try:
+            paths: List[str] = self.metrics_overlay.export()
+        except OSError as error:
+            self._show_error_message(error)
+            return
+
+        QMessageBox.information(self, '匯出統計', '\n'.join(paths))
+
+    def closeEvent(self, event):
+        '''
+        closeEvent(self, event): 關閉視窗前寫入暫存的修改並等待背景工作完成，避免資料寫入中斷
+        '''
+        self.write_buffer.flush()
+        self.dispatcher.shutdown()
+
+        # 設定 NOTION_WIDGET_METRICS_EXPORT 時於關閉前匯出統計 (.prom 為 Prometheus text format，其餘為 JSON)
+        metrics_path: str = os.getenv('NOTION_WIDGET_METRICS_EXPORT')
+        if metrics_path:
+            try:
+                METRICS.export(metrics_path)
+            except OSError:
+                pass
+
+        if self.current_payload is not None:
+            try:
+                self.snapshot.save(self.current_payload)
+            except OSError:
+                pass  # 快照只用於加快下次啟動，寫入失敗不影響關閉
+        super().closeEvent(event)
 
     def ui(self):
         '''
         ui(self): 設定視窗的基本功能元件
         '''
-        # 判斷 dark mode 狀態
-        if self.dark:
-            mode_icon_path: str = 'bright.ico'
-            styles: Dict = self.windows_style['dark']
-            btn_icon_mode: str = 'dark'
-        else:
-            mode_icon_path: str = 'dark.ico'
-            styles: Dict = self.windows_style['bright']
-            btn_icon_mode: str = 'bright'
-        # End.
+        mode: str = 'dark' if self.dark else 'bright'
 
         # -- 布局設定 --
         central_widget = QWidget()
@@ -549,12 +541,15 @@ class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
         self.date_label = QLabel(self.format_date(), self)
 
         # 2. 顯示 Notion 最後更新日期
-        self.last_edited_time_label = QLabel("最後更新時間:\n", self)
+        self.last_edited_time_label = QLabel(
+            f"Notion 最後更新:\n{self.last_edited_time}" if self.last_edited_time is not None else "最後更新時間:\n", self)
 
         # 3. Dark Mode Button
         darkbtn = QPushButton()
+        darkbtn.setObjectName('mode')  # 樣式表中圓角較大的按鈕
 
-        darkbtn.setIcon(QIcon(self._handle_icon_path(mode_icon_path)))
+        darkbtn.setIcon(self.theme.icon(
+            'bright.ico' if self.dark else 'dark.ico'))
 
         darkbtn.setFixedSize(32, 32)
 
@@ -562,17 +557,8 @@ class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
         darkbtn.setIconSize(QSize(icon_size.width(), icon_size.height()))
         darkbtn.setCursor(Qt.PointingHandCursor)
 
-        darkbtn.setStyleSheet(f'''
-        QPushButton {{
-            border: 1px solid {styles['btn-border']};
-            border-radius: 16px;
-            background-color: {styles['btn-bg-color']};
-        }}
-        QPushButton:hover{{
-            background-color: {styles['btn-bg-hover']};
-        }}
-        ''')
         darkbtn.clicked.connect(self._switch_bg_mode)
+        self.mode_button = darkbtn
 
         h1_layout.addWidget(self.date_label)
         h1_layout.addWidget(self.last_edited_time_label)
@@ -583,19 +569,9 @@ class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
 
         # - 垂直布局 1 - (內容區塊)
         # 3. Notion 內容區塊
-        self._update_content_section()  # 需動態更新內容
-
-        # 使用 QScrollArea() 讓每個項目可以正常顯示，超出範圍也可以滾動
-        content_scroll_area = QScrollArea()
-        content_scroll_area.setWidgetResizable(True)
-        content_scroll_area.setWidget(self.content_widget)
-        content_scroll_area.setFixedHeight(140)
-        content_scroll_area.setStyleSheet(f"""
-            QScrollArea {{
-                border: none;
-            }}
-        """)
-        main_layout.addWidget(content_scroll_area)
+        # ContentView 本身可以滾動，超出範圍的項目不會建立元件
+        self.content_view.setFixedHeight(140)
+        main_layout.addWidget(self.content_view)
         # - End. -
 
         # - 水平布局 2 - (按鈕區塊)
@@ -603,19 +579,19 @@ class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
         h2_layout = QHBoxLayout()
 
         btn_setting: Dict = {
-            'previous': {"path": f'previous-{btn_icon_mode}.ico', 'tooltip': '上一天'},
-            'update': {"path": f'update-{btn_icon_mode}.ico', 'tooltip': '將 Notion 資料同步到此'},
-            'submit': {"path": f'submit-{btn_icon_mode}.ico', 'tooltip': '將資料同步到 Notion'},
-            'bullet-list': {"path": f'bullet-list-{btn_icon_mode}.ico', 'tooltip': '創建 Bullet-List'},
-            'to-do': {"path": f'to-do-{btn_icon_mode}.ico', 'tooltip': '創建 To-do'},
-            'P': {"path": f'P-{btn_icon_mode}.ico', 'tooltip': '創建 Paragraph'},
-            'next': {"path": f'next-{btn_icon_mode}.ico', 'tooltip': '下一天'},
+            'previous': {'tooltip': '上一天'},
+            'update': {'tooltip': '將 Notion 資料同步到此'},
+            'submit': {'tooltip': '將資料同步到 Notion'},
+            'bullet-list': {'tooltip': '創建 Bullet-List'},
+            'to-do': {'tooltip': '創建 To-do'},
+            'P': {'tooltip': '創建 Paragraph'},
+            'next': {'tooltip': '下一天'},
         }
 
         for name, obj in btn_setting.items():
             button = QPushButton()
             button.setObjectName(name)
-            button.setIcon(QIcon(self._handle_icon_path(obj["path"])))
+            button.setIcon(self.theme.button_icon(name, mode))
             button.setToolTip(obj["tooltip"])
             button.setFixedSize(32, 32)
 
@@ -623,18 +599,8 @@ class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
             button.setIconSize(QSize(icon_size.width(), icon_size.height()))
             button.setCursor(Qt.PointingHandCursor)
 
-            button.setStyleSheet(f"""
-            QPushButton {{
-                border: 1px solid {styles['btn-border']};
-                border-radius: 12px;
-                background-color: {styles['btn-bg-color']};
-            }}
-            QPushButton:hover{{
-                background-color: {styles['btn-bg-hover']};
-            }}
-            """)
-
             button.clicked.connect(self._handle_btn_events)
+            self.buttons[name] = button
             h2_layout.addWidget(button)
             if name != 'next':
                 h2_layout.addStretch()
@@ -648,7 +614,17 @@ class DesktopWidget(QMainWindow, DatePicker, HandleAPIandDB):
 
 
 if __name__ == '__main__':
+    # --profile-startup: 取得第一天的資料後輸出各階段的啟動時間
+    profiler = StartupProfiler(
+        enabled='--profile-startup' in sys.argv, started=_STARTED)
+    profiler.mark('imports')
+
     app = QApplication(sys.argv)
-    window = DesktopWidget()
+    profiler.mark('qapplication')
+
+    window = DesktopWidget(profiler=profiler)
+    profiler.mark('window-init')
+
     window.show()
+    QTimer.singleShot(0, lambda: profiler.mark('first-paint'))
     sys.exit(app.exec_())
@@ -0,0 +1,5 @@
+import sys
+import os
+
+# src 內的模組以平面的方式互相 import (例如 from Storage import Storage)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
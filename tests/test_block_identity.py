@@ -0,0 +1,75 @@
+from BlockIdentity import ORDER_STEP, adopt_identity, assign_keys, assign_order, day_changes, next_order
+from typing import Dict, List
+import pytest
+
+
+def _docs(*orders) -> List[Dict]:
+    return [{"key": f'k{index}', "order": order} for index, order in enumerate(orders)]
+
+
+def test_new_day_is_numbered_with_gaps():
+    docs: List[Dict] = [{"key": "a"}, {"key": "b"}, {"key": "c"}]
+    assign_order(docs)
+
+    orders: List[int] = [doc["order"] for doc in docs]
+    assert orders == sorted(orders)
+    assert min(later - earlier for earlier, later in zip(orders, orders[1:])) >= ORDER_STEP // 2
+
+
+def test_insert_only_changes_new_doc():
+    docs: List[Dict] = _docs(0, ORDER_STEP)
+    docs.insert(1, {"key": "new"})
+
+    assert assign_order(docs) == [docs[1]]
+    assert [doc["order"] for doc in docs] == [0, ORDER_STEP // 2, ORDER_STEP]
+
+
+def test_move_only_changes_moved_doc():
+    docs: List[Dict] = _docs(0, ORDER_STEP, 2 * ORDER_STEP, 3 * ORDER_STEP)
+    docs.insert(0, docs.pop(2))
+
+    assert assign_order(docs) == [docs[0]]
+    assert docs[0]["order"] < 0
+
+
+def test_renumber_when_gap_runs_out():
+    docs: List[Dict] = _docs(0, 1)
+    docs.insert(1, {"key": "new"})
+
+    changed: List[Dict] = assign_order(docs)
+    assert [doc["order"] for doc in docs] == [0, ORDER_STEP, 2 * ORDER_STEP]
+    assert [doc["key"] for doc in changed] == ['new', 'k1']
+
+
+def test_next_order():
+    assert next_order([]) == 0
+    assert next_order(_docs(0, 5 * ORDER_STEP, None)) == 6 * ORDER_STEP
+
+
+def test_keys_follow_notion_blocks():
+    stored: List[Dict] = [{"id": "b1", "key": "k1", "order": 7, "base": {}}]
+    docs: List[Dict] = [{"id": "b1", "base": {}}, {"id": "b2", "base": {}}, {"content_text": "new"}]
+    adopt_identity(docs, stored)
+    assign_keys(docs)
+
+    assert docs[0]["key"] == 'k1' and docs[0]["order"] == 7
+    assert docs[1]["key"] == 'b2'
+    assert docs[2]["key"].startswith('local-')
+
+
+def test_day_changes():
+    stored: List[Dict] = _docs(0, ORDER_STEP, 2 * ORDER_STEP)
+    docs: List[Dict] = [dict(doc) for doc in stored[:2]]
+    docs[1]["content_text"] = 'edited'
+    docs.append({"key": "new", "order": 3 * ORDER_STEP})
+
+    changed, removed = day_changes(stored, docs)
+    assert [doc["key"] for doc in changed] == ['k1', 'new']
+    assert removed == ['k2']
+
+
+def test_duplicate_keys_are_rejected():
+    with pytest.raises(ValueError):
+        day_changes([], [{"key": "a"}, {"key": "a"}])
+    with pytest.raises(ValueError):
+        assign_keys([{"key": "a"}, {"key": "a"}, {}])
@@ -0,0 +1,109 @@
+from BlockMerge import MergeResult, merge_blocks, migrate_legacy_docs, snapshot
+from typing import Dict, List
+
+
+PAGE = 'page'
+
+
+def _remote(block_id: str, text: str, checked: bool = False) -> Dict:
+    '''
+    _remote(): PageOperator.get_page_contents() 的文件
+    '''
+    return {"id": block_id, "type": "to_do", "parent": {"type": "page_id", "page_id": PAGE}, "depth": 0,
+            "last_edited_time": "2024-05-01T00:00:00.000Z", "content_text": text, "checked": checked}
+
+
+def _synced(block_id: str, text: str, checked: bool = False, **fields) -> Dict:
+    '''
+    _synced(): 曾與 Notion 同步的資料庫文件，fields 為同步後在本機修改的欄位
+    '''
+    doc: Dict = _remote(block_id, text, checked)
+    doc["base"] = snapshot(doc)
+    doc["key"] = block_id
+    doc.update(fields)
+    return doc
+
+
+def _state(result: MergeResult) -> List[tuple]:
+    return [(doc.get("id"), doc["content_text"], doc["checked"]) for doc in result.docs]
+
+
+def test_non_overlapping_changes_merge():
+    local: List[Dict] = [_synced('a', 'A', content_text='A local'), _synced('b', 'B')]
+    remote: List[Dict] = [_remote('a', 'A', checked=True), _remote('b', 'B remote')]
+    result: MergeResult = merge_blocks(local, remote)
+
+    assert result.conflicts == []
+    assert _state(result) == [('a', 'A local', True), ('b', 'B remote', False)]
+    # 合併後 base 為 Notion 的內容，只在本機修改的文字仍需上傳
+    assert result.docs[0]["base"] == {"checked": True, "content_text": "A"}
+
+
+def test_same_field_changed_on_both_sides_is_conflict():
+    local: List[Dict] = [_synced('a', 'A', content_text='A local')]
+    remote: List[Dict] = [_remote('a', 'A remote')]
+
+    conflicts: List[Dict] = merge_blocks(local, remote).conflicts
+    assert [(conflict["key"], conflict["field"], conflict["local"], conflict["remote"])
+            for conflict in conflicts] == [('a', 'content_text', 'A local', 'A remote')]
+
+    assert _state(merge_blocks(local, remote, resolution='local')) == [('a', 'A local', False)]
+    assert _state(merge_blocks(local, remote, resolution='remote')) == [('a', 'A remote', False)]
+
+
+def test_same_value_on_both_sides_is_not_conflict():
+    local: List[Dict] = [_synced('a', 'A', content_text='same')]
+    result: MergeResult = merge_blocks(local, [_remote('a', 'same')])
+
+    assert result.conflicts == []
+    assert _state(result) == [('a', 'same', False)]
+
+
+def test_block_deleted_in_notion():
+    local: List[Dict] = [_synced('a', 'A'), _synced('b', 'B', content_text='B local'), _synced('c', 'C')]
+    remote: List[Dict] = [_remote('c', 'C')]
+
+    # 本機未修改的 a 一併刪除，本機修改過的 b 需要使用者決定
+    result: MergeResult = merge_blocks(local, remote)
+    assert [(conflict["key"], conflict["field"]) for conflict in result.conflicts] == [('b', 'deleted')]
+
+    kept: MergeResult = merge_blocks(local, remote, resolution='local')
+    assert kept.conflicts == []
+    assert _state(kept) == [(None, 'B local', False), ('c', 'C', False)]
+    assert "base" not in kept.docs[0] and kept.docs[0]["key"] == 'b'
+
+    assert _state(merge_blocks(local, remote, resolution='remote')) == [('c', 'C', False)]
+
+
+def test_local_and_remote_inserts_keep_order():
+    new: Dict = {"type": "to_do", "parent": {"type": "page_id", "page_id": PAGE}, "depth": 0,
+                 "content_text": "new", "checked": False, "key": "local-1"}
+    local: List[Dict] = [_synced('a', 'A'), new, _synced('b', 'B')]
+    remote: List[Dict] = [_remote('a', 'A'), _remote('x', 'X'), _remote('b', 'B')]
+    result: MergeResult = merge_blocks(local, remote)
+
+    assert result.conflicts == []
+    assert [doc["content_text"] for doc in result.docs] == ['A', 'new', 'X', 'B']
+    assert result.docs[2]["base"] == snapshot(remote[1])
+
+
+def test_migrate_legacy_docs():
+    legacy: List[Dict] = [
+        dict(_remote('a', 'A local')),  # 仍存在於 Notion，以 Notion 的內容作為 base
+        dict(_remote(PAGE, 'page item')),  # 舊版新增的項目以 page id 作為 id
+        dict(_remote('gone', 'stale')),  # Notion 已刪除
+        _synced('b', 'B'),
+    ]
+    remote: List[Dict] = [_remote('a', 'A'), _remote('b', 'B')]
+
+    migrated: List[Dict] = migrate_legacy_docs(legacy, remote)
+    assert [doc["content_text"] for doc in migrated] == ['A local', 'page item', 'stale']
+    assert legacy[0]["base"] == {"checked": False, "content_text": "A"}
+    assert "id" not in legacy[1] and "base" not in legacy[1]
+    assert "id" not in legacy[2] and "base" not in legacy[2]
+
+    # 舊版的修改與新增的項目都保留，之後上傳至 Notion
+    result: MergeResult = merge_blocks(legacy, remote)
+    assert result.conflicts == []
+    assert _state(result) == [('a', 'A local', False), (None, 'page item', False),
+                              (None, 'stale', False), ('b', 'B', False)]
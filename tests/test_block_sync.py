@@ -0,0 +1,131 @@
+from BlockSync import SyncPlan, diff_blocks, to_notion_block
+from BlockTypes import get_block_type
+from typing import Dict, List
+import itertools
+
+
+PAGE = 'page'
+
+
+def _rich_text(text: str) -> List[Dict]:
+    return [{"type": "text", "plain_text": text, "text": {"content": text, "link": None}}] if text else []
+
+
+def _remote(block_id: str, text: str = '', block_type: str = 'to_do', has_children: bool = False) -> Dict:
+    '''
+    _remote(): Notion API 回傳的 block (get_page_json() 的 results)
+    '''
+    body: Dict = {"rich_text": _rich_text(text)}
+    if block_type == 'to_do':
+        body["checked"] = False
+    return {"id": block_id, "type": block_type, "parent": {"type": "page_id", "page_id": PAGE},
+            "has_children": has_children, block_type: body}
+
+
+def _local(block: Dict, **fields) -> Dict:
+    '''
+    _local(): 與 get_page_contents() 相同，由 Notion 的 block 產生資料庫文件
+    '''
+    doc: Dict = {"id": block["id"], "type": block["type"], "parent": block["parent"]}
+    doc.update(get_block_type(block["type"]).parse(block[block["type"]]))
+    doc.update(fields)
+    return doc
+
+
+def _new(text: str) -> Dict:
+    return {"type": "to_do", "parent": {"type": "page_id", "page_id": PAGE}, "content_text": text, "checked": False}
+
+
+def _apply(plan: SyncPlan, remote_blocks: List[Dict]) -> List[Dict]:
+    '''
+    _apply(): 模擬 Notion 執行 plan，新增的 block 取得新的 id 並寫回文件，回傳執行後的 block
+    '''
+    counter = itertools.count()
+    deleted = set(plan.deletes)
+    blocks: List[Dict] = [block for block in remote_blocks if block["id"] not in deleted]
+    for block_id, body in plan.updates:
+        block: Dict = next(block for block in blocks if block["id"] == block_id)
+        block_type: str = block["type"]
+        block[block_type] = dict(body[block_type], rich_text=[
+            dict(item, plain_text=item["text"]["content"]) for item in body[block_type]["rich_text"]])
+
+    for parent_id, after, docs in plan.appends:
+        created: List[Dict] = list()
+        for doc in docs:
+            doc["id"] = f'new-{next(counter)}'
+            notion: Dict = to_notion_block(doc)
+            created.append(_remote(doc["id"], doc.get("content_text", ''), notion["type"]))
+        index: int = len(blocks) if after is None else \
+            [block["id"] for block in blocks].index(after) + 1
+        blocks[index:index] = created
+    return blocks
+
+
+def _texts(blocks: List[Dict]) -> List[str]:
+    return [get_block_type(block["type"]).parse(block[block["type"]]).get("content_text") for block in blocks]
+
+
+def test_unchanged_page_needs_no_request():
+    remote: List[Dict] = [_remote('a', 'A'), _remote('b', 'B')]
+    assert diff_blocks([_local(block) for block in remote], remote).is_empty()
+
+
+def test_edit_only_updates_block():
+    remote: List[Dict] = [_remote('a', 'A'), _remote('b', 'B')]
+    plan: SyncPlan = diff_blocks([_local(remote[0]), _local(remote[1], content_text='B2')], remote)
+
+    assert [block_id for block_id, _ in plan.updates] == ['b']
+    assert plan.deletes == [] and plan.appends == []
+
+
+def test_reorder_moves_only_one_block():
+    remote: List[Dict] = [_remote('a', 'A'), _remote('b', 'B'), _remote('c', 'C')]
+    local: List[Dict] = [_local(remote[0]), _local(remote[2]), _local(remote[1])]
+    plan: SyncPlan = diff_blocks(local, remote)
+
+    assert len(plan.deletes) == 1 and len(plan.appends) == 1
+    result: List[Dict] = _apply(plan, remote)
+    assert _texts(result) == ['A', 'C', 'B']
+    assert diff_blocks(local, result).is_empty()
+
+
+def test_insert_at_start_recreates_following_blocks():
+    remote: List[Dict] = [_remote('a', 'A'), _remote('b', 'B')]
+    local: List[Dict] = [_new('new'), _local(remote[0]), _local(remote[1])]
+    plan: SyncPlan = diff_blocks(local, remote)
+
+    result: List[Dict] = _apply(plan, remote)
+    assert _texts(result) == ['new', 'A', 'B']
+    assert diff_blocks(local, result).is_empty()
+
+
+def test_insert_before_block_with_children_converges():
+    # Notion 無法在第一個 block 之前新增，含有 children 的 block 也無法移動
+    remote: List[Dict] = [_remote('x', 'X', has_children=True), _remote('y', 'Y')]
+    local: List[Dict] = [_new('new'), _local(remote[0]), _local(remote[1])]
+    plan: SyncPlan = diff_blocks(local, remote)
+
+    assert plan.deletes == []
+    assert [(after, [doc["content_text"] for doc in docs]) for _, after, docs in plan.appends] == [('x', ['new'])]
+    result: List[Dict] = _apply(plan, remote)
+    assert _texts(result) == ['X', 'new', 'Y']
+    assert diff_blocks(local, result).is_empty()
+
+
+def test_insert_before_pinned_block_moves_earlier_blocks():
+    remote: List[Dict] = [_remote('a', 'A'), _remote('img', block_type='image'), _remote('b', 'B')]
+    local: List[Dict] = [_new('new'), _local(remote[1]), _local(remote[0]), _local(remote[2])]
+    plan: SyncPlan = diff_blocks(local, remote)
+
+    assert 'img' not in plan.deletes
+    result: List[Dict] = _apply(plan, remote)
+    assert [block["type"] for block in result][0] == 'image'
+    assert _texts(result)[1:] == ['new', 'A', 'B']
+    assert diff_blocks(local, result).is_empty()
+
+
+def test_removed_and_unsupported_blocks():
+    remote: List[Dict] = [_remote('a', 'A'), _remote('img', block_type='image'), _remote('b', 'B')]
+    plan: SyncPlan = diff_blocks([_local(remote[1]), _local(remote[2])], remote)
+
+    assert plan.deletes == ['a'] and plan.appends == [] and plan.updates == []
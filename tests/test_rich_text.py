@@ -0,0 +1,76 @@
+from RichText import MAX_TEXT_LENGTH, apply_text_edit, from_notion, plain_text, to_notion
+from typing import Dict, List
+
+
+BOLD: Dict = {"bold": True}
+MENTION: Dict = {"type": "page", "page": {"id": "page-id"}}
+
+
+def _segments() -> List[Dict]:
+    return [
+        {"text": "Read "},
+        {"text": "this", "annotations": BOLD},
+        {"text": " and "},
+        {"text": "link", "href": "https://example.com"},
+        {"text": " in "},
+        {"text": "Page", "mention": MENTION},
+    ]
+
+
+def test_unchanged_text_returns_same_segments():
+    segments: List[Dict] = _segments()
+    assert apply_text_edit(segments, plain_text(segments)) is segments
+
+
+def test_edit_keeps_styles_outside_the_edit():
+    result: List[Dict] = apply_text_edit(_segments(), 'Read this or link in Page')
+
+    assert plain_text(result) == 'Read this or link in Page'
+    assert {"text": "this", "annotations": BOLD} in result
+    assert {"text": "link", "href": "https://example.com"} in result
+    assert result[-1] == {"text": "Page", "mention": MENTION}
+
+
+def test_new_text_inherits_previous_style():
+    result: List[Dict] = apply_text_edit(_segments(), 'Read these and link in Page')
+    assert result[1] == {"text": "these", "annotations": BOLD}
+
+    result = apply_text_edit([{"text": "end", "annotations": BOLD}], 'end!')
+    assert result == [{"text": "end!", "annotations": BOLD}]
+
+    # 開頭新增的文字沿用第一個 segment
+    result = apply_text_edit([{"text": "title", "annotations": BOLD}, {"text": " rest"}], 'A title rest')
+    assert result[0] == {"text": "A title", "annotations": BOLD}
+
+
+def test_mention_is_kept_unless_edited_inside():
+    result: List[Dict] = apply_text_edit([{"text": "Page", "mention": MENTION}], 'Page!')
+    assert result == [{"text": "Page", "mention": MENTION}, {"text": "!"}]
+
+    # mention 被切開時改為一般文字
+    result = apply_text_edit([{"text": "Page", "mention": MENTION}], 'Pxge')
+    assert result == [{"text": "Pxge"}]
+
+
+def test_delete_all_text():
+    assert apply_text_edit(_segments(), '') == []
+
+
+def test_notion_round_trip():
+    rich_text: List[Dict] = [
+        {"type": "text", "plain_text": "bold", "text": {"content": "bold", "link": None},
+         "annotations": dict(BOLD, italic=False, color="default"), "href": None},
+        {"type": "mention", "plain_text": "Page", "mention": MENTION, "href": "https://notion.so/page-id"},
+    ]
+    segments: List[Dict] = from_notion(rich_text)
+    assert segments == [{"text": "bold", "annotations": BOLD},
+                        {"text": "Page", "href": "https://notion.so/page-id", "mention": MENTION}]
+
+    items: List[Dict] = to_notion(segments)
+    assert items[0] == {"type": "text", "text": {"content": "bold", "link": None}, "annotations": BOLD}
+    assert items[1] == {"type": "mention", "mention": MENTION}
+
+
+def test_long_text_is_split():
+    items: List[Dict] = to_notion([{"text": "x" * (MAX_TEXT_LENGTH + 1)}])
+    assert [len(item["text"]["content"]) for item in items] == [MAX_TEXT_LENGTH, 1]
@@ -0,0 +1,215 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from Storage import Storage
+import pytest
+import os
+
+
+DATE = '2024-11-20'
+OTHER_DATE = '2024-11-21'
+
+
+@pytest.fixture(params=['sqlite', 'mongodb'])
+def storage(request, tmp_path) -> Storage:
+    '''
+    storage(): 兩種本機資料庫實作以相同的測試驗證，沒有設定 LOCAL_MONGODB 時略過 MongoDB
+    '''
+    if request.param == 'sqlite':
+        from SQLiteStorage import SQLiteStorage
+        yield SQLiteStorage(str(tmp_path / 'tasks.db'))
+        return
+
+    pytest.importorskip('pymongo')
+    if not os.getenv('LOCAL_MONGODB'):
+        pytest.skip('沒有設定 LOCAL_MONGODB')
+
+    from ConnectDB import DBOperation
+    db = DBOperation(database='NotionTaskTest')
+    db.client.drop_database('NotionTaskTest')
+    db._create_indexes()
+    yield db
+    db.client.drop_database('NotionTaskTest')
+
+
+def _block(date: str, key: str, order: int = None, **fields) -> Dict:
+    doc: Dict = {"task_date": date, "key": key, "type": "to_do", "content_text": key, "checked": False}
+    if order is not None:
+        doc["order"] = order
+    doc.update(fields)
+    return doc
+
+
+def _keys(docs: List[Dict]) -> List[str]:
+    return [doc["key"] for doc in docs]
+
+
+def _without_id(docs: List[Dict]) -> List[Dict]:
+    return [{key: value for key, value in doc.items() if key != "_id"} for doc in docs]
+
+
+# - TaskList -
+def test_replace_day_only_touches_date(storage: Storage):
+    storage.replace_day(DATE, [_block(DATE, 'a', 0), _block(DATE, 'b', 1024)])
+    storage.replace_day(OTHER_DATE, [_block(OTHER_DATE, 'x', 0)])
+
+    assert storage.replace_day(DATE, [_block(DATE, 'c', 0), _block(DATE, 'a', 1024)]) == 2
+    assert _keys(storage.find_data({"task_date": DATE})) == ['c', 'a']
+    assert _keys(storage.find_data({"task_date": OTHER_DATE})) == ['x']
+
+
+def test_replace_day_keeps_id(storage: Storage):
+    storage.replace_day(DATE, [_block(DATE, 'a', 0)])
+    stored: List[Dict] = storage.find_data({"task_date": DATE})
+
+    storage.replace_day(DATE, [dict(stored[0], checked=True)])
+    assert storage.find_data({"_id": stored[0]["_id"]})[0]["checked"] is True
+
+
+def test_update_day_writes_only_changed_keys(storage: Storage):
+    storage.replace_day(DATE, [_block(DATE, 'a', 0), _block(DATE, 'b', 1024), _block(DATE, 'c', 2048)])
+    storage.replace_day(OTHER_DATE, [_block(OTHER_DATE, 'a', 0)])
+
+    # 移動 c 到最前面、修改 b、新增 d、移除 a
+    count: int = storage.update_day(DATE, [
+        _block(DATE, 'c', -1024),
+        _block(DATE, 'b', 1024, checked=True),
+        _block(DATE, 'd', 4096),
+    ], ['a'])
+    assert count == 4
+
+    docs: List[Dict] = storage.find_data({"task_date": DATE})
+    assert _keys(docs) == ['c', 'b', 'd']
+    assert docs[1]["checked"] is True
+    assert _keys(storage.find_data({"task_date": OTHER_DATE})) == ['a']
+    assert storage.update_day(DATE, [], []) == 0
+
+
+def test_update_day_keeps_id(storage: Storage):
+    storage.replace_day(DATE, [_block(DATE, 'a', 0)])
+    row_id = storage.find_data({"task_date": DATE})[0]["_id"]
+
+    storage.update_day(DATE, [_block(DATE, 'a', 0, content_text='新的內容')], [])
+    docs: List[Dict] = storage.find_data({"task_date": DATE})
+    assert len(docs) == 1
+    assert docs[0]["_id"] == row_id
+    assert docs[0]["content_text"] == '新的內容'
+
+
+def test_docs_without_order_sort_first(storage: Storage):
+    storage.insert_data([_block(DATE, 'ordered-2', 2048), _block(DATE, 'ordered-1', 1024)])
+    storage.insert_data([_block(DATE, 'legacy-1'), _block(DATE, 'legacy-2')])
+    assert _keys(storage.find_data({"task_date": DATE})) == ['legacy-1', 'legacy-2', 'ordered-1', 'ordered-2']
+
+    # 取代後仍依寫入順序，設定 order 後移到對應的位置
+    storage.replace_day(DATE, storage.find_data({"task_date": DATE}))
+    assert _keys(storage.find_data({"task_date": DATE})) == ['legacy-1', 'legacy-2', 'ordered-1', 'ordered-2']
+    storage.update_data({"task_date": DATE, "key": 'legacy-1'}, {"order": 4096})
+    assert _keys(storage.find_data({"task_date": DATE})) == ['legacy-2', 'ordered-1', 'ordered-2', 'legacy-1']
+
+
+def test_bulk_update_counts_modified_docs(storage: Storage):
+    storage.replace_day(DATE, [_block(DATE, 'a', 0), _block(DATE, 'b', 1024), _block(DATE, 'c', 2048)])
+
+    assert storage.bulk_update([]) == 0
+    count: int = storage.bulk_update([
+        ({"task_date": DATE, "key": 'a'}, {"checked": True}),
+        ({"task_date": DATE, "key": 'b'}, {"checked": False}),  # 沒有變動
+        ({"task_date": DATE, "key": 'a'}, {"content_text": 'A'}),  # 依序執行
+    ])
+    assert count == 2
+
+    docs: Dict[str, Dict] = {doc["key"]: doc for doc in storage.find_data({"task_date": DATE})}
+    assert docs['a']["checked"] is True and docs['a']["content_text"] == 'A'
+    assert docs['b']["checked"] is False
+
+
+def test_update_and_delete_data(storage: Storage):
+    storage.replace_day(DATE, [_block(DATE, 'a', 0), _block(DATE, 'b', 1024)])
+    storage.replace_day(OTHER_DATE, [_block(OTHER_DATE, 'a', 0)])
+
+    assert storage.update_data({"key": 'a'}, {"checked": True}) == 2
+    assert storage.delete_data({"task_date": DATE, "key": 'a'}) == 1
+    assert _keys(storage.find_data({"task_date": DATE})) == ['b']
+    assert storage.delete_data({"task_date": OTHER_DATE}) == 1
+    assert storage.find_data({"task_date": OTHER_DATE}) == []
+
+
+def test_in_and_filters(storage: Storage):
+    storage.replace_day(DATE, [_block(DATE, 'a', 0), _block(DATE, 'b', 1024), _block(DATE, 'c', 2048)])
+    storage.replace_day(OTHER_DATE, [_block(OTHER_DATE, 'a', 0)])
+
+    docs: List[Dict] = storage.find_data({"task_date": {"$in": [DATE, OTHER_DATE]}})
+    assert [(doc["task_date"], doc["key"]) for doc in docs] == [
+        (DATE, 'a'), (DATE, 'b'), (DATE, 'c'), (OTHER_DATE, 'a')]
+    assert storage.find_data({"task_date": {"$in": []}}) == []
+
+    docs = storage.find_data({"$and": [{"task_date": DATE}, {"key": {"$in": ['a', 'c']}}]})
+    assert _keys(docs) == ['a', 'c']
+    ids: List = [doc["_id"] for doc in docs]
+    assert _keys(storage.find_data({"_id": {"$in": ids}})) == ['a', 'c']
+
+    # 沒有索引的欄位也可以篩選
+    storage.update_data({"$and": [{"task_date": DATE}, {"key": 'b'}]}, {"checked": True})
+    assert _keys(storage.find_data({"$and": [{"task_date": DATE}, {"checked": True}]})) == ['b']
+    assert _without_id(storage.find_data({"task_date": DATE, "key": 'b'})) == [
+        _block(DATE, 'b', 1024, checked=True)]
+# - End. -
+
+
+# - PageIndex -
+def test_page_index_upsert_merges_fields(storage: Storage):
+    page: Dict = {"task_date": DATE, "page_id": 'page', "last_edited_iso": '2024-11-20T01:00:00.000Z'}
+    assert storage.upsert_page_index([page]) == 1
+    assert storage.upsert_page_index([page]) == 0  # 沒有變動
+
+    assert storage.upsert_page_index([{"task_date": DATE, "synced_edited_iso": page["last_edited_iso"]}]) == 1
+    assert storage.find_page_index() == [dict(page, synced_edited_iso=page["last_edited_iso"])]
+# - End. -
+
+
+# - SyncQueue -
+def test_operation_log(storage: Storage):
+    assert storage.record_operations([]) == 0
+    assert storage.record_operations([
+        {"op": "update", "task_date": DATE, "target": {"task_date": DATE, "key": 'a'}, "fields": ["checked"]},
+        {"op": "create", "task_date": DATE, "target": {"task_date": DATE, "key": 'b'}},
+        {"op": "update", "task_date": OTHER_DATE, "target": {"task_date": OTHER_DATE, "key": 'a'}, "fields": ["content_text"]},
+    ]) == 3
+
+    operations: List[Dict] = storage.find_pending_operations(limit=0)
+    assert [(operation["op"], operation["task_date"]) for operation in operations] == [
+        ("update", DATE), ("create", DATE), ("update", OTHER_DATE)]
+    assert operations[0]["target"] == {"task_date": DATE, "key": 'a'}
+    assert all(operation["status"] == "pending" and operation["attempts"] == 0 for operation in operations)
+    assert len(storage.find_pending_operations(limit=2)) == 2
+    assert sorted(storage.pending_dates()) == [DATE, OTHER_DATE]
+
+    # 失敗的操作延後重試，仍算是尚未同步
+    assert storage.mark_operations_failed(operations[2:], 'offline') == 1
+    assert [operation["_id"] for operation in storage.find_pending_operations(limit=0)] == [
+        operation["_id"] for operation in operations[:2]]
+    assert sorted(storage.pending_dates()) == [DATE, OTHER_DATE]
+
+    assert storage.mark_operations_done([operations[0]["_id"]]) == 1
+    assert [operation["op"] for operation in storage.find_pending_operations(limit=0)] == ["create"]
+
+    assert storage.discard_operations(DATE) == 1
+    assert storage.find_pending_operations(limit=0) == []
+    assert storage.pending_dates() == [OTHER_DATE]
+# - End. -
+
+
+def test_sqlite_memory_database_is_shared_between_threads():
+    from SQLiteStorage import SQLiteStorage
+    storage = SQLiteStorage(':memory:')
+    storage.replace_day(DATE, [_block(DATE, 'a', 0)])
+
+    def write(key: str) -> List[str]:
+        storage.update_day(DATE, [_block(DATE, key, 1024 + len(key))], [])
+        return _keys(storage.find_data({"task_date": DATE}))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results: List[List[str]] = list(executor.map(write, ['b', 'cc', 'ddd', 'eeee']))
+
+    assert all('a' in keys for keys in results)
+    assert _keys(storage.find_data({"task_date": DATE})) == ['a', 'b', 'cc', 'ddd', 'eeee']